@@ -1,8 +1,12 @@
 import sys
 import json
+import numpy as np
 
 import utils
 import analyzerFun as anl
+import resultCache as rc
+import profiler as prof
+import batchPlot as bp
 
 # Read out filename param if provided
 dynamic_files = None
@@ -34,10 +38,25 @@ gamma = utils.read_config_param(
 amp = utils.read_config_param(
     config["osc"], "A", lambda el : float(el), lambda el : el > 0)
 
+# Read optional analysis params
+analysis_config = config.get("analysis", {})
+max_plot_points = utils.read_optional_config_param(
+    analysis_config, "max_plot_points", lambda el : int(el), lambda el : el > 0, None)
+plot_dtype = utils.read_optional_config_param(
+    analysis_config, "plot_dtype", lambda el : np.dtype(el), lambda el : el in (np.float32, np.float64), np.dtype(np.float64))
+cache = rc.from_config(analysis_config)
+profiler = prof.from_config(analysis_config)
+plot_dir = utils.read_optional_config_param(
+    analysis_config, "plot_dir", lambda el : el, lambda el : len(el) > 0, None)
+plot_format = utils.read_optional_config_param(
+    analysis_config, "plot_format", lambda el : el, lambda el : len(el) > 0, bp.DEFAULT_FORMAT)
+
 if dynamic_files is None:
     # Perform one analysis, analytic vs one algorithm
     # python analysisOsc.py
-    anl.analyze_osc(dynamic_filename, algo, mass, k, gamma, amp, plot_boolean, delta_t)
+    # Shown on screen, or saved to plot_dir without a display
+    plots = bp.PlotQueue(plot_dir, 1, plot_format) if plot_boolean else None
+    anl.analyze_osc(dynamic_filename, algo, mass, k, gamma, amp, plot_boolean, delta_t, profiler, plots)
 else:
     # Same dt, different algorithms + analytic
     # python analysisOsc.py beeman.txt verlet.txt gpc5.txt
@@ -47,7 +66,7 @@ else:
     for filename in dynamic_files:
         # Expected filename format: ALGO-dt.txt
         name_data = filename[:-4].split('-', 1) # Take filename without .txt extension
-        metric = anl.analyze_osc(filename, name_data[0].lower(), mass, k, gamma, amp, False, float(name_data[1]))
+        metric = anl.analyze_osc_cached(filename, name_data[0].lower(), mass, k, gamma, amp, float(name_data[1]), cache, max_plot_points, plot_dtype, profiler)
         x_superlist.append(metric.time_vec)
         y_superlist.append(metric.algo_sol)
         legend_list.append(metric.algo)
@@ -56,11 +75,12 @@ else:
     legend_list.append("analítica")
 
     if plot_boolean:
-        # Initialize plotting
-        utils.init_plotter()
+        # Shown on screen, or saved to plot_dir without a display
+        plots = bp.PlotQueue(plot_dir, 1, plot_format)
 
         # Plot real trajectory with estimated one
-        utils.plot_multiple_values(
+        plots.add(
+            'trajectories', 'plot_multiple_values',
             x_superlist,
             'tiempo (s)',
             y_superlist,
@@ -69,5 +89,6 @@ else:
             sci_y=False
         )
 
-        # Hold execution
-        utils.hold_execution()    
+        # Hold execution, or render the plot to plot_dir
+        for filename in plots.render():
+            print(f'Saved {filename}')
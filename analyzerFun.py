@@ -1,191 +1,241 @@
-import math
-import statistics as sts
-import utils
+import os
+import functools
+import concurrent.futures as futures
+import numpy as np
+import dynamicLoader as loader
+import lattice as lat
 import objects as obj
+import profiler as prof
+import batchPlot as bp
 
 def exact_solution(t, mass, k, gamma, amp):
-    return amp * math.exp(-(gamma / (2 * mass)) * t) * math.cos(math.sqrt(k / mass - gamma * gamma / (4 * mass * mass)) * t)
-
-def analyze_osc(dynamic_filename, algo, mass, k, gamma, amp, plot_boolean, delta_t):
-    dynamic_file = open(dynamic_filename, "r")
-
-    # Initial values
-    restart = True
-    p_id = 0
-    
-    time_vec = []
-    exact_sol = []
-    algo_sol = []
-    ecms = []
-
-    for linenum, line in enumerate(dynamic_file):
-        if restart:
-            time = float(line.rstrip())
-            # Reset variables
-            restart = False
-            p_id = 0
-            continue
-        if "*" == line.rstrip():
-            restart = True
-            continue
-
-        line_vec = line.rstrip().split(' ') # x vx
-        # (id, x=0, vx=0, r=0, m=0):
-        part = obj.Particle1D(p_id, float(line_vec[0]), float(line_vec[1]), 0, mass)
-        time_vec.append(time)
-        algo_sol.append(part.x)
-        exact_sol.append(exact_solution(time, mass, k, gamma, amp))
-
-        # Save Error cuadratico sum
-        ecms.append((algo_sol[-1] - exact_sol[-1]) ** 2)
-
-        p_id += 1
-
-    # Close files
-    dynamic_file.close()
-
-    # Calculate ECM
-    ecm = sts.mean(ecms)
-    ecm_dev = sts.stdev(ecms)
-    print(f'ECM for {algo} with dt {delta_t:.10E} = {ecm:.10E}, dev = {ecm_dev:.10E}\n')
-
-    # Plot values
-    if plot_boolean:
-        # Initialize plotting
-        utils.init_plotter()
-
-        # Plot real trajectory with estimated one
-        utils.plot_multiple_values(
-            [time_vec, time_vec],
-            'tiempo (s)',
-            [exact_sol, algo_sol],
-            'posición (m)',
-            ['Analítica', algo],
-            sci_y=False
-        )
-
+    # Accepts single values or arrays, broadcast together
+    return amp * np.exp(-(gamma / (2 * mass)) * t) * np.cos(np.sqrt(k / mass - gamma * gamma / (4 * mass * mass)) * t)
+
+def _plot_name(dynamic_filename, plot):
+    # Plots of different files saved to the same plot_dir stay apart
+    return f'{os.path.splitext(os.path.basename(dynamic_filename))[0]}_{plot}'
+
+def _render_plots(plots):
+    for filename in plots.render():
+        print(f'Saved {filename}')
+
+def analyze_osc(dynamic_filename, algo, mass, k, gamma, amp, plot_boolean, delta_t, profiler=None, plots=None):
+    # plots is the PlotQueue plots go to, if None they are shown on screen
+    profile = prof.open_file(profiler, dynamic_filename, 'osc')
+    try:
+        with profile.phase('read'):
+            # Binary files are memory mapped, pages are read by the first phase touching them
+            frames = loader.load_dynamic(dynamic_filename, loader.OSC_DTYPE)
+        profile.count_frames(len(frames))
+
+        time_vec = frames['t']
+        algo_sol = frames['x']
+        with profile.phase('exact', len(frames)):
+            exact_sol = exact_solution(time_vec, mass, k, gamma, amp)
+
+        # Calculate ECM, numpy mean uses pairwise summation
+        with profile.phase('reduce', len(frames)):
+            sq_errors = (algo_sol - exact_sol) ** 2
+            ecm = float(np.mean(sq_errors))
+            ecm_dev = float(np.std(sq_errors, ddof=1))
+        print(f'ECM for {algo} with dt {delta_t:.10E} = {ecm:.10E}, dev = {ecm_dev:.10E}\n')
+
+        # Plot values
+        if plot_boolean:
+            with profile.phase('plot'):
+                if plots is None:
+                    plots = bp.PlotQueue()
+
+                # Plot real trajectory with estimated one
+                plots.add(
+                    _plot_name(dynamic_filename, 'trajectory'), 'plot_multiple_values',
+                    [time_vec, time_vec],
+                    'tiempo (s)',
+                    [exact_sol, algo_sol],
+                    'posición (m)',
+                    ['Analítica', algo],
+                    sci_y=False
+                )
+                # Plots saved to plot_dir are drawn by render
+                if plots.output_dir is not None:
+                    _render_plots(plots)
+    finally:
+        # Stop profiling before hold_execution so time spent on open plots isn't counted
+        profile.stop()
+
+    if plot_boolean and plots.output_dir is None:
         # Hold execution
-        utils.hold_execution()
+        _render_plots(plots)
     
     return obj.AnalysisOsc(algo, delta_t, time_vec, exact_sol, algo_sol, ecm)
 
 ######################################################################################
 
-def analyze_rad(dynamic_filename, algo, mass, k, N, D, Q, v0, plot_boolean, delta_t):
-    dynamic_file = open(dynamic_filename, "r")
-
-    Lx, Ly = 16 * D, 15 * D
-    # Build static particle list
-    static_particles = []
-    for i in range(N):
-        for j in range(N):
-            static_particles.append(obj.Particle(
-                    i * N + j, 
-                    (i + 1) * D,
-                    j * D,
-                    q=Q if (i + j) % 2 == 0 else -Q
-                ))
-
-    # Initial values
-    restart = True
-    
-    time_vec = []
-    pos_x_list = []
-    pos_y_list = []
-    energy_diff_vec = []
-    energy_diff_sum = 0
-    trajectory_sum_interdist = []
-    trajectory_sumdist = 0
-
-    for linenum, line in enumerate(dynamic_file):
-        if restart:
-            time = float(line.rstrip())
-            # Reset variables
-            restart = False
-            p_id = 0
-            continue
-        if "*" == line.rstrip():
-            restart = True
-            continue
-
-        line_vec = line.rstrip().split(' ') # x y vx vy
+def analyze_rad(dynamic_filename, algo, mass, k, N, D, Q, v0, plot_boolean, delta_t, max_plot_points=None, profiler=None, plots=None):
+    # plots is the PlotQueue plots go to, if None they are shown on screen
+    profile = prof.open_file(profiler, dynamic_filename, 'rad')
+    try:
+        Lx, Ly = 16 * D, 15 * D
+        # Build static particle lattice
+        static_lattice = lat.Lattice(N, D, Q)
+
+        # Single pass over the file, only running sums and sampled series are kept
+        # max_plot_points=None keeps every frame
+        series = obj.SeriesDecimator(['t', 'x', 'y', 'L', 'energy_diff'], max_plot_points)
+        init_energy = None
+        trajectory_sumdist = 0
+        energy_diff_sum = 0
+        frame_count = 0
+        last_frame = None
+
+        for frames in profile.timed_iter('read', loader.read_dynamic(dynamic_filename, loader.RAD_DTYPE)):
+            # Save energy values
+            with profile.phase('energy', len(frames)):
+                _kin_energy, _pot_energy, tot_energy = lat.get_energies(frames, mass, k, Q, static_lattice)
+            if init_energy is None:
+                init_energy = tot_energy[0]
+
+            with profile.phase('reduce', len(frames)):
+                # Save interdistance values, trajectory starts at 0
+                if last_frame is None:
+                    interdist = np.concatenate(([0.0], np.hypot(np.diff(frames['x']), np.diff(frames['y']))))
+                else:
+                    interdist = np.hypot(np.diff(frames['x'], prepend=last_frame['x']), np.diff(frames['y'], prepend=last_frame['y']))
+                trajectory_sum_interdist = trajectory_sumdist + np.cumsum(interdist)
+                trajectory_sumdist = trajectory_sum_interdist[-1]
+
+                # Save tot_energy dif, it is 0 at time 0
+                energy_diff = np.abs(init_energy - tot_energy)
+                energy_diff_sum += energy_diff.sum()
+
+            with profile.phase('decimate', len(frames)):
+                series.append(t=frames['t'], x=frames['x'], y=frames['y'], L=trajectory_sum_interdist, energy_diff=energy_diff)
+            frame_count += len(frames)
+            last_frame = frames[-1]
+
+        # Empty and header only files yield no chunks
+        if last_frame is None:
+            raise ValueError(f'{dynamic_filename} has no frames')
+
+        time_vec = series['t']
+        pos_x_list = series['x']
+        pos_y_list = series['y']
+        trajectory_sum_interdist = series['L']
+        energy_diff_vec = series['energy_diff'][1:]
+        step_count = frame_count - 1
+
+        time = float(last_frame['t'])
         # (id, x=0, y=0, vx=0, vy=0, r=0, m=0, q=0)
-        part = obj.Particle(
-            p_id, float(line_vec[0]), float(line_vec[1]), 
-            float(line_vec[2]), float(line_vec[3]), 0, mass, Q)
-        time_vec.append(time)
-        pos_x_list.append(part.x)
-        pos_y_list.append(part.y)
-
-        # Save energy values
-        tot_energy = part.get_kinetic_energy() + part.get_potential_energy(static_particles, k)
-
-        # Save interdistance value if time != 0
-        # Save tot_energy dif if time != 0
-        if time != 0:
-            # Save interdistance value
-            interdist = part.center_distance(prev_part)
-            trajectory_sumdist += interdist
-            trajectory_sum_interdist.append(trajectory_sumdist)
-
-            # Save energy diff value
-            energy_diff = abs(init_energy - tot_energy)
-            energy_diff_sum += energy_diff
-            energy_diff_vec.append(energy_diff)
-        else:
-            init_energy = tot_energy
-            trajectory_sum_interdist.append(0)
-        
-        prev_part = part
-
-    ending_motive = part.get_ending_reason(Lx, Ly)
-
-    # Close files
-    dynamic_file.close()
-
-    print(f'V0 is {v0} with dt {delta_t:.10E}\n'
-          f'Init total energy is {init_energy:.10E}\n'
-          f'Total trajectory length = {trajectory_sumdist:.10E}\n'
-          f'Total energy diff = {energy_diff_sum:.10E}\n'
-          f'Avg energy diff = {energy_diff_sum / len(time_vec):.10E}\n'
-          f'Final time = {time:.10E}\n'
-          f'Ended by = {ending_motive} in {len(time_vec) - 1} steps\n')
-
-    # Plot values
-    if plot_boolean:
-        # Initialize plotting
-        utils.init_plotter()
-
-        # Plot |ET(t=0) - ET(t>0)| = f(t) with log scale
-        utils.plot_values(
-            time_vec[1:], 'tiempo (s)', 
-            energy_diff_vec, 'diferencia de ET(t) con ET(0) (J)',
-            log=True, sci_x=True, precision=0
-        )
-        
-        # Plot L = f(t) --> trajectory length
-        utils.plot_values(
-            time_vec, 'tiempo (s)', 
-            trajectory_sum_interdist, 'longitud de trayectoria (m)',
-            sci_x=True, precision=1
-        )
-
-        static_x = []
-        static_y = []
-        static_c = []
-        for sp in static_particles:
-            static_x.append(sp.x)
-            static_y.append(sp.y)
-            static_c.append('red' if sp.q > 0 else 'black')
-
-        # Particle trayectory full box size
-        utils.plot_values_with_scatter(
-            pos_x_list, 'X partícula incidente (m)', 
-            pos_y_list, 'Y partícula incidente (m)', 
-            1, sci_x=True, min_val_x=0, max_val_x=Lx, min_val_y=0, max_val_y=Ly,
-            scatter_superlist=[static_x, static_y, static_c]
-        )
-
+        last_part = obj.Particle(step_count, last_frame['x'], last_frame['y'], last_frame['vx'], last_frame['vy'], 0, mass, Q)
+        ending_motive = last_part.get_ending_reason(Lx, Ly)
+
+        print(f'V0 is {v0} with dt {delta_t:.10E}\n'
+              f'Init total energy is {init_energy:.10E}\n'
+              f'Total trajectory length = {trajectory_sumdist:.10E}\n'
+              f'Total energy diff = {energy_diff_sum:.10E}\n'
+              f'Avg energy diff = {energy_diff_sum / frame_count:.10E}\n'
+              f'Final time = {time:.10E}\n'
+              f'Ended by = {ending_motive} in {step_count} steps\n')
+
+        # Plot values
+        if plot_boolean:
+            with profile.phase('plot'):
+                if plots is None:
+                    plots = bp.PlotQueue()
+
+                # Plot |ET(t=0) - ET(t>0)| = f(t) with log scale
+                plots.add(
+                    _plot_name(dynamic_filename, 'energy_diff'), 'plot_values',
+                    time_vec[1:], 'tiempo (s)', 
+                    energy_diff_vec, 'diferencia de ET(t) con ET(0) (J)',
+                    log=True, sci_x=True, precision=0
+                )
+            
+                # Plot L = f(t) --> trajectory length
+                plots.add(
+                    _plot_name(dynamic_filename, 'trajectory_length'), 'plot_values',
+                    time_vec, 'tiempo (s)', 
+                    trajectory_sum_interdist, 'longitud de trayectoria (m)',
+                    sci_x=True, precision=1
+                )
+
+                static_x = static_lattice.x
+                static_y = static_lattice.y
+                static_c = static_lattice.get_colors()
+
+                # Particle trayectory full box size
+                plots.add(
+                    _plot_name(dynamic_filename, 'trajectory'), 'plot_values_with_scatter',
+                    pos_x_list, 'X partícula incidente (m)', 
+                    pos_y_list, 'Y partícula incidente (m)', 
+                    1, sci_x=True, min_val_x=0, max_val_x=Lx, min_val_y=0, max_val_y=Ly,
+                    scatter_superlist=[static_x, static_y, static_c]
+                )
+                # Plots saved to plot_dir are drawn by render
+                if plots.output_dir is not None:
+                    _render_plots(plots)
+    finally:
+        # Stop profiling before hold_execution so time spent on open plots isn't counted
+        profile.stop()
+
+    if plot_boolean and plots.output_dir is None:
         # Hold execution
-        utils.hold_execution()
-    return obj.AnalysisRad(algo, delta_t, v0, init_energy, trajectory_sumdist, energy_diff_sum, ending_motive, time_vec, energy_diff_vec, trajectory_sum_interdist, pos_x_list, pos_y_list)
\ No newline at end of file
+        _render_plots(plots)
+    return obj.AnalysisRad(algo, delta_t, v0, init_energy, trajectory_sumdist, energy_diff_sum, ending_motive, time_vec, energy_diff_vec, trajectory_sum_interdist, pos_x_list, pos_y_list, step_count, time)
+
+def parse_rad_filename(filename):
+    # Expected filename format: ALGO_dt_v0[_i].txt
+    name_data = os.path.basename(filename)[:-4].split('_') # Take filename without .txt extension
+    return name_data[0].lower(), float(name_data[1]), float(name_data[2])
+
+def analyze_rad_named(dynamic_filename, mass, k, N, D, Q, max_plot_points=None, cache=None, plot_dtype=np.float64, profiler=None):
+    algo, delta_t, v0 = parse_rad_filename(dynamic_filename)
+    print(dynamic_filename)
+    analyze_fun = functools.partial(analyze_rad, dynamic_filename, algo, mass, k, N, D, Q, v0, False, delta_t, max_plot_points, profiler)
+    if cache is None:
+        metric = analyze_fun()
+    else:
+        params = {'algo': algo, 'dt': delta_t, 'v0': v0, 'mass': mass, 'k': k, 'N': N, 'D': D, 'Q': Q, 'max_plot_points': max_plot_points}
+        metric = cache.get_or_compute('rad', dynamic_filename, params, analyze_fun)
+    # Series were already decimated while streaming
+    return metric.compact(None, plot_dtype)
+
+def analyze_osc_cached(dynamic_filename, algo, mass, k, gamma, amp, delta_t, cache=None, max_plot_points=None, plot_dtype=np.float64, profiler=None):
+    analyze_fun = functools.partial(analyze_osc, dynamic_filename, algo, mass, k, gamma, amp, False, delta_t, profiler)
+    if cache is None:
+        metric = analyze_fun()
+    else:
+        params = {'algo': algo, 'dt': delta_t, 'mass': mass, 'k': k, 'gamma': gamma, 'A': amp}
+        metric = cache.get_or_compute('osc', dynamic_filename, params, analyze_fun)
+    return metric.compact(max_plot_points, plot_dtype)
+
+def analyze_rad_files(dynamic_filenames, mass, k, N, D, Q, max_plot_points=None, jobs=1, cache=None, plot_dtype=np.float64, profiler=None):
+    """Returns one AnalysisRad per file, in the same order as dynamic_filenames
+
+    Parameters
+    ----------
+    dynamic_filenames : list
+        Files named ALGO_dt_v0[_i].txt
+    max_plot_points : int
+        Maximum samples kept per plotted series, None keeps every frame
+    jobs : int
+        Worker processes, 1 analyzes serially and 0 uses every core
+    cache : ResultCache
+        Optional cache, files analyzed before with the same params are read from it
+    plot_dtype : np.dtype
+        Dtype of the returned series, np.float32 halves their memory
+    profiler : Profiler
+        Optional profiler, each analyzed file writes its phase report from its own process
+    """
+
+    analyze_fun = functools.partial(analyze_rad_named, mass=mass, k=k, N=N, D=D, Q=Q, max_plot_points=max_plot_points, cache=cache, plot_dtype=plot_dtype, profiler=profiler)
+    if jobs == 0:
+        jobs = os.cpu_count()
+    jobs = min(jobs, len(dynamic_filenames))
+    if jobs <= 1:
+        return [analyze_fun(filename) for filename in dynamic_filenames]
+
+    # map keeps input order, so merging results stays deterministic
+    with futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(analyze_fun, dynamic_filenames))
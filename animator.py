@@ -1,7 +1,12 @@
+import os
 import sys
+import gzip
 import json
+import numpy as np
+
 import utils
-import objects as obj
+import lattice as lat
+import dynamicLoader as loader
 
 BLACK = ' 0 0 0'
 WHITE = ' 255 255 255'
@@ -9,88 +14,130 @@ GREEN = ' 0 255 0'
 RED = ' 255 0 0'
 C = '1e-18 '
 
-def write_corners(ovito_file, N, Lx, Ly):
-    corners = str(N+4)+'\n\n'+C+'0 0 0'+WHITE+'\n'+C+'0 '+str(Ly)+' 0'+WHITE+'\n'+C+str(Lx)+' 0 0'+WHITE+'\n'+C+str(Lx)+' '+str(Ly)+' 0'+WHITE+'\n'
-    ovito_file.write(corners)
+CORNER_COUNT = 4
+# Text buffer of uncompressed output
+OUTPUT_BUFFER_BYTES = 1 << 20
+
+def get_corners_block(Lx, Ly):
+    return C+'0 0 0'+WHITE+'\n'+C+'0 '+str(Ly)+' 0'+WHITE+'\n'+C+str(Lx)+' 0 0'+WHITE+'\n'+C+str(Lx)+' '+str(Ly)+' 0'+WHITE+'\n'
 
 def get_ovito_line(r, x, y, p_id, pos):
     if pos:
         return str(r)+' '+str(x)+' '+str(y)+' '+str(p_id)+RED+'\n'
-    return str(r)+' '+str(x)+' '+str(y)+' '+str(p_id)+BLACK+'\n' # TODO: Change to BLACK
-
-# Read params from config.json
-with open("config.json") as file:
-    config = json.load(file)
-
-if "rad" not in config:
-    invalid_param("rad")
-
-if len(sys.argv) == 2:
-    dynamic_filename = sys.argv[1]
-else:
-    dynamic_filename = utils.read_config_param(
-        config, "dynamic_file", lambda el : el, lambda el : True)
-simulation_filename = utils.read_config_param(
-    config, "simulation_file", lambda el : el, lambda el : True)
-delta_t = utils.read_config_param(
-    config, "delta_t_anim", lambda el : float(el), lambda el : el > 0)
-# There are (N x N + 1) particles
-N = utils.read_config_param(
-    config["rad"], "N", lambda el : int(el), lambda el : el > 0)
-part_count = N * N + 1
-# Area size is (16 x D; 15 x D)
-D = utils.read_config_param(
-    config["rad"], "D", lambda el : float(el), lambda el : el > 0)
-Lx, Ly = 16 * D, 15 * D
-radius = 0.1 * D
-# Read particle charge
-Q = utils.read_config_param(
-    config["rad"], "Q", lambda el : float(el), lambda el : el > 0)
-
-# Build static particle list
-static_particles = []
-for i in range(N):
-    for j in range(N):
-        static_particles.append(obj.Particle(
-                i * N + j, 
-                (i + 1) * D,
-                j * D,
-                q=Q if (i + j) % 2 == 0 else -Q
-            ))
-
-ovito_file = open(simulation_filename, "w")
-dynamic_file = open(dynamic_filename, "r")
-
-restart = True
-target_time = 0
-for linenum, line in enumerate(dynamic_file):
-    if restart:
-        time = float(line.rstrip())
-        if time >= target_time:
-            write_corners(ovito_file, part_count, Lx, Ly)
-        restart = False
-        p_id = 0
-        continue
-    if "*" == line.rstrip():
-        restart = True
-        if time >= target_time:
-            target_time += delta_t
-            if time >= target_time:
-                print('Delta t is too small, there were no events in a gap! Exiting...')
-                sys.exit(1)
-            line = ''
-            for p in static_particles:
-                line += get_ovito_line(radius / 2, p.x, p.y, p.id, p.q > 0)
-            ovito_file.write(line)
-        continue
-    
-    if time >= target_time:
-        line_vec = line.rstrip().split(' ') # x y vx vy
-        (x,y,r) = (line_vec[0], line_vec[1], radius)
-        (vx,vy) = (float(line_vec[2]), float(line_vec[3]))
-        ovito_file.write(get_ovito_line(r, x, y, 0, True))
-
-print(f'Generated {simulation_filename}')
-
-dynamic_file.close()
-ovito_file.close()
\ No newline at end of file
+    return str(r)+' '+str(x)+' '+str(y)+' '+str(p_id)+BLACK+'\n'
+
+def get_static_block(static_lattice, radius):
+    # Static particles never move, so their lines are built once for every frame
+    return ''.join(
+        get_ovito_line(radius, x, y, p_id, q > 0)
+        for p_id, (x, y, q) in enumerate(zip(static_lattice.x.tolist(), static_lattice.y.tolist(), static_lattice.q.tolist())))
+
+def get_static_filename(simulation_filename):
+    # simu.xyz -> simu_static.xyz, simu.xyz.gz -> simu_static.xyz.gz
+    compressed = simulation_filename.endswith('.gz')
+    base, ext = os.path.splitext(simulation_filename[:-3] if compressed else simulation_filename)
+    return base + '_static' + ext + ('.gz' if compressed else '')
+
+def open_output(filename):
+    # OVITO reads gzip compressed files as is
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', compresslevel=6)
+    return open(filename, 'w', buffering=OUTPUT_BUFFER_BYTES)
+
+def select_frames(times, delta_t, last_bucket):
+    """Returns the indexes of the first frame in each delta_t bucket, the last bucket and how many buckets had no frame
+
+    Frames are in time order, bucket i holds times in [i * delta_t, (i + 1) * delta_t).
+    last_bucket is the bucket of the last frame in the previous chunk, -1 for the first one.
+    """
+
+    buckets = np.floor(times / delta_t).astype(np.int64)
+    prev_buckets = np.concatenate(([last_bucket], buckets[:-1]))
+    indexes = np.flatnonzero(buckets > prev_buckets)
+    skipped = int(np.sum(buckets[indexes] - prev_buckets[indexes] - 1))
+    return indexes, (int(buckets[-1]) if len(buckets) > 0 else last_bucket), skipped
+
+def export(dynamic_filename, simulation_filename, delta_t, N, D, Q, moving_only=False, static_filename=None):
+    """Writes one OVITO frame every delta_t of dynamic_filename, returns (frames written, empty buckets skipped)
+
+    Parameters
+    ----------
+    moving_only : bool
+        If true, frames only hold the corners and the moving particle, and the
+        static lattice is written once to static_filename
+    static_filename : str
+        Static topology file for moving_only, derived from simulation_filename if None
+    """
+
+    Lx, Ly = 16 * D, 15 * D
+    radius = 0.1 * D
+    static_lattice = lat.Lattice(N, D, Q)
+    corners_block = get_corners_block(Lx, Ly)
+    static_block = get_static_block(static_lattice, radius / 2)
+
+    if moving_only:
+        if static_filename is None:
+            static_filename = get_static_filename(simulation_filename)
+        with open_output(static_filename) as static_file:
+            static_file.write(f'{len(static_lattice) + CORNER_COUNT}\n\n' + corners_block + static_block)
+        frame_head = f'{1 + CORNER_COUNT}\n\n' + corners_block
+        frame_tail = ''
+    else:
+        frame_head = f'{len(static_lattice) + 1 + CORNER_COUNT}\n\n' + corners_block
+        frame_tail = static_block
+
+    frame_count = 0
+    skipped = 0
+    last_bucket = -1
+    with open_output(simulation_filename) as ovito_file:
+        for frames in loader.read_dynamic(dynamic_filename, loader.RAD_DTYPE):
+            indexes, last_bucket, chunk_skipped = select_frames(frames['t'], delta_t, last_bucket)
+            skipped += chunk_skipped
+            for x, y in zip(frames['x'][indexes].tolist(), frames['y'][indexes].tolist()):
+                ovito_file.write(frame_head)
+                ovito_file.write(get_ovito_line(radius, x, y, 0, True))
+                ovito_file.write(frame_tail)
+            frame_count += len(indexes)
+    return frame_count, skipped
+
+if __name__ == "__main__":
+    # Read params from config.json
+    with open("config.json") as file:
+        config = json.load(file)
+
+    if "rad" not in config:
+        utils.invalid_param("rad")
+
+    if len(sys.argv) == 2:
+        dynamic_filename = sys.argv[1]
+    else:
+        dynamic_filename = utils.read_config_param(
+            config, "dynamic_file", lambda el : el, lambda el : True)
+    simulation_filename = utils.read_config_param(
+        config, "simulation_file", lambda el : el, lambda el : True)
+    delta_t = utils.read_config_param(
+        config, "delta_t_anim", lambda el : float(el), lambda el : el > 0)
+    # There are (N x N + 1) particles
+    N = utils.read_config_param(
+        config["rad"], "N", lambda el : int(el), lambda el : el > 0)
+    # Area size is (16 x D; 15 x D)
+    D = utils.read_config_param(
+        config["rad"], "D", lambda el : float(el), lambda el : el > 0)
+    # Read particle charge
+    Q = utils.read_config_param(
+        config["rad"], "Q", lambda el : float(el), lambda el : el > 0)
+
+    # Read optional animation params
+    animation_config = config.get("animation", {})
+    moving_only = utils.read_optional_config_param(
+        animation_config, "moving_only", lambda el : bool(el), lambda el : True, False)
+    static_filename = utils.read_optional_config_param(
+        animation_config, "static_file", lambda el : el, lambda el : True, None)
+
+    frame_count, skipped = export(dynamic_filename, simulation_filename, delta_t, N, D, Q, moving_only, static_filename)
+    if skipped > 0:
+        print(f'Delta t is smaller than the dynamic file spacing, {skipped} gaps had no events and were skipped')
+
+    print(f'Generated {simulation_filename} with {frame_count} frames')
+    if moving_only:
+        print(f'Generated {static_filename or get_static_filename(simulation_filename)} with the static lattice')
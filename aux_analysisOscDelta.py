@@ -1,4 +1,7 @@
+import sys
+
 import utils
+import convergenceOsc as conv
 
 # 1. Turn off plotting in config --> plot: false
 # 2. Run multiple simulations with different dts and all algos
@@ -6,6 +9,8 @@ import utils
 # python analysisOsc.py BEEMAN-0.0001.txt BEEMAN-0.001.txt BEEMAN-0.01.txt
 # 3. Replace delta_t values and ecms below with obtained values
 # 4. Run python aux_analysisOscDelta.py
+# Or run python convergenceOsc.py dt_start dt_end points and then
+# python aux_analysisOscDelta.py convergence/convergence_osc.json to plot its results instead
 
 # Different delta t step for each fragment
 # ./multipleDtOsc.sh 0.00001 0.00001 0.00010; ./multipleDtOsc.sh 0.00011 0.00002 0.00505; 
@@ -23,10 +28,23 @@ ecms_beeman = [3.2795070765E-18, 5.2735174172E-17, 2.6694602117E-16, 8.437404550
 ecms_gear_5 = [5.5722832263E-23, 1.4449721781E-23, 1.2396949503E-23, 5.6103335292E-24, 2.8635243417E-24, 2.8922602250E-24, 2.4833890144E-25, 1.6255239213E-24, 7.8826497460E-25, 1.4362645934E-24, 7.8862578437E-25, 2.9332919713E-25, 6.4858677940E-25, 7.1207465417E-25, 3.5827140689E-25, 1.6401053548E-25, 2.0672015965E-25, 7.5457823056E-26, 1.9128713284E-26, 6.7305569034E-26, 1.3791156588E-25, 5.6149710402E-26, 5.1186697313E-26, 1.0664058654E-25, 2.5170390387E-25, 2.4450812743E-26, 7.0898755755E-26, 1.8789051202E-25, 2.2575474584E-25, 1.5108899373E-25, 4.9010393762E-25, 7.1163583505E-25, 5.5398119939E-25, 1.0812647924E-24, 1.5086811273E-24, 2.0864409887E-24, 2.9063356566E-24, 3.9825419779E-24, 5.8584341709E-24, 6.7322533839E-24, 9.2651097468E-24, 1.3488036150E-23, 1.6180671801E-23, 2.1149539752E-23, 2.8038816451E-23, 3.6334856641E-23, 4.4212570812E-23, 5.8651955271E-23, 7.4324557750E-23, 9.1560071042E-23, 1.1459426239E-22, 1.4270036340E-22, 1.7687994489E-22, 2.1811314928E-22, 2.6789639242E-22, 3.2989637918E-22, 3.9662178660E-22, 4.8145292850E-22, 5.8796190170E-22, 7.0200764667E-22, 8.4288970960E-22, 1.0116803600E-21, 1.2076133076E-21, 1.4357460221E-21, 1.7010671148E-21, 2.0128167376E-21, 2.3671825109E-21, 2.7858475800E-21, 3.2663461820E-21, 3.8212984342E-21, 4.4627064340E-21, 5.1958392289E-21, 6.0439185470E-21, 6.9915394830E-21, 8.1066240839E-21, 9.3580471319E-21, 1.0761410122E-20, 1.2386904148E-20, 1.4213864189E-20, 1.6284131055E-20, 1.8624338886E-20, 2.1258216499E-20, 2.4223657741E-20, 2.7540250454E-20, 3.1284436327E-20, 3.5506606544E-20, 4.0176816431E-20, 4.5424762109E-20, 5.1289308523E-20, 5.7809350875E-20, 6.5044502851E-20, 7.3165393120E-20, 8.2144501989E-20, 9.2042710919E-20, 1.0310293044E-19, 1.1531263290E-19, 1.2879491183E-19, 1.4366598284E-19, 1.6009864873E-19, 1.7821532969E-19, 1.9809796845E-19, 2.2001218388E-19, 2.4418560735E-19, 2.7053491327E-19, 2.9947300043E-19, 3.3124131060E-19, 3.6606235832E-19, 4.0397763698E-19, 4.4565268252E-19, 4.9098426916E-19, 5.4025191223E-19, 5.9430781915E-19, 6.5280358250E-19, 7.1682559369E-19, 7.8626825207E-19, 8.6184850360E-19, 9.4374295182E-19, 1.0325520476E-18, 1.1286682466E-18, 1.2335604600E-18, 1.3459991413E-18, 1.4685122228E-18, 1.6006069001E-18, 1.7434953597E-18, 1.8980014033E-18, 2.0641198045E-18, 2.2435494069E-18, 2.4370950909E-18, 2.6460201042E-18, 2.8700023681E-18, 3.1113086600E-18, 3.3711777641E-18, 3.6491838086E-18, 3.9482350791E-18, 4.2693433575E-18, 4.6147357872E-18, 4.9854252110E-18, 5.3805962450E-18, 5.8047477485E-18, 6.2592601659E-18, 6.7463731584E-18, 7.2646198329E-18, 7.8229763670E-18, 8.4165080380E-18, 9.0510027338E-18, 9.7294512208E-18, 1.0449109208E-17, 1.1223062498E-17, 1.2043412275E-17, 1.2918629755E-17, 1.3851840589E-17, 1.4846374769E-17, 1.5898660663E-17, 1.7018726153E-17, 1.8219976705E-17, 1.9489221905E-17, 2.0839096465E-17, 2.2274488832E-17, 2.3787427587E-17, 2.5408011023E-17, 2.7115074871E-17, 2.8942180718E-17, 3.0865572722E-17, 3.2906226413E-17, 3.5069247080E-17, 3.7341854788E-17, 3.9771641678E-17, 4.2346224130E-17, 4.5046724789E-17, 4.7905830418E-17, 5.0930256086E-17, 5.4128532305E-17, 5.7511606813E-17, 6.1087838232E-17, 6.4867783473E-17, 6.8862025817E-17, 7.3037274819E-17, 7.7491439099E-17, 8.2143183155E-17, 8.7050986697E-17, 9.2227645530E-17, 9.7745613568E-17, 1.0350262729E-16, 1.0950099180E-16, 1.1588990348E-16, 1.2262038765E-16, 1.2970928561E-16, 1.3708529246E-16, 1.4493841953E-16, 1.5310451126E-16, 1.6169138494E-16, 1.7083190450E-16, 1.8032720238E-16, 1.9030531521E-16, 2.0078969819E-16, 2.1180169964E-16, 2.2336934571E-16, 2.3535346679E-16, 2.4809387776E-16, 2.6146921113E-16, 2.7531372149E-16, 2.9003105472E-16, 3.0525613511E-16, 3.2143926716E-16, 3.3817017671E-16, 3.5569713930E-16, 3.7405662094E-16, 3.9328319104E-16, 4.1341498233E-16, 4.3480765585E-16, 4.5655144310E-16, 4.7963829884E-16, 5.0379447236E-16, 5.2907005505E-16, 5.5550849214E-16, 5.8272042458E-16, 6.1161231657E-16, 6.4182114631E-16, 6.7288658482E-16, 7.0532798381E-16, 7.3976566753E-16, 7.7515364782E-16, 8.1271861745E-16, 8.5129624874E-16, 8.9155219838E-16, 9.3354737717E-16, 9.7735707548E-16, 1.0230506969E-15, 1.0707016829E-15, 1.1203847496E-15, 1.1721863013E-15, 1.2261833988E-15, 1.2824607842E-15, 1.3411139314E-15, 1.4022305923E-15, 1.4646969550E-15, 1.5309671031E-15, 1.5999967959E-15, 1.6704924314E-15, 1.7452834096E-15, 1.8216252044E-15, 1.9026262839E-15, 1.9852541070E-15, 2.0729320898E-15, 2.1623240158E-15, 2.2552451684E-15, 2.3538485457E-15, 2.4542971859E-15, 2.5586731912E-15, 2.6694540596E-15, 2.7822083685E-15, 2.8993281331E-15, 3.0209676703E-15, 3.1472872337E-15, 3.2784505180E-15, 3.4146307854E-15, 3.5559973322E-15, 3.7027401731E-15, 3.7781872915E-15, 4.1771235551E-15, 4.6102882873E-15, 5.0844307172E-15, 5.6030658769E-15, 6.1700089507E-15, 6.7893798153E-15, 7.4656407531E-15, 8.1955001897E-15, 8.9993943873E-15, 9.8656782912E-15, 1.0808167247E-14, 1.1832980532E-14, 1.2933361740E-14, 1.4141684951E-14, 1.5437296377E-14, 1.6859018426E-14, 1.8381278844E-14, 2.0029174067E-14, 2.1812164582E-14, 2.3740414359E-14, 2.5824808136E-14, 2.8045582492E-14, 3.0474754205E-14, 3.3059553868E-14, 3.5885591362E-14, 3.8888677373E-14, 4.2121593588E-14, 4.5600427872E-14, 4.9342313193E-14, 5.3365535202E-14, 5.7689568405E-14, 6.2259329622E-14, 6.7241278475E-14, 7.2500335610E-14, 7.8231580740E-14, 8.4274283154E-14, 9.0743880324E-14, 9.7791347775E-14, 1.0520860825E-13, 1.1314110818E-13, 1.2162166986E-13, 1.3068504674E-13, 1.4036817740E-13, 1.5050952094E-13, 1.6153411576E-13, 1.7330139118E-13, 1.8560471714E-13, 1.9897655667E-13, 2.1294254472E-13, 2.2811972082E-13, 2.4395282047E-13, 2.6079188739E-13, 2.7869505568E-13, 2.9814506116E-13, 3.1839345634E-13, 3.3990235654E-13, 3.6274361963E-13, 3.8699306267E-13, 4.1273058823E-13, 4.4004046723E-13, 4.6831307769E-13, 4.9898357117E-13, 5.3150264688E-13, 5.6597418612E-13, 6.0158269659E-13, 6.4021655819E-13, 6.8008870154E-13, 7.2334547579E-13, 7.6794414219E-13, 8.1633299153E-13, 8.6616811180E-13, 9.2025239218E-13, 9.7588607057E-13, 1.0346020194E-12, 1.0965555480E-12, 1.1638006891E-12, 1.2328375185E-12, 1.3056304415E-12, 1.3823663808E-12, 1.4632408030E-12, 1.5484584510E-12, 1.6382335839E-12, 1.7327905509E-12, 1.8323641832E-12, 1.9372004499E-12, 2.0475569013E-12, 2.1637033297E-12, 2.2819134941E-12, 2.4102212394E-12, 2.5451855956E-12, 2.6871298587E-12, 2.8312973114E-12, 2.9878634409E-12, 3.1524464521E-12, 3.3193442221E-12, 3.5006882326E-12, 3.6844338666E-12, 3.8841083072E-12, 4.0862428692E-12, 4.3059576590E-12, 4.5281529219E-12, 4.7697719748E-12, 5.0138423363E-12, 5.2793972346E-12, 5.5473130883E-12, 5.8277084823E-12, 6.1329205899E-12, 6.4403999722E-12, 6.7620274809E-12, 7.1123873562E-12, 7.4647549324E-12, 7.8331472343E-12, 8.2182284945E-12, 8.6206879782E-12, 9.0412409059E-12, 9.4998287375E-12, 9.9597700749E-12, 1.0440172515E-11, 1.0941870430E-11, 1.1465729814E-11, 1.2012649899E-11, 1.2583564010E-11, 1.3179441511E-11, 1.3801289014E-11, 1.4450151836E-11, 1.5127115222E-11, 1.5833306647E-11, 1.6569896855E-11, 1.7338101954E-11, 1.8099830368E-11, 1.8932893564E-11, 1.9801372327E-11, 2.0706674862E-11, 2.1650263698E-11, 2.2633657362E-11, 2.3605565138E-11, 2.4670263543E-11, 2.5779501966E-11, 2.6935038645E-11, 2.8074663903E-11, 2.9324491424E-11, 3.0626091901E-11, 3.1908008185E-11, 3.3314810480E-11, 3.4779481767E-11, 3.6219668612E-11, 3.7801661243E-11, 3.9448309661E-11, 4.1064396262E-11, 4.2841833821E-11, 4.4585137617E-11, 4.6502934740E-11, 4.8498331580E-11, 5.0450902780E-11, 5.2602687091E-11, 5.4706327812E-11, 5.7025876729E-11, 5.9291188567E-11, 6.1790680484E-11, 6.4228952884E-11, 6.6921421010E-11, 6.9544680932E-11, 7.2262984152E-11, 7.5265137273E-11, 7.8187638076E-11, 8.1418905758E-11, 8.4559659681E-11, 8.8036509279E-11, 9.1410513394E-11, 9.4903755019E-11, 9.8773795813E-11, 1.0252414529E-10, 1.0640573657E-10, 1.1071040217E-10, 1.1487525823E-10, 1.1918443189E-10, 1.2396940764E-10, 1.2859054361E-10, 1.3337024653E-10, 1.3831353535E-10, 1.4380904058E-10, 1.4910632156E-10, 1.5458315752E-10, 1.6024513900E-10, 1.6654975924E-10, 1.7261318163E-10, 1.7887966128E-10, 1.8535543157E-10, 1.9204688854E-10, 1.9951189620E-10, 2.0667212377E-10, 2.1406871040E-10, 2.2170879695E-10, 2.2959971331E-10, 2.3774898367E-10, 2.4686349462E-10, 2.5557617980E-10, 2.6457177784E-10, 2.7385870185E-10, 2.8344558967E-10, 2.9334131099E-10, 3.0355497220E-10, 3.1409592553E-10, 3.2497377404E-10, 3.3619838057E-10, 3.4777987201E-10, 3.6079062637E-10, 3.7315527371E-10, 3.8591039163E-10, 3.9906733018E-10, 4.1263774904E-10, 4.2663362445E-10, 4.4106725904E-10, 4.5595128883E-10, 4.7129869682E-10, 4.8712281867E-10, 5.0343735275E-10, 5.2025637265E-10, 5.3759433504E-10, 5.5546609150E-10, 5.7388689640E-10, 5.9287242083E-10, 6.1243876064E-10, 6.3062699296E-10, 6.5132854661E-10, 6.7265873104E-10, 6.9463537102E-10, 7.1727677876E-10, 7.4060176322E-10, 7.6462964545E-10, 7.8938026674E-10, 8.1487400139E-10, 8.4113176383E-10, 8.6817502130E-10, 8.9602580266E-10, 9.2169775446E-10, 9.5111078332E-10, 9.8139669619E-10, 1.0125799210E-09, 1.0446855119E-09, 1.0777391570E-09, 1.1117671780E-09, 1.1429868194E-09, 1.1788882198E-09, 1.2158422783E-09, 1.2538781760E-09, 1.2930257821E-09, 1.3333156409E-09, 1.3701223627E-09, 1.4125968150E-09, 1.4563048398E-09, 1.5012802440E-09, 1.5475575269E-09, 1.5896906068E-09, 1.6384461562E-09, 1.6886072210E-09, 1.7402118862E-09, 1.7932988817E-09, 1.8414384186E-09, 1.8973361984E-09, 1.9548339133E-09, 2.0139741014E-09, 2.0674644670E-09, 2.1297061815E-09, 2.1937201348E-09, 2.2595528316E-09, 2.3189210546E-09, 2.3881757383E-09, 2.4593922597E-09, 2.5326211042E-09, 2.5984405253E-09, 2.6754449914E-09, 2.7546193400E-09, 2.8256884937E-09, 2.9089143304E-09, 2.9944791858E-09, 3.0824411723E-09, 3.1610853763E-09, 3.2535179953E-09, 3.3485332215E-09, 3.4333308153E-09, 3.5331430286E-09, 3.6357365491E-09, 3.7271171399E-09, 3.8348578010E-09, 3.9455923961E-09, 4.0440113065E-09, 4.1602688425E-09, 4.2797474904E-09, 4.3856878235E-09, 4.5110928666E-09, 4.6399612091E-09, 4.7539362913E-09, 4.8891643004E-09, 5.0281130286E-09, 5.1506693245E-09, 5.2964431073E-09, 5.4250389616E-09, 5.8452776275E-09, 7.5720654817E-09, 
     9.7616485630E-09, 1.2527616358E-08, 1.5938760265E-08, 2.0193084634E-08, 2.5480733325E-08, 3.1881441455E-08, 3.9929277214E-08, 4.9595330384E-08, 6.1390403926E-08, 7.5742897239E-08, 9.2679808218E-08, 1.1364053592E-07, 1.3820817178E-07, 1.6851556881E-07, 2.0380391586E-07, 2.4582995887E-07, 2.9576984931E-07, 3.5499035200E-07, 4.2507807339E-07, 5.0786905449E-07, 6.0174477833E-07, 7.1586409252E-07, 8.4453034489E-07, 1.0007245376E-06, 1.1758837760E-06, 1.3790251851E-06, 1.6142527695E-06, 1.8862149844E-06, 2.2155544442E-06, 2.5802637162E-06, 2.9787710174E-06, 3.4578253704E-06, 4.0079393029E-06, 4.6388890879E-06, 5.3616439237E-06, 6.1415043420E-06, 7.0791279616E-06, 8.1495663796E-06, 9.2966244438E-06, 1.0676313223E-05, 1.2147795365E-05, 1.3918755683E-05, 1.5799528292E-05, 1.8063587341E-05, 2.0459712136E-05, 2.3146504701E-05, 2.6385153926E-05, 2.9792374160E-05, 3.3604108995E-05, 3.7865967167E-05, 4.3011662577E-05, 4.8386779485E-05, 5.4384475752E-05, 6.1073118058E-05, 6.8528214709E-05, 7.6833146248E-05, 8.6079984751E-05, 9.6370413475E-05, 1.0781670790E-04, 1.2054292726E-04, 1.3468575413E-04, 1.5039692322E-04, 1.6784053659E-04, 1.8720820996E-04, 2.0867868922E-04, 2.3256682908E-04, 2.5895491563E-04, 2.8603913485E-04, 3.2146165149E-04, 3.6907631914E-04, 4.6691156526E-04, 7.2276321831E-04, 1.9136051785E-03, 6.0957763698E-03, 2.1096535677E-02, 7.4352636394E-02, 3.3574731916E-01, 1.1290934621E+00, 3.6697690114E+00]
 
+x_superlist = [dts, dts, dts]
+y_superlist = [ecms_beeman, ecms_verlet, ecms_gear_5]
+legend_list = ['beeman', 'verlet', 'gear']
+
+# Read values from a convergence results file if provided
+if len(sys.argv) >= 2:
+    series, fits = conv.load_results(sys.argv[1])
+    x_superlist = [dt_list for dt_list, _ecm_list in series.values()]
+    y_superlist = [ecm_list for _dt_list, ecm_list in series.values()]
+    legend_list = [algo.lower() for algo in series]
+    for algo, fit in fits.items():
+        print(f'{algo}: order {fit["order"]:.3f}±{fit["order_err"]:.3f}, R2 = {fit["r2"]:.6f}')
+
 # Initialize plotting
 utils.init_plotter()
 
-utils.plot_multiple_values([dts, dts, dts], 'dt (s)', [ecms_beeman, ecms_verlet, ecms_gear_5], 'error cuadrático medio (m^2)', ['beeman', 'verlet', 'gear'], sci_x=True, log_x=True, log_y=True, legend_loc='lower right')
+utils.plot_multiple_values(x_superlist, 'dt (s)', y_superlist, 'error cuadrático medio (m^2)', legend_list, sci_x=True, log_x=True, log_y=True, legend_loc='lower right')
 
 # Hold execution
 utils.hold_execution()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+import concurrent.futures as futures
+import matplotlib.pyplot as plt
+
+import utils
+
+DEFAULT_FORMAT = 'png'
+
+def _init_worker():
+    utils.use_headless()
+    utils.init_plotter()
+
+def render_spec(helper, args, kwargs):
+    """Draws one plot with the utils helper named helper, returns the file it was saved to"""
+
+    getattr(utils, helper)(*args, **kwargs)
+    # Helpers leave their figures open
+    plt.close('all')
+    return kwargs['save_name']
+
+class PlotQueue(object):
+    def __init__(self, output_dir=None, jobs=1, fmt=DEFAULT_FORMAT):
+        """Plots made with the utils helpers, shown on screen or rendered to files in a batch
+
+        Parameters
+        ----------
+        output_dir : str
+            Directory the plots are saved to, with no display needed. If None,
+            each plot is drawn when added and render holds execution to show them
+        jobs : int
+            Worker processes rendering plots at once, 0 uses every core
+        fmt : str
+            Image format and extension of the saved plots
+        """
+
+        self.output_dir = output_dir
+        self.jobs = os.cpu_count() if jobs == 0 else jobs
+        self.fmt = fmt
+        self.specs = []
+        if output_dir is None:
+            utils.init_plotter()
+        else:
+            os.makedirs(output_dir, exist_ok=True)
+            # Figures are never shown, so this process can run without a display too
+            _init_worker()
+
+    def add(self, name, helper, *args, **kwargs):
+        """Queues a call to the utils helper named helper, saved as name.fmt in output_dir"""
+
+        if not callable(getattr(utils, helper, None)):
+            raise ValueError(f'{helper} is not a utils plot helper')
+        if self.output_dir is None:
+            getattr(utils, helper)(*args, **kwargs)
+            return
+        kwargs['save_name'] = os.path.join(self.output_dir, f'{name}.{self.fmt}')
+        self.specs.append((helper, args, kwargs))
+
+    def render(self):
+        """Renders every queued plot and returns their filenames, or shows the plots if there is no output_dir"""
+
+        if self.output_dir is None:
+            utils.hold_execution()
+            return []
+
+        specs, self.specs = self.specs, []
+        jobs = min(self.jobs, len(specs))
+        if jobs <= 1:
+            return [render_spec(*spec) for spec in specs]
+        # map keeps the queue order
+        with futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+            return list(executor.map(render_spec, *zip(*specs)))
@@ -0,0 +1,225 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+
+import utils
+import objects as obj
+import lattice as lat
+import animator
+import analyzerFun as anl
+import dynamicLoader as loader
+
+DEFAULT_FRAMES = [10000, 1000000]
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_RESULTS = 'benchmark_results.json'
+# Text files over this many frames take minutes to write, so only binary ones are generated
+MAX_TEXT_FRAMES = 1000000
+# Repetitions aggregated per time index
+ENSEMBLE_RUNS = 32
+# Points of the fit stage, one per convergence study dt
+FIT_POINTS = 1000
+# Slowdowns under this many seconds are timer noise, never flagged
+NOISE_SECONDS = 1e-3
+# Peak memory growth under this many MB is never flagged
+NOISE_MB = 1.0
+
+# Same params as config.json
+RAD_PARAMS = {'mass': 1e-27, 'k': 1e10, 'N': 16, 'D': 1e-8, 'Q': 1e-19, 'v0': 1e5, 'dt': 1e-16}
+OSC_PARAMS = {'mass': 70.0, 'k': 1e4, 'gamma': 100.0, 'A': 1.0, 'tf': 5.0}
+
+def generate_rad_frames(frames, N, D, v0, dt, seed=1):
+    """Returns a synthetic radiation trajectory crossing the whole lattice between two rows"""
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames) * dt
+    # Crosses from x = 0 to just before the right wall, wobbling around a row midpoint
+    x = np.linspace(0.0, N * D * 0.999, frames)
+    phase = np.linspace(0.0, 2 * np.pi * N, frames) + rng.random()
+    y = ((N - 1) * D / 2 + D / 2) + 0.1 * D * np.sin(phase)
+    data = np.empty(frames, dtype=loader.RAD_DTYPE)
+    data['t'], data['x'], data['y'] = t, x, y
+    data['vx'] = v0
+    data['vy'] = np.gradient(y, dt) if frames > 1 else 0.0
+    return data
+
+def generate_osc_frames(frames, mass, k, gamma, amp, tf):
+    """Returns the analytic oscillator trajectory with a small deterministic error, as a simulation would print it"""
+
+    t = np.linspace(0.0, tf, frames)
+    x = anl.exact_solution(t, mass, k, gamma, amp) * (1 + 1e-6 * np.sin(t))
+    data = np.empty(frames, dtype=loader.OSC_DTYPE)
+    data['t'], data['x'] = t, x
+    data['vx'] = np.gradient(x, t) if frames > 1 else 0.0
+    return data
+
+def write_dynamic_file(filename, data, params):
+    if filename.endswith('.bin'):
+        with open(filename, 'wb') as dynamic_file:
+            loader.write_binary_header(dynamic_file, data.dtype, params)
+            loader.write_binary_frames(dynamic_file, data)
+    else:
+        with open(filename, 'w') as dynamic_file:
+            for start in range(0, len(data), loader.DEFAULT_CHUNK_FRAMES):
+                loader.write_text_frames(dynamic_file, data[start:start + loader.DEFAULT_CHUNK_FRAMES])
+
+def _quiet(fun):
+    # Analysis functions print their results, which would flood the report
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fun()
+    return run
+
+def get_stages(work_dir, frames, fmt):
+    """Returns [(name, frames processed, function)] for every pipeline stage over files of this size and format"""
+
+    rad, osc = RAD_PARAMS, OSC_PARAMS
+    rad_filename = os.path.join(work_dir, f'BEEMAN_{rad["dt"]:.5E}_{int(rad["v0"])}_1.{fmt}')
+    osc_filename = os.path.join(work_dir, f'BEEMAN-{osc["tf"] / frames:.10E}.{fmt}')
+    rad_frames = generate_rad_frames(frames, rad['N'], rad['D'], rad['v0'], rad['dt'])
+    osc_frames = generate_osc_frames(frames, osc['mass'], osc['k'], osc['gamma'], osc['A'], osc['tf'])
+    write_dynamic_file(rad_filename, rad_frames, [rad['mass'], rad['k'], rad['N'], rad['D'], rad['Q'], rad['v0'], 0.0, rad['dt'], rad['dt']])
+    write_dynamic_file(osc_filename, osc_frames, [osc['mass'], osc['k'], osc['gamma'], osc['tf'], osc['A'], osc['A'], osc['tf'] / frames, osc['tf'] / frames])
+
+    static_lattice = lat.Lattice(rad['N'], rad['D'], rad['Q'])
+    ensemble = [rad_frames['x'][i::ENSEMBLE_RUNS] for i in range(ENSEMBLE_RUNS)]
+    fit_x = np.geomspace(1e-5, 1e-2, FIT_POINTS)
+    fit_y = 3.0 * fit_x * (1 + 1e-3 * np.sin(np.arange(FIT_POINTS)))
+    # About a thousand animation frames
+    anim_delta_t = max(1, frames // 1000) * rad['dt']
+    anim_filename = os.path.join(work_dir, 'simu.xyz')
+
+    return [
+        # Binary files are memory mapped, copying reads them
+        ('parse_rad', frames, lambda: np.array(loader.load_dynamic(rad_filename, loader.RAD_DTYPE))),
+        ('parse_osc', frames, lambda: np.array(loader.load_dynamic(osc_filename, loader.OSC_DTYPE))),
+        ('energy', frames, lambda: lat.get_energies(rad_frames, rad['mass'], rad['k'], rad['Q'], static_lattice)),
+        ('reductions', frames, lambda: (np.hypot(np.diff(rad_frames['x']), np.diff(rad_frames['y'])).sum(), rad_frames['vx'].mean())),
+        ('analyze_rad', frames, _quiet(lambda: anl.analyze_rad(rad_filename, 'beeman', rad['mass'], rad['k'], rad['N'], rad['D'], rad['Q'], rad['v0'], False, rad['dt']))),
+        ('analyze_osc', frames, _quiet(lambda: anl.analyze_osc(osc_filename, 'beeman', osc['mass'], osc['k'], osc['gamma'], osc['A'], False, osc['tf'] / frames))),
+        ('export', frames, lambda: animator.export(rad_filename, anim_filename, anim_delta_t, rad['N'], rad['D'], rad['Q'])),
+        ('fit', FIT_POINTS, lambda: utils.fit_linear(np.log10(fit_x), np.log10(fit_y), through_origin=False)),
+        ('aggregation', frames, lambda: obj.EnsembleStats(ensemble, False)),
+    ]
+
+def measure(fun, repeat):
+    """Returns the best wall time of repeat runs and the peak traced memory of one more run, in MB"""
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        seconds.append(time.perf_counter() - start)
+
+    # Tracing slows allocations down, so memory is measured apart
+    tracemalloc.start()
+    try:
+        fun()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak / 1e6
+
+def run_benchmarks(frames_list, repeat=DEFAULT_REPEAT, work_dir=None):
+    """Returns {'frames/format/stage': {seconds, frames_per_second, peak_mb}} for every size and format"""
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        for frames in frames_list:
+            formats = ['bin', 'txt'] if frames <= MAX_TEXT_FRAMES else ['bin']
+            for fmt in formats:
+                for stage, stage_frames, fun in get_stages(tmp_dir, frames, fmt):
+                    # Only parsing depends on the format
+                    if fmt != 'bin' and not stage.startswith('parse'):
+                        continue
+                    seconds, peak_mb = measure(fun, repeat)
+                    name = f'{frames}/{fmt}/{stage}'
+                    results[name] = {'seconds': seconds, 'frames_per_second': stage_frames / seconds if seconds > 0 else float('inf'), 'peak_mb': peak_mb}
+                    print(f'{name:<32} {seconds:12.6f} s {results[name]["frames_per_second"]:16.0f} frames/s {peak_mb:12.2f} MB')
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns [(name, metric, baseline value, value, change)] for stages slower or bigger than threshold over baseline"""
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric, noise in (('seconds', NOISE_SECONDS), ('peak_mb', NOISE_MB)):
+            old, new = baseline[name][metric], result[metric]
+            if old > 0 and new / old - 1 > threshold and new - old > noise:
+                regressions.append((name, metric, old, new, new / old - 1))
+    return regressions
+
+def get_environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+            'processor': platform.processor(), 'cpus': os.cpu_count()}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('save', 'compare'):
+        print('Run with python3 benchmark.py save|compare [frames_1 frames_2 ...]')
+        sys.exit(1)
+    mode = sys.argv[1]
+
+    # Read params from config.json
+    with open("config.json") as file:
+        config = json.load(file)
+
+    # Read optional benchmark params
+    benchmark_config = config.get("benchmark", {})
+    frames_list = utils.read_optional_config_param(
+        benchmark_config, "frames", lambda el : [int(frames) for frames in el], lambda el : len(el) > 0 and all(frames > 1 for frames in el), DEFAULT_FRAMES)
+    repeat = utils.read_optional_config_param(
+        benchmark_config, "repeat", lambda el : int(el), lambda el : el > 0, DEFAULT_REPEAT)
+    threshold = utils.read_optional_config_param(
+        benchmark_config, "threshold", lambda el : float(el), lambda el : el > 0, DEFAULT_THRESHOLD)
+    baseline_filename = utils.read_optional_config_param(
+        benchmark_config, "baseline_file", lambda el : el, lambda el : True, DEFAULT_BASELINE)
+    results_filename = utils.read_optional_config_param(
+        benchmark_config, "results_file", lambda el : el, lambda el : True, DEFAULT_RESULTS)
+    work_dir = utils.read_optional_config_param(
+        benchmark_config, "work_dir", lambda el : el, lambda el : True, None)
+
+    if len(sys.argv) >= 3:
+        frames_list = [int(frames) for frames in sys.argv[2:]]
+
+    results = run_benchmarks(frames_list, repeat, work_dir)
+    report = {'environment': get_environment(), 'repeat': repeat, 'results': results}
+
+    if mode == 'save':
+        with open(baseline_filename, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=4)
+        print(f'\nBaseline written to {baseline_filename}')
+        sys.exit(0)
+
+    if not os.path.exists(baseline_filename):
+        print(f'\nNo baseline found at {baseline_filename}, run with save first')
+        sys.exit(1)
+    with open(baseline_filename) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = compare(results, baseline['results'], threshold)
+    report['baseline_file'] = baseline_filename
+    report['threshold'] = threshold
+    report['regressions'] = [{'stage': name, 'metric': metric, 'baseline': old, 'value': new, 'change': change}
+                             for name, metric, old, new, change in regressions]
+    with open(results_filename, 'w') as results_file:
+        json.dump(report, results_file, indent=4)
+    print(f'\nResults written to {results_filename}')
+
+    if baseline['environment'] != report['environment']:
+        print('Baseline was measured on a different environment, comparisons may not be meaningful')
+    if len(regressions) == 0:
+        print(f'No regressions over {threshold:.0%}')
+        sys.exit(0)
+    for name, metric, old, new, change in regressions:
+        utils.print_with_color(f'{name} {metric}: {old:.6g} -> {new:.6g} (+{change:.0%})', '#ff0000')
+    sys.exit(1)
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import numpy as np
+
+import utils
+import sweep
+import oscEngine as eng
+
+DEFAULT_ALGOS = ['Verlet', 'Beeman', 'Gear']
+
+def get_dt_list(dt_start, dt_end, points, tf):
+    # Log spaced, so each decade weighs the same in the order fit
+    # Rounded so tf is a whole number of steps, as the simulation requires
+    steps = np.unique(np.maximum(1, np.rint(tf / np.geomspace(dt_start, dt_end, points))))
+    return sorted(float(tf / step) for step in steps)
+
+def fit_order(dt_list, ecm_list, min_ecm=0.0):
+    """Returns the LinearFit of log10(ECM) = slope * log10(dt) + b, None if less than 2 points are left
+
+    ECM is the mean squared error, so the global error order is slope / 2.
+    Points with ECM <= min_ecm are left out, to skip the round off floor of high order algorithms.
+    """
+
+    dts = np.asarray(dt_list, dtype=np.float64)
+    ecms = np.asarray(ecm_list, dtype=np.float64)
+    mask = ecms > min_ecm
+    if np.count_nonzero(mask) < 2:
+        return None
+    return utils.fit_linear(np.log10(dts[mask]), np.log10(ecms[mask]), through_origin=False)
+
+def run_engine(params, runs):
+    """Integrates every run in process with oscEngine, one batch per algorithm, returns {name: row}"""
+
+    rows = {}
+    for algo in dict.fromkeys(run.algo for run in runs):
+        algo_runs = [run for run in runs if run.algo == algo]
+        result = eng.simulate_osc_batch(
+            algo, [run.dt for run in algo_runs], float(params['tf']), float(params['mass']), float(params['k']),
+            float(params['gamma']), float(params['A']), float(params['r0']))
+        for run, ecm in zip(algo_runs, result.ecm):
+            rows[run.name] = {'ecm': float(ecm)}
+    return rows
+
+def build_results(config, runs, rows, min_ecm=0.0):
+    """Returns the study as a dict with every run's ECM and the order fit per algorithm"""
+
+    results = {'osc': config['osc'], 'min_ecm': min_ecm, 'runs': [], 'fits': {}}
+    for algo in dict.fromkeys(run.algo for run in runs):
+        algo_runs = sorted((run for run in runs if run.algo == algo and run.name in rows), key=lambda run: run.dt)
+        dt_list = [run.dt for run in algo_runs]
+        ecm_list = [float(rows[run.name]['ecm']) for run in algo_runs]
+        results['runs'].extend({'algo': algo, 'dt': dt, 'ecm': ecm} for dt, ecm in zip(dt_list, ecm_list))
+
+        fit = fit_order(dt_list, ecm_list, min_ecm)
+        if fit is None:
+            continue
+        results['fits'][algo] = {
+            'ecm_slope': float(fit.slope), 'ecm_slope_err': float(fit.slope_err),
+            'order': float(fit.slope / 2), 'order_err': float(fit.slope_err / 2),
+            'intercept': float(fit.intercept), 'r2': float(fit.r2),
+            'points': int(np.count_nonzero(np.asarray(ecm_list) > min_ecm))
+        }
+    return results
+
+def load_results(results_filename):
+    """Returns {algo: (dt_list, ecm_list)} and the fits from a convergence results file"""
+
+    with open(results_filename) as results_file:
+        results = json.load(results_file)
+    series = {}
+    for run in results['runs']:
+        dt_list, ecm_list = series.setdefault(run['algo'], ([], []))
+        dt_list.append(run['dt'])
+        ecm_list.append(run['ecm'])
+    return series, results['fits']
+
+# Sweep worker processes import this module
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print('Run with python3 convergenceOsc.py dt_start dt_end points [results_file]')
+        sys.exit(1)
+    dt_start = float(sys.argv[1])
+    dt_end = float(sys.argv[2])
+    points = int(sys.argv[3])
+    if dt_start <= 0 or dt_end <= 0 or points < 1:
+        print('dt_start and dt_end must be positive and points at least 1')
+        sys.exit(1)
+
+    # Read params from config.json
+    with open("config.json") as file:
+        config = json.load(file)
+
+    if "osc" not in config:
+        utils.invalid_param("osc")
+    utils.read_config_param(
+        config, "dynamic_file", lambda el : el, lambda el : True)
+    tf = utils.read_config_param(
+        config["osc"], "tf", lambda el : float(el), lambda el : el > 0)
+
+    # Read optional convergence params
+    convergence_config = config.get("convergence", {})
+    algos = utils.read_optional_config_param(
+        convergence_config, "algos", lambda el : list(el), lambda el : len(el) > 0, DEFAULT_ALGOS)
+    jobs = utils.read_optional_config_param(
+        convergence_config, "jobs", lambda el : int(el), lambda el : el >= 0, 0)
+    output_dir = utils.read_optional_config_param(
+        convergence_config, "output_dir", lambda el : el, lambda el : True, "convergence")
+    min_ecm = utils.read_optional_config_param(
+        convergence_config, "min_ecm", lambda el : float(el), lambda el : el >= 0, 0.0)
+    launcher = utils.read_optional_config_param(
+        convergence_config, "launcher", lambda el : el, lambda el : True, None)
+    engine = utils.read_optional_config_param(
+        convergence_config, "engine", lambda el : el, lambda el : el in ('java', 'python'), 'java')
+
+    results_filename = sys.argv[4] if len(sys.argv) >= 5 else os.path.join(output_dir, 'convergence_osc.json')
+
+    runs = sweep.build_grid('osc', algos, get_dt_list(dt_start, dt_end, points, tf))
+    if engine == 'python':
+        # Every dt of an algorithm in a single batch, no dynamic files
+        os.makedirs(output_dir, exist_ok=True)
+        rows = run_engine(config['osc'], runs)
+    else:
+        # Every run goes through the sweep runner, so a study can be resumed
+        sweep_filename = os.path.join(output_dir, 'results_osc.csv')
+        sweep.sweep(config, 'osc', runs, output_dir, sweep_filename, jobs, launcher)
+        rows = sweep.read_results(sweep_filename, sweep.OSC_FIELDS)
+
+    results = build_results(config, runs, rows, min_ecm)
+    with open(results_filename, 'w') as results_file:
+        json.dump(results, results_file, indent=4)
+
+    print(f'\nResults written to {results_filename}')
+    for algo, fit in results['fits'].items():
+        print(f'{algo}: ECM ~ dt^{fit["ecm_slope"]:.3f}±{fit["ecm_slope_err"]:.3f}, '
+              f'order {fit["order"]:.3f}±{fit["order_err"]:.3f}, R2 = {fit["r2"]:.6f} ({fit["points"]} points)')
@@ -0,0 +1,152 @@
+import bisect
+import itertools
+import os
+import numpy as np
+
+# Dynamic file layout, one frame per particle step:
+#   time
+#   x [y] vx [vy]
+#   *
+FRAME_LINES = 3
+FRAME_END = '*'
+
+RAD_DTYPE = np.dtype([('t', np.float64), ('x', np.float64), ('y', np.float64), ('vx', np.float64), ('vy', np.float64)])
+OSC_DTYPE = np.dtype([('t', np.float64), ('x', np.float64), ('vx', np.float64)])
+
+DEFAULT_CHUNK_FRAMES = 1 << 18
+
+# Binary layout written by BinaryStepWriter, little endian:
+#   header, param_count float64 run params, then one float64 record per frame
+BINARY_MAGIC = b'SDSTRAJ\x00'
+BINARY_VERSION = 1
+BINARY_HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<i4'), ('columns', '<i4'), ('param_count', '<i4'), ('reserved', '<i4')])
+BINARY_PARAMS = {
+    len(RAD_DTYPE.names): ['mass', 'k', 'N', 'D', 'Q', 'v0', 'r0', 'delta_t_sim', 'delta_t_print'],
+    len(OSC_DTYPE.names): ['mass', 'k', 'gamma', 'tf', 'r0', 'A', 'delta_t_sim', 'delta_t_print']
+}
+
+def _parse_frames(lines, dtype):
+    # Drop trailing incomplete frame (file may still be being written)
+    frame_count = len(lines) // FRAME_LINES
+    lines = lines[:frame_count * FRAME_LINES]
+
+    end_lines = lines[2::FRAME_LINES]
+    if any(line.rstrip() != FRAME_END for line in end_lines):
+        raise ValueError('Invalid dynamic file, expected one particle line per frame')
+
+    data_cols = len(dtype.names) - 1
+    frames = np.empty(frame_count, dtype=dtype)
+    frames['t'] = np.array(''.join(lines[0::FRAME_LINES]).split(), dtype=np.float64)
+    values = np.array(''.join(lines[1::FRAME_LINES]).split(), dtype=np.float64)
+    if values.size != frame_count * data_cols:
+        raise ValueError(f'Invalid dynamic file, expected {data_cols} values per particle line')
+    values = values.reshape(frame_count, data_cols)
+    for col, name in enumerate(dtype.names[1:]):
+        frames[name] = values[:, col]
+    return frames
+
+def is_binary(dynamic_filename):
+    with open(dynamic_filename, "rb") as dynamic_file:
+        return dynamic_file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+def open_binary(dynamic_filename, dtype=None):
+    """Returns (params, frames) where frames is a read only memmap over the binary records
+
+    Parameters
+    ----------
+    dynamic_filename : str
+        Binary dynamic file path
+    dtype : np.dtype
+        Expected record layout, inferred from the header if None
+    """
+
+    if not is_binary(dynamic_filename):
+        raise ValueError(f'{dynamic_filename} is not a binary dynamic file')
+    header = np.fromfile(dynamic_filename, dtype=BINARY_HEADER_DTYPE, count=1)
+    columns = int(header['columns'][0])
+    param_count = int(header['param_count'][0])
+
+    if dtype is None:
+        dtype = RAD_DTYPE if columns == len(RAD_DTYPE.names) else OSC_DTYPE
+    if columns != len(dtype.names):
+        raise ValueError(f'Invalid binary dynamic file, expected {len(dtype.names)} columns per record')
+    dtype = dtype.newbyteorder('<')
+
+    param_values = np.fromfile(dynamic_filename, dtype='<f8', count=param_count, offset=BINARY_HEADER_DTYPE.itemsize)
+    param_names = BINARY_PARAMS.get(columns, [])
+    params = {param_names[i] if i < len(param_names) else f'param_{i}': float(value) for i, value in enumerate(param_values)}
+
+    # Drop trailing incomplete record (file may still be being written)
+    offset = BINARY_HEADER_DTYPE.itemsize + param_count * 8
+    frame_count = max(0, (os.path.getsize(dynamic_filename) - offset) // dtype.itemsize)
+    if frame_count == 0:
+        return params, np.empty(0, dtype=dtype)
+    return params, np.memmap(dynamic_filename, dtype=dtype, mode='r', offset=offset, shape=(frame_count,))
+
+def write_binary_header(binary_file, dtype, params):
+    """Writes the BinaryStepWriter header, params are float64 in BINARY_PARAMS order"""
+
+    header = np.zeros(1, dtype=BINARY_HEADER_DTYPE)
+    header['magic'] = BINARY_MAGIC
+    header['version'] = BINARY_VERSION
+    header['columns'] = len(dtype.names)
+    header['param_count'] = len(params)
+    binary_file.write(header.tobytes())
+    binary_file.write(np.asarray(params, dtype='<f8').tobytes())
+
+def write_binary_frames(binary_file, frames):
+    binary_file.write(np.ascontiguousarray(frames, dtype=frames.dtype.newbyteorder('<')).tobytes())
+
+def write_text_frames(text_file, frames, precision=16):
+    """Writes frames in the text dynamic layout"""
+
+    value_fmt = f'%.{precision}E'
+    frame_fmt = value_fmt + '\n' + ' '.join([value_fmt] * (len(frames.dtype.names) - 1)) + '\n' + FRAME_END + '\n'
+    text_file.write(''.join(frame_fmt % tuple(frame) for frame in frames.tolist()))
+
+def time_slice(frames, t_start=None, t_end=None):
+    """Returns the view of frames with t_start <= t <= t_end, without copying"""
+
+    times = frames['t']
+    start = 0 if t_start is None else bisect.bisect_left(times, t_start)
+    end = len(frames) if t_end is None else bisect.bisect_right(times, t_end)
+    return frames[start:end]
+
+def read_dynamic(dynamic_filename, dtype=RAD_DTYPE, chunk_frames=DEFAULT_CHUNK_FRAMES):
+    """Yields structured arrays with at most chunk_frames frames each
+
+    Parameters
+    ----------
+    dynamic_filename : str
+        Dynamic file path
+    dtype : np.dtype
+        RAD_DTYPE for (t, x, y, vx, vy) or OSC_DTYPE for (t, x, vx)
+    chunk_frames : int
+        Maximum frames held in memory at once
+    """
+
+    if is_binary(dynamic_filename):
+        _params, frames = open_binary(dynamic_filename, dtype)
+        for start in range(0, len(frames), chunk_frames):
+            yield frames[start:start + chunk_frames]
+        return
+
+    with open(dynamic_filename, "r") as dynamic_file:
+        while True:
+            lines = list(itertools.islice(dynamic_file, chunk_frames * FRAME_LINES))
+            if len(lines) < FRAME_LINES:
+                break
+            yield _parse_frames(lines, dtype)
+
+def load_dynamic(dynamic_filename, dtype=RAD_DTYPE, chunk_frames=DEFAULT_CHUNK_FRAMES):
+    """Returns a structured array with every frame in dynamic_filename, memory mapped if binary"""
+
+    if is_binary(dynamic_filename):
+        return open_binary(dynamic_filename, dtype)[1]
+
+    chunks = list(read_dynamic(dynamic_filename, dtype, chunk_frames))
+    if len(chunks) == 0:
+        return np.empty(0, dtype=dtype)
+    if len(chunks) == 1:
+        return chunks[0]
+    return np.concatenate(chunks)
@@ -0,0 +1,104 @@
+import numpy as np
+
+# Pairwise terms evaluated at once when chunking energies (~32MB of float64)
+DEFAULT_CHUNK_ELEMENTS = 1 << 22
+
+class Lattice(object):
+    def __init__(self, N, D, Q):
+        """Returns the N x N static particle lattice as flat arrays
+
+        Parameters
+        ----------
+        N : int
+            Number of static particles per dimension
+        D : float
+            Distance between static particles
+        Q : float
+            Particle charge, positive when (i + j) is even
+        """
+
+        i, j = np.meshgrid(np.arange(N), np.arange(N), indexing='ij')
+        self.N = N
+        self.D = D
+        self.Q = Q
+        self.x = ((i + 1) * D).ravel().astype(np.float64)
+        self.y = (j * D).ravel().astype(np.float64)
+        self.q = np.where((i + j) % 2 == 0, Q, -Q).ravel().astype(np.float64)
+
+    def __len__(self):
+        return len(self.q)
+
+    def get_colors(self):
+        return ['red' if q > 0 else 'black' for q in self.q]
+
+    def get_min_distance(self, x, y):
+        """Returns the distance from every (x, y) to its closest static particle"""
+
+        # Static particles sit on a regular grid, so the closest one is found by rounding
+        i = np.clip(np.rint(np.asarray(x) / self.D), 1, self.N)
+        j = np.clip(np.rint(np.asarray(y) / self.D), 0, self.N - 1)
+        return np.hypot(x - i * self.D, y - j * self.D)
+
+def get_force(x, y, q, k, lattice, chunk_frames=None):
+    """Returns (fx, fy) Coulomb force from the lattice on a charge q at every (x, y)"""
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if chunk_frames is None:
+        chunk_frames = max(1, DEFAULT_CHUNK_ELEMENTS // len(lattice))
+
+    fx = np.empty(len(x), dtype=np.float64)
+    fy = np.empty(len(x), dtype=np.float64)
+    for start in range(0, len(x), chunk_frames):
+        end = start + chunk_frames
+        dx = x[start:end, None] - lattice.x
+        dy = y[start:end, None] - lattice.y
+        dist = np.hypot(dx, dy)
+        # k * q * qj / r^2 along the unit vector (dx, dy) / r
+        fn = lattice.q / (dist * dist * dist)
+        fx[start:end] = (fn * dx).sum(axis=1)
+        fy[start:end] = (fn * dy).sum(axis=1)
+    return k * q * fx, k * q * fy
+
+def get_potential_energy(x, y, q, k, lattice, chunk_frames=None):
+    """Returns k * q * sum(qj / rj) for every position in (x, y)"""
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if chunk_frames is None:
+        chunk_frames = max(1, DEFAULT_CHUNK_ELEMENTS // len(lattice))
+
+    pot_energy = np.empty(len(x), dtype=np.float64)
+    for start in range(0, len(x), chunk_frames):
+        end = start + chunk_frames
+        dist = np.hypot(x[start:end, None] - lattice.x, y[start:end, None] - lattice.y)
+        pot_energy[start:end] = (lattice.q / dist).sum(axis=1)
+    return k * q * pot_energy
+
+def get_kinetic_energy(vx, vy, mass):
+    vx = np.asarray(vx, dtype=np.float64)
+    vy = np.asarray(vy, dtype=np.float64)
+    return 0.5 * mass * (vx * vx + vy * vy)
+
+def get_energies(frames, mass, k, q, lattice, chunk_frames=None):
+    """Returns (kinetic, potential, total) energy arrays for every frame
+
+    Parameters
+    ----------
+    frames : np.ndarray
+        Structured array with x, y, vx and vy fields
+    mass : float
+        Incident particle mass
+    k : float
+        Coulomb's constant
+    q : float
+        Incident particle charge
+    lattice : Lattice
+        Static particle lattice
+    chunk_frames : int
+        Frames evaluated at once, bounded by DEFAULT_CHUNK_ELEMENTS if None
+    """
+
+    kinetic = get_kinetic_energy(frames['vx'], frames['vy'], mass)
+    potential = get_potential_energy(frames['x'], frames['y'], q, k, lattice, chunk_frames)
+    return kinetic, potential, kinetic + potential
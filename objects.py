@@ -1,6 +1,7 @@
 import enum
 import math
 import statistics as sts
+import numpy as np
 
 class Particle1D(object):
     def __init__(self, id, x=0, vx=0,r=0, m=0):
@@ -191,17 +192,71 @@ class ParticleNode(object):
     def __repr__(self):
         return "Node{%s, next=%s}" % (self.particle, self.next)
 
+def get_plot_indexes(count, max_points=None):
+    """Returns at most max_points evenly spaced indexes of count samples, always keeping the first and last
+
+    Returns None when every sample fits, so series are not copied.
+    """
+
+    if max_points is None or count <= max_points:
+        return None
+    return np.unique(np.linspace(0, count - 1, max_points).round().astype(np.int64))
+
+def _compact_series(values, indexes, dtype):
+    if indexes is not None:
+        values = values[indexes]
+    return values.astype(dtype, copy=False)
+
 class AnalysisOsc(object):
+    __slots__ = ['algo', 'dt', 'time_vec', 'exact_sol', 'algo_sol', 'ecm']
+    # Series only used for plotting
+    PLOT_SERIES = ['time_vec', 'exact_sol', 'algo_sol']
+
     def __init__(self, algo, dt, time_vec, exact_sol, algo_sol, ecm):
+        """Returns the analysis of one oscillator run, series are stored as numpy arrays
+
+        Parameters
+        ----------
+        time_vec, exact_sol, algo_sol : np.ndarray
+            Time, analytic and simulated position of every printed step
+        ecm : float
+            Mean squared error of algo_sol
+        """
+
         self.algo = algo
         self.dt = dt
-        self.time_vec = time_vec
-        self.exact_sol = exact_sol
-        self.algo_sol = algo_sol
+        self.time_vec = np.asarray(time_vec)
+        self.exact_sol = np.asarray(exact_sol)
+        self.algo_sol = np.asarray(algo_sol)
         self.ecm = ecm
 
+    def compact(self, max_points=None, dtype=np.float64):
+        """Returns a copy with at most max_points samples per series, stored as dtype"""
+
+        indexes = get_plot_indexes(len(self.time_vec), max_points)
+        return AnalysisOsc(self.algo, self.dt, *[_compact_series(getattr(self, name), indexes, dtype) for name in self.PLOT_SERIES], self.ecm)
+
 class AnalysisRad(object):
-    def __init__(self, algo, dt, v0, init_energy, trajectory_total, energy_diff_sum, ending_motive, time_vec, energy_diff_vec, trajectory_sum_interdist, pos_x_list, pos_y_list):
+    __slots__ = ['algo', 'dt', 'v0', 'init_energy', 'trajectory_total', 'energy_diff_sum', 'ending_motive',
+                 'time_vec', 'energy_diff_vec', 'trajectory_sum_interdist', 'pos_x_list', 'pos_y_list', 'step_count', 'final_time']
+
+    def __init__(self, algo, dt, v0, init_energy, trajectory_total, energy_diff_sum, ending_motive, time_vec, energy_diff_vec, trajectory_sum_interdist, pos_x_list, pos_y_list, step_count=None, final_time=None):
+        """Returns the analysis of one radiation run, series are stored as numpy arrays
+
+        Parameters
+        ----------
+        time_vec : np.ndarray
+            Time of every kept step, the initial one included
+        energy_diff_vec : np.ndarray
+            |ET(0) - ET(t)| for time_vec[1:]
+        trajectory_sum_interdist, pos_x_list, pos_y_list : np.ndarray
+            Trajectory length and position at each time_vec
+        step_count : int
+            Steps of the whole run, len(time_vec) - 1 if None
+        final_time : float
+            Time of the last step of the run, time_vec[-1] if None
+        """
+
         self.algo = algo
         self.dt = dt
         self.v0 = v0
@@ -209,11 +264,166 @@ class AnalysisRad(object):
         self.trajectory_total = trajectory_total
         self.energy_diff_sum = energy_diff_sum
         self.ending_motive = ending_motive
-        self.time_vec = time_vec
-        self.energy_diff_vec = energy_diff_vec
-        self.trajectory_sum_interdist = trajectory_sum_interdist
-        self.pos_x_list = pos_x_list
-        self.pos_y_list = pos_y_list
+        self.time_vec = np.asarray(time_vec)
+        self.energy_diff_vec = np.asarray(energy_diff_vec)
+        self.trajectory_sum_interdist = np.asarray(trajectory_sum_interdist)
+        self.pos_x_list = np.asarray(pos_x_list)
+        self.pos_y_list = np.asarray(pos_y_list)
+        # Series may be decimated, so step count is kept apart
+        self.step_count = len(time_vec) - 1 if step_count is None else step_count
+        self.final_time = float(self.time_vec[-1]) if final_time is None else final_time
+
+    def compact(self, max_points=None, dtype=np.float64):
+        """Returns a copy with at most max_points samples per series, stored as dtype
+
+        Summary values are kept as they are, and energy_diff_vec stays aligned with time_vec[1:].
+        """
+
+        indexes = get_plot_indexes(len(self.time_vec), max_points)
+        # energy_diff_vec starts at the second step
+        diff_indexes = indexes[1:] - 1 if indexes is not None else None
+        return AnalysisRad(
+            self.algo, self.dt, self.v0, self.init_energy, self.trajectory_total, self.energy_diff_sum, self.ending_motive,
+            _compact_series(self.time_vec, indexes, dtype), _compact_series(self.energy_diff_vec, diff_indexes, dtype),
+            _compact_series(self.trajectory_sum_interdist, indexes, dtype), _compact_series(self.pos_x_list, indexes, dtype),
+            _compact_series(self.pos_y_list, indexes, dtype), self.step_count, self.final_time)
+
+class RadBatchResult(object):
+    __slots__ = ['r0', 'v0', 'ending_motives', 'step_count', 'final_time', 'trajectory_total', 'final_pos', 'final_vel']
+
+    def __init__(self, r0, v0, ending_motives, step_count, final_time, trajectory_total, final_pos, final_vel):
+        """Returns per particle results of a batched radiation simulation
+
+        Parameters
+        ----------
+        r0 : np.ndarray
+            Initial vertical position
+        v0 : np.ndarray
+            Initial horizontal speed
+        ending_motives : list
+            EndingReason per particle
+        step_count : np.ndarray
+            Steps integrated before ending
+        final_time : np.ndarray
+            Time of the last step
+        trajectory_total : np.ndarray
+            Trajectory length summed over every step
+        final_pos : np.ndarray
+            Last (x, y) per particle
+        final_vel : np.ndarray
+            Last (vx, vy) per particle
+        """
+
+        self.r0 = r0
+        self.v0 = v0
+        self.ending_motives = ending_motives
+        self.step_count = step_count
+        self.final_time = final_time
+        self.trajectory_total = trajectory_total
+        self.final_pos = final_pos
+        self.final_vel = final_vel
+
+    def subset(self, mask):
+        return RadBatchResult(
+            self.r0[mask], self.v0[mask], [e for e, keep in zip(self.ending_motives, mask) if keep],
+            self.step_count[mask], self.final_time[mask], self.trajectory_total[mask],
+            self.final_pos[mask], self.final_vel[mask])
+
+    def __len__(self):
+        return len(self.r0)
+
+class OscBatchResult(object):
+    __slots__ = ['algo', 'delta_t', 'step_count', 'final_time', 'final_pos', 'final_vel', 'ecm', 'ecm_dev', 'printed_count']
+
+    def __init__(self, algo, delta_t, step_count, final_time, final_pos, final_vel, ecm, ecm_dev, printed_count):
+        """Returns per oscillator results of a batched damped oscillator simulation
+
+        Parameters
+        ----------
+        algo : str
+            Algorithm used for every oscillator
+        delta_t : np.ndarray
+            Simulation timestep
+        step_count : np.ndarray
+            Steps integrated
+        final_time : np.ndarray
+            Time of the last step
+        final_pos : np.ndarray
+            Last position
+        final_vel : np.ndarray
+            Last speed
+        ecm : np.ndarray
+            Mean squared error against the analytic solution over printed steps
+        ecm_dev : np.ndarray
+            Standard deviation of the squared errors
+        printed_count : np.ndarray
+            Printed steps, the initial one included
+        """
+
+        self.algo = algo
+        self.delta_t = delta_t
+        self.step_count = step_count
+        self.final_time = final_time
+        self.final_pos = final_pos
+        self.final_vel = final_vel
+        self.ecm = ecm
+        self.ecm_dev = ecm_dev
+        self.printed_count = printed_count
+
+    def __len__(self):
+        return len(self.delta_t)
+
+class SeriesDecimator(object):
+    def __init__(self, names, max_points=None):
+        """Keeps every stride-th sample of several aligned series in bounded memory
+
+        When more than max_points samples are held, every other sample is dropped
+        and stride doubles, so the first sample is always kept. The last appended
+        sample is always returned too, so series end at the end of the run.
+
+        Parameters
+        ----------
+        names : list
+            Series names
+        max_points : int
+            Maximum samples kept per series, plus the last one. None keeps every sample
+        """
+
+        self.names = names
+        self.max_points = max_points
+        self.stride = 1
+        self.count = 0
+        self.chunks = {name: [] for name in names}
+        self.kept = 0
+        self.last = {}
+
+    def append(self, **values):
+        size = len(values[self.names[0]])
+        if size == 0:
+            return
+        for name in self.names:
+            self.last[name] = values[name][-1]
+        # First index in this chunk which is a multiple of stride
+        first = (-self.count) % self.stride
+        for name in self.names:
+            self.chunks[name].append(np.asarray(values[name])[first::self.stride].copy())
+        self.kept += len(range(first, size, self.stride))
+        self.count += size
+
+        while self.max_points is not None and self.kept > self.max_points:
+            for name in self.names:
+                self.chunks[name] = [np.concatenate(self.chunks[name])[::2]]
+            self.kept = len(self.chunks[self.names[0]][0])
+            self.stride *= 2
+
+    def __getitem__(self, name):
+        if len(self.chunks[name]) != 1:
+            self.chunks[name] = [np.concatenate(self.chunks[name]) if self.chunks[name] else np.empty(0)]
+        kept = self.chunks[name][0]
+        if self.count > 0 and (self.count - 1) % self.stride != 0:
+            # Last sample is off the stride, added on read so later appends keep their stride
+            return np.append(kept, self.last[name])
+        return kept
 
 
 class FullValue(object):
@@ -232,6 +442,112 @@ class FullValue(object):
     def __repr__(self):
         return "%s±%s" % (self.media, self.std)
 
+class EnsembleStats(object):
+    def __init__(self, series_list, truncate=True, time_list=None):
+        """Returns per index statistics of several ragged series
+
+        Series are packed into a padded array with a validity mask, so
+        count, mean, std and msd are computed for every index at once.
+
+        Parameters
+        ----------
+        series_list : list
+            One sequence of values per run
+        truncate : bool
+            If true stop at the shortest run, else keep going with the surviving runs
+        time_list : list
+            Optional sample times of each series. If given, every series is linearly
+            interpolated onto the times of the longest run, kept in self.time, so runs
+            sampled with different strides are compared at the same instants
+        """
+
+        self.time = None
+        if time_list is None:
+            self.values, self.mask = self._pack_by_index(series_list, truncate)
+        else:
+            self.time, self.values, self.mask = self._pack_by_time(time_list, series_list, truncate)
+
+        self.count = self.mask.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = self.values.sum(axis=0) / self.count
+            self.msd = (self.values * self.values).sum(axis=0) / self.count
+            # Two pass sample deviation, NaN where a single run survives
+            dev = np.where(self.mask, self.values - self.mean, 0.0)
+            self.std = np.sqrt((dev * dev).sum(axis=0) / (self.count - 1))
+        self.std[self.count < 2] = float("NaN")
+
+    def __len__(self):
+        return len(self.count)
+
+    @staticmethod
+    def _pack_by_index(series_list, truncate):
+        lengths = np.array([len(series) for series in series_list])
+        width = (lengths.min() if truncate else lengths.max()) if len(lengths) else 0
+
+        values = np.zeros((len(series_list), width), dtype=np.float64)
+        mask = np.arange(width) < lengths[:, None] if len(lengths) else np.zeros((0, 0), dtype=bool)
+        for i, series in enumerate(series_list):
+            used = min(lengths[i], width)
+            values[i, :used] = np.asarray(series[:used], dtype=np.float64)
+        return values, mask
+
+    @staticmethod
+    def _pack_by_time(time_list, series_list, truncate):
+        if len(time_list) != len(series_list):
+            raise ValueError(f'Got {len(time_list)} time vectors for {len(series_list)} series')
+        if len(series_list) == 0:
+            return np.empty(0), np.zeros((0, 0), dtype=np.float64), np.zeros((0, 0), dtype=bool)
+        time_list = [np.asarray(times, dtype=np.float64) for times in time_list]
+        starts = np.array([times[0] if len(times) else np.inf for times in time_list])
+        ends = np.array([times[-1] if len(times) else -np.inf for times in time_list])
+
+        # Decimation strides double with run length, so the longest run has the coarsest
+        # grid, and its times are also samples of the shorter runs with the same dt
+        time = time_list[int(np.argmax(ends))]
+        if truncate:
+            time = time[(time >= starts.max()) & (time <= ends.min())]
+
+        mask = (time >= starts[:, None]) & (time <= ends[:, None])
+        values = np.zeros((len(series_list), len(time)), dtype=np.float64)
+        for i, (times, series) in enumerate(zip(time_list, series_list)):
+            if len(times) != len(series):
+                raise ValueError(f'Series {i} has {len(series)} values for {len(times)} times')
+            if len(times):
+                values[i] = np.where(mask[i], np.interp(time, times, np.asarray(series, dtype=np.float64)), 0.0)
+        return time, values, mask
+
+class LinearFit(object):
+    def __init__(self, slope, intercept, slope_err, intercept_err, r2, sse, sxx):
+        """Returns a least squares fit of y = slope * x + intercept
+
+        Parameters
+        ----------
+        slope_err : float
+            Standard error of the slope
+        intercept_err : float
+            Standard error of the intercept, 0 for fits through the origin
+        r2 : float
+            Coefficient of determination
+        sse : float
+            Sum of squared residuals
+        sxx : float
+            Curvature of the error, SSE(c) = sse + sxx * (c - slope)^2
+        """
+
+        self.slope = slope
+        self.intercept = intercept
+        self.slope_err = slope_err
+        self.intercept_err = intercept_err
+        self.r2 = r2
+        self.sse = sse
+        self.sxx = sxx
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return "LinearFit{c=%.10E±%.2E, b=%.10E±%.2E, R2=%.6f, error=%.10E}" % (self.slope, self.slope_err, self.intercept, self.intercept_err, self.r2, self.sse)
+
 ###################### OLD ######################
 class IdDistance(object):
     def __init__(self, id, dist):
@@ -258,20 +574,23 @@ class IdDistance(object):
         return self.dist < other.dist
 
 class Metrics(object):
+    __slots__ = ['N', 'L', 'kinetic_energy', 'big_position_x_list', 'big_position_y_list', 'collision_count', 'collision_freq',
+                 'avg_intercollision_time', 'small_dcm_D', 'big_z_dist_list', 'big_z_dist_time_list', 'small_z_sq_dist_list', 'small_z_sq_dist_time_list']
+
     def __init__(self, N, L, kinetic_energy, big_position_x_list, big_position_y_list, collision_count, collision_freq, avg_intercollision_time, small_dcm_D, big_z_dist_list, big_z_dist_time_list, small_z_sq_dist_list, small_z_sq_dist_time_list):
         self.N = N
         self.L = L
         self.kinetic_energy = kinetic_energy
-        self.big_position_x_list = big_position_x_list
-        self.big_position_y_list = big_position_y_list
+        self.big_position_x_list = np.asarray(big_position_x_list, dtype=np.float64)
+        self.big_position_y_list = np.asarray(big_position_y_list, dtype=np.float64)
         self.collision_count = collision_count
         self.collision_freq = collision_freq
         self.avg_intercollision_time = avg_intercollision_time
         self.small_dcm_D = small_dcm_D
-        self.big_z_dist_list = big_z_dist_list
-        self.big_z_dist_time_list = big_z_dist_time_list
-        self.small_z_sq_dist_list = small_z_sq_dist_list
-        self.small_z_sq_dist_time_list = small_z_sq_dist_time_list
+        self.big_z_dist_list = np.asarray(big_z_dist_list, dtype=np.float64)
+        self.big_z_dist_time_list = np.asarray(big_z_dist_time_list, dtype=np.float64)
+        self.small_z_sq_dist_list = np.asarray(small_z_sq_dist_list, dtype=np.float64)
+        self.small_z_sq_dist_time_list = np.asarray(small_z_sq_dist_time_list, dtype=np.float64)
 
     def __str__(self):
         return self.__repr__()
@@ -280,7 +599,10 @@ class Metrics(object):
         return "%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s" % (self.N, self.L, self.kinetic_energy, "self.big_position_x_list", "self.big_position_y_list", self.collision_count, self.collision_freq, self.avg_intercollision_time, self.small_dcm_D, "self.big_z_dist_list", "self.big_z_dist_time_list")
 
 class Summary(object):
-    def __init__(self, metric_list, param, big_dcm=True):
+    __slots__ = ['param', 'N', 'L', 'last_kinetic_energy', 'big_position_x_list', 'big_position_y_list', 'collision_count', 'collision_freq',
+                 'avg_intercollision_time', 'small_dcm_D', 'kinetic_energy', 'big_dcm_list', 'big_dcm_time_list', 'small_dcm_list', 'small_dcm_time_list']
+
+    def __init__(self, metric_list, param, big_dcm=True, truncate=True):
         self.param = param
         collision_count_list = []
         collision_freq_list = []
@@ -320,51 +642,21 @@ class Summary(object):
         self.kinetic_energy = FullValue(sts.mean(kinetic_energy_list), sts.stdev(kinetic_energy_list))
 
         # Leave everything to calculate big_dcm_D from superlists
-        self.big_dcm_list = []
-        self.big_dcm_time_list = []
-        self.small_dcm_list = []
-        self.small_dcm_time_list = []
+        self.big_dcm_list = np.empty(0)
+        self.big_dcm_time_list = np.empty(0)
+        self.small_dcm_list = np.empty(0)
+        self.small_dcm_time_list = np.empty(0)
         if big_dcm:
-            self.build_big_dcm(big_z_dist_superlist, big_z_dist_time_superlist)
-            self.build_small_dcm(small_z_sq_dist_superlist, small_z_sq_dist_time_superlist)
+            self.build_big_dcm(big_z_dist_superlist, big_z_dist_time_superlist, truncate)
+            self.build_small_dcm(small_z_sq_dist_superlist, small_z_sq_dist_time_superlist, truncate)
     
-    def build_big_dcm(self, big_z_dist_superlist, big_z_dist_time_superlist):
-        big_collided = False
-        time_index = 0
-        while not big_collided:
-            big_z_dist_sq_sum = 0
-            cur_time_sum = 0
-            for i in range(len(big_z_dist_superlist)):
-                if time_index >= len(big_z_dist_superlist[i]):
-                    big_collided = True
-                    break
-                big_z_dist_sq_sum += big_z_dist_superlist[i][time_index] ** 2
-                cur_time_sum += big_z_dist_time_superlist[i][time_index]
-            
-            if not big_collided:
-                self.big_dcm_list.append(big_z_dist_sq_sum / len(big_z_dist_superlist))
-                self.big_dcm_time_list.append(cur_time_sum / len(big_z_dist_superlist))
-
-            time_index += 1        
-
-    def build_small_dcm(self, small_z_sq_dist_superlist, small_z_sq_dist_time_superlist):
-        small_collided = False
-        time_index = 0
-        while not small_collided:
-            small_z_dist_sq_sum = 0
-            cur_time_sum = 0
-            for i in range(len(small_z_sq_dist_superlist)):
-                if time_index >= len(small_z_sq_dist_superlist[i]):
-                    small_collided = True
-                    break
-                small_z_dist_sq_sum += small_z_sq_dist_superlist[i][time_index] # Already squared
-                cur_time_sum += small_z_sq_dist_time_superlist[i][time_index]
-            
-            if not small_collided:
-                self.small_dcm_list.append(small_z_dist_sq_sum / len(small_z_sq_dist_superlist))
-                self.small_dcm_time_list.append(cur_time_sum / len(small_z_sq_dist_superlist))
+    def build_big_dcm(self, big_z_dist_superlist, big_z_dist_time_superlist, truncate=True):
+        self.big_dcm_list = EnsembleStats(big_z_dist_superlist, truncate).msd
+        self.big_dcm_time_list = EnsembleStats(big_z_dist_time_superlist, truncate).mean
 
-            time_index += 1  
+    def build_small_dcm(self, small_z_sq_dist_superlist, small_z_sq_dist_time_superlist, truncate=True):
+        self.small_dcm_list = EnsembleStats(small_z_sq_dist_superlist, truncate).mean # Already squared
+        self.small_dcm_time_list = EnsembleStats(small_z_sq_dist_time_superlist, truncate).mean
 
     def __str__(self):
         return self.__repr__()
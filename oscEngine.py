@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import math
+import numpy as np
+
+import utils
+import objects as obj
+import dynamicLoader as loader
+
+ALGOS = ['Verlet', 'Beeman', 'Gear']
+
+# Same coefficients as algos.Gear
+GEAR_ALPHA = [3.0 / 16.0, 251.0 / 360, 1.0, 11.0 / 18.0, 1.0 / 6.0, 1.0 / 60.0]
+GEAR_ORDER = len(GEAR_ALPHA)
+
+# Printed steps buffered per oscillator before writing its dynamic file
+OUTPUT_CHUNK_STEPS = 4096
+
+def get_v0(mass, gamma, amp):
+    # Same as DampedOscillation
+    return -amp * gamma / (2.0 * mass)
+
+def get_total_steps(delta_t, tf):
+    # Same as algos.StepAlgorithm, Math.round rounds halves up
+    return np.floor(tf / delta_t + 0.5).astype(np.int64)
+
+def _force(r, v, k, gamma):
+    # Same as the DampedOscillation force (r, v) -> -k * r - gamma * v
+    return -k * r - gamma * v
+
+class _OutputBuffer(object):
+    def __init__(self, output_files, params):
+        """Buffers printed steps for every oscillator and writes each one's dynamic file in chunks"""
+
+        self.outputs = []
+        for filename, file_params in zip(output_files, params):
+            binary = filename.endswith('.bin')
+            output = open(filename, 'wb' if binary else 'w')
+            if binary:
+                loader.write_binary_header(output, loader.OSC_DTYPE, file_params)
+            self.outputs.append((output, binary))
+        count = len(self.outputs)
+        self.frames = np.empty((OUTPUT_CHUNK_STEPS, count), dtype=loader.OSC_DTYPE)
+        self.printed = np.zeros((OUTPUT_CHUNK_STEPS, count), dtype=bool)
+        self.rows = 0
+
+    def add(self, n, printed, time, pos, vel):
+        # Only the first n oscillators are still running
+        row = self.frames[self.rows]
+        row['t'][:n], row['x'][:n], row['vx'][:n] = time, pos, vel
+        self.printed[self.rows] = False
+        self.printed[self.rows, :n] = printed
+        self.rows += 1
+        if self.rows == OUTPUT_CHUNK_STEPS:
+            self.flush()
+
+    def flush(self):
+        for i, (output, binary) in enumerate(self.outputs):
+            frames = self.frames[:self.rows, i][self.printed[:self.rows, i]]
+            if binary:
+                loader.write_binary_frames(output, frames)
+            else:
+                loader.write_text_frames(output, frames)
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        for output, _binary in self.outputs:
+            output.close()
+
+def simulate_osc_batch(algo, delta_t, tf, mass, k, gamma, amp, r0, print_every=1, output_files=None):
+    """Integrates independent damped oscillators at once, with the same steps as algos.Verlet, algos.Beeman or algos.Gear
+
+    Every oscillator starts at r0 with v0 = -A * gamma / (2 * mass) and runs
+    round(tf / dt) steps. Each step follows the Java operation order, including
+    the Euler preceding step and lastTime += dt, so positions match the
+    simulation value for value. Each printed step is compared with the analytic
+    solution as it goes, so ECM does not need the trajectory in memory.
+
+    Parameters
+    ----------
+    algo : str
+        Verlet, Beeman or Gear, the same for the whole batch
+    delta_t, tf, mass, k, gamma, amp, r0 : float or np.ndarray
+        Oscillator params, broadcast together to one value per oscillator
+    print_every : int or np.ndarray
+        Steps between printed steps per oscillator. DampedOscillation prints by
+        time instead, which is the same when delta_t_print = delta_t_sim
+    output_files : list
+        Optional dynamic file per oscillator, binary if it ends with .bin
+    """
+
+    if algo not in ALGOS:
+        raise ValueError(f'Invalid algorithm {algo}, must be one of {ALGOS}')
+    delta_t, tf, mass, k, gamma, amp, r0, print_every = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(param, dtype=np.float64)) for param in (delta_t, tf, mass, k, gamma, amp, r0, print_every)])
+    print_every = print_every.astype(np.int64)
+    total_steps = get_total_steps(delta_t, tf)
+    count = len(total_steps)
+
+    # Longest runs first, so running oscillators are always a prefix and every step works on views
+    order = np.argsort(-total_steps, kind='stable')
+    delta_t, tf, mass, k, gamma, amp, r0, print_every, total_steps = [
+        np.array(param[order]) for param in (delta_t, tf, mass, k, gamma, amp, r0, print_every, total_steps)]
+    v0 = get_v0(mass, gamma, amp)
+    delta_t_sq = delta_t * delta_t
+
+    pos = r0.copy()
+    vel = v0.copy()
+    acc = _force(pos, vel, k, gamma) / mass
+
+    # Euler preceding step
+    prev_vel = vel - delta_t * acc
+    prev_pos = pos - delta_t * prev_vel + delta_t_sq * acc / 2.0
+    prev_acc = _force(prev_pos, prev_vel, k, gamma) / mass
+
+    if algo == 'Gear':
+        # Derivatives of the force are the force applied to the derivatives
+        r3 = _force(vel, acc, k, gamma) / mass
+        r4 = _force(acc, r3, k, gamma) / mass
+        r5 = _force(r3, r4, k, gamma) / mass
+        gear_r = [pos, vel, acc, r3, r4, r5]
+        # dt^k / k! like algos.Gear, numpy power rounds differently than Math.pow for some exponents
+        factors = [np.ones(count)] + [np.array([math.pow(dt, i) for dt in delta_t]) / math.factorial(i) for i in range(1, GEAR_ORDER)]
+
+    last_time = np.zeros(count)
+    # Welford running mean and squared deviation of printed squared errors
+    printed_count = np.zeros(count, dtype=np.int64)
+    ecm = np.zeros(count)
+    ecm_m2 = np.zeros(count)
+
+    # Same terms as analyzerFun.exact_solution, computed once
+    exact_decay = -(gamma / (2 * mass))
+    exact_omega = np.sqrt(k / mass - gamma * gamma / (4 * mass * mass))
+    every_step = bool(np.all(print_every == 1))
+
+    def track(n, printed):
+        t = last_time[:n]
+        sq_error = (pos[:n] - amp[:n] * np.exp(exact_decay[:n] * t) * np.cos(exact_omega[:n] * t)) ** 2
+        if every_step:
+            printed_count[:n] += 1
+            delta = sq_error - ecm[:n]
+            ecm[:n] += delta / printed_count[:n]
+            ecm_m2[:n] += delta * (sq_error - ecm[:n])
+            return
+        new_count = printed_count[:n] + printed
+        delta = sq_error - ecm[:n]
+        new_ecm = ecm[:n] + delta / np.maximum(new_count, 1)
+        ecm_m2[:n] = np.where(printed, ecm_m2[:n] + delta * (sq_error - new_ecm), ecm_m2[:n])
+        ecm[:n] = np.where(printed, new_ecm, ecm[:n])
+        printed_count[:n] = new_count
+
+    output = None
+    if output_files is not None:
+        params = [[mass[i], k[i], gamma[i], tf[i], r0[i], amp[i], delta_t[i], delta_t[i] * print_every[i]] for i in range(count)]
+        output = _OutputBuffer([output_files[i] for i in order], params)
+        output.add(count, True, last_time, pos, vel)
+    track(count, True)
+
+    steps = 0
+    n = count
+    while n > 0:
+        dt, dt_sq, m, kn, gn = delta_t[:n], delta_t_sq[:n], mass[:n], k[:n], gamma[:n]
+        cur_pos, cur_vel, cur_acc = pos[:n], vel[:n], acc[:n]
+
+        if algo == 'Verlet':
+            # Calculate x(t+dt)
+            next_pos = 2 * cur_pos - prev_pos[:n] + dt_sq * cur_acc
+            # Calculate v(t+dt)
+            next_vel = (next_pos - prev_pos[:n]) / (2 * dt)
+            # Estimate a(t+dt) using x(t+dt) and v(t+dt)
+            next_acc = _force(next_pos, next_vel, kn, gn) / m
+        elif algo == 'Beeman':
+            cur_prev_acc = prev_acc[:n]
+            # Calculate x(t+dt)
+            next_pos = cur_pos + cur_vel * dt + 2.0 / 3.0 * cur_acc * dt_sq - 1.0 / 6.0 * cur_prev_acc * dt_sq
+            # Predict v(t+dt)
+            next_vel = cur_vel + 3.0 / 2.0 * cur_acc * dt - 1.0 / 2.0 * cur_prev_acc * dt
+            # Estimate a(t+dt) using x(t+dt) and predicted v(t+dt)
+            next_acc = _force(next_pos, next_vel, kn, gn) / m
+            # Correct v(t+dt)
+            next_vel = cur_vel + 1.0 / 3.0 * next_acc * dt + 5.0 / 6.0 * cur_acc * dt - 1.0 / 6.0 * cur_prev_acc * dt
+        else:
+            # Predict each r, summed in the same order as algos.Gear
+            predicted = []
+            for j in range(GEAR_ORDER):
+                value = np.zeros(n)
+                for i in range(j, GEAR_ORDER):
+                    value += gear_r[i][:n] * factors[i - j][:n]
+                predicted.append(value)
+            # Estimation Delta R2
+            delta_r2 = (_force(predicted[0], predicted[1], kn, gn) / m - predicted[2]) * factors[2][:n]
+            # Correct every r
+            for i in range(GEAR_ORDER):
+                gear_r[i][:n] = predicted[i] + GEAR_ALPHA[i] * delta_r2 / factors[i][:n]
+            next_pos, next_vel, next_acc = gear_r[0][:n], gear_r[1][:n], gear_r[2][:n]
+
+        # Update window and lastTime, Gear keeps its own derivatives instead
+        if algo != 'Gear':
+            prev_pos[:n], prev_acc[:n] = cur_pos, cur_acc
+        pos[:n], vel[:n], acc[:n] = next_pos, next_vel, next_acc
+        last_time[:n] += dt
+        steps += 1
+
+        printed = steps % print_every[:n] == 0
+        track(n, printed)
+        if output is not None:
+            output.add(n, printed, last_time[:n], pos[:n], vel[:n])
+        # Oscillators that reached their total steps leave the running prefix
+        while n > 0 and total_steps[n - 1] <= steps:
+            n -= 1
+
+    if output is not None:
+        output.close()
+
+    ecm_dev = np.sqrt(ecm_m2 / np.maximum(printed_count - 1, 1))
+    unsort = np.argsort(order, kind='stable')
+    return obj.OscBatchResult(
+        algo, delta_t[unsort], total_steps[unsort], last_time[unsort], pos[unsort], vel[unsort],
+        ecm[unsort], ecm_dev[unsort], printed_count[unsort])
+
+######################################################################################
+
+def get_dynamic_filename(output_dir, algo, delta_t, extension='.bin'):
+    # Same naming as damped-osc with -Dalgo and -Ddt
+    return os.path.join(output_dir, f'{algo.upper()}-{delta_t:.10E}{extension}')
+
+if __name__ == "__main__":
+    output_dir = sys.argv[1] if len(sys.argv) >= 2 else None
+
+    # Read params from config.json
+    with open("config.json") as file:
+        config = json.load(file)
+
+    if "osc" not in config:
+        utils.invalid_param("osc")
+
+    delta_t_sim = utils.read_config_param(
+        config, "delta_t_sim", lambda el : float(el), lambda el : el > 0)
+    delta_t_print = utils.read_config_param(
+        config, "delta_t_print", lambda el : float(el), lambda el : el > 0)
+    mass = utils.read_config_param(
+        config["osc"], "mass", lambda el : float(el), lambda el : el > 0)
+    k = utils.read_config_param(
+        config["osc"], "k", lambda el : float(el), lambda el : el > 0)
+    gamma = utils.read_config_param(
+        config["osc"], "gamma", lambda el : float(el), lambda el : el > 0)
+    tf = utils.read_config_param(
+        config["osc"], "tf", lambda el : float(el), lambda el : el > 0)
+    r0 = utils.read_config_param(
+        config["osc"], "r0", lambda el : float(el), lambda el : True)
+    amp = utils.read_config_param(
+        config["osc"], "A", lambda el : float(el), lambda el : el > 0)
+
+    print_every = max(1, round(delta_t_print / delta_t_sim))
+    # Every algorithm with the config params
+    for algo in ALGOS:
+        output_files = [get_dynamic_filename(output_dir, algo, delta_t_sim)] if output_dir is not None else None
+        result = simulate_osc_batch(algo, delta_t_sim, tf, mass, k, gamma, amp, r0, print_every, output_files)
+        print(f'ECM for {algo} with dt {delta_t_sim:.10E} = {result.ecm[0]:.10E}, dev = {result.ecm_dev[0]:.10E}')
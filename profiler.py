@@ -0,0 +1,266 @@
+import os
+import sys
+import glob
+import json
+import time
+import pstats
+import hashlib
+import cProfile
+import contextlib
+
+import utils
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is not reported there
+    resource = None
+
+# Setting these enables profiling without touching config.json
+ENV_DIR = 'SDS_PROFILE_DIR'
+ENV_CPROFILE = 'SDS_PROFILE_CPROFILE'
+
+REPORT_EXTENSION = '.json'
+CPROFILE_EXTENSION = '.prof'
+SUMMARY_FILENAME = 'summary.json'
+# Hex digits of the path hash in report names
+PATH_HASH_DIGITS = 8
+# Functions printed from the merged cProfile dumps
+TOP_FUNCTIONS = 20
+
+def get_peak_rss_mb():
+    """Returns the peak resident set size of this process so far in MB, None if unknown"""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+def _rate(frames, seconds):
+    return frames / seconds if seconds > 0 else None
+
+class FileProfile(object):
+    def __init__(self, report_filename, cprofile_filename, dynamic_filename, kind):
+        """Phase timings of one analyzed file, written as JSON when stopped
+
+        Phases are accumulated, so a phase entered once per chunk reports its
+        total time and frames over the whole file.
+        """
+
+        self.report_filename = report_filename
+        self.cprofile_filename = cprofile_filename
+        self.dynamic_filename = dynamic_filename
+        self.kind = kind
+        self.phases = {}
+        self.frames = 0
+        self.start_time = None
+        self.cprofile = None
+
+    def start(self):
+        if self.cprofile_filename is not None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.start_time = time.perf_counter()
+
+    def count_frames(self, count):
+        self.frames += count
+
+    def add(self, name, seconds, frames=0):
+        phase = self.phases.setdefault(name, {'seconds': 0.0, 'frames': 0})
+        phase['seconds'] += seconds
+        phase['frames'] += frames
+
+    @contextlib.contextmanager
+    def phase(self, name, frames=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, frames)
+
+    def timed_iter(self, name, iterable):
+        """Yields every chunk of iterable, timing the wait for each one as phase name
+
+        Chunk lengths are counted as the frames of the file.
+        """
+
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start, len(chunk))
+            self.count_frames(len(chunk))
+            yield chunk
+
+    def stop(self):
+        """Writes the report, and the cProfile dump if enabled, returns the report"""
+
+        seconds = time.perf_counter() - self.start_time
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_filename)
+        report = {
+            'file': self.dynamic_filename,
+            'kind': self.kind,
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'frames': self.frames,
+            'frames_per_second': _rate(self.frames, seconds),
+            # Process wide, a worker reports the peak over every file it analyzed so far
+            'peak_rss_mb': get_peak_rss_mb(),
+            'phases': {name: dict(phase, frames_per_second=_rate(phase['frames'], phase['seconds'])) for name, phase in self.phases.items()}
+        }
+        with open(self.report_filename, 'w') as report_file:
+            json.dump(report, report_file, indent=4)
+        return report
+
+def get_report_name(dynamic_filename):
+    """Returns the report name of dynamic_filename, without extension
+
+    Sweeps write files with the same name to different directories, so a hash
+    of the absolute path follows the file name to keep their reports apart.
+    """
+
+    path_hash = hashlib.sha256(os.path.abspath(dynamic_filename).encode()).hexdigest()[:PATH_HASH_DIGITS]
+    return f'{os.path.basename(dynamic_filename)}-{path_hash}'
+
+class _DisabledProfile(object):
+    # Same interface as FileProfile, does nothing
+    def start(self):
+        pass
+
+    def count_frames(self, count):
+        pass
+
+    def add(self, name, seconds, frames=0):
+        pass
+
+    def phase(self, name, frames=0):
+        return contextlib.nullcontext()
+
+    def timed_iter(self, name, iterable):
+        return iterable
+
+    def stop(self):
+        return None
+
+DISABLED = _DisabledProfile()
+
+class Profiler(object):
+    def __init__(self, profile_dir, cprofile=False):
+        """Writes one JSON report per analyzed file to profile_dir
+
+        Parameters
+        ----------
+        profile_dir : str
+            Directory holding the reports, created if missing
+        cprofile : bool
+            If true, a cProfile dump is also written next to each report
+        """
+
+        self.profile_dir = profile_dir
+        self.cprofile = cprofile
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def open_file(self, dynamic_filename, kind):
+        """Returns the started FileProfile of dynamic_filename"""
+
+        base = os.path.join(self.profile_dir, get_report_name(dynamic_filename))
+        profile = FileProfile(base + REPORT_EXTENSION, base + CPROFILE_EXTENSION if self.cprofile else None, dynamic_filename, kind)
+        profile.start()
+        return profile
+
+def open_file(profiler, dynamic_filename, kind):
+    """Returns the started FileProfile of dynamic_filename, DISABLED if profiler is None"""
+
+    if profiler is None:
+        return DISABLED
+    return profiler.open_file(dynamic_filename, kind)
+
+def from_config(analysis_config):
+    """Returns the Profiler set in the environment or the analysis config, None if profiling is off
+
+    SDS_PROFILE_DIR and SDS_PROFILE_CPROFILE take precedence over profile_dir and profile_cprofile.
+    """
+
+    profile_dir = os.environ.get(ENV_DIR) or utils.read_optional_config_param(
+        analysis_config, "profile_dir", lambda el : el, lambda el : len(el) > 0, None)
+    if profile_dir is None:
+        return None
+    if ENV_CPROFILE in os.environ:
+        cprofile = os.environ[ENV_CPROFILE] not in ('', '0')
+    else:
+        cprofile = utils.read_optional_config_param(
+            analysis_config, "profile_cprofile", lambda el : bool(el), lambda el : True, False)
+    return Profiler(profile_dir, cprofile)
+
+def summarize(profile_dir):
+    """Returns totals per kind and phase over every report in profile_dir, and the reports by descending time"""
+
+    reports = []
+    for filename in sorted(glob.glob(os.path.join(profile_dir, '*' + REPORT_EXTENSION))):
+        if os.path.basename(filename) == SUMMARY_FILENAME:
+            continue
+        with open(filename) as report_file:
+            reports.append(json.load(report_file))
+    reports.sort(key=lambda report: report['seconds'], reverse=True)
+
+    kinds = {}
+    for report in reports:
+        total = kinds.setdefault(report['kind'], {'files': 0, 'seconds': 0.0, 'frames': 0, 'peak_rss_mb': None, 'phases': {}})
+        total['files'] += 1
+        total['seconds'] += report['seconds']
+        total['frames'] += report['frames']
+        if report['peak_rss_mb'] is not None:
+            total['peak_rss_mb'] = max(total['peak_rss_mb'] or 0.0, report['peak_rss_mb'])
+        for name, phase in report['phases'].items():
+            phase_total = total['phases'].setdefault(name, {'seconds': 0.0, 'frames': 0})
+            phase_total['seconds'] += phase['seconds']
+            phase_total['frames'] += phase['frames']
+
+    for total in kinds.values():
+        total['frames_per_second'] = _rate(total['frames'], total['seconds'])
+        for phase in total['phases'].values():
+            phase['share'] = phase['seconds'] / total['seconds'] if total['seconds'] > 0 else None
+            phase['frames_per_second'] = _rate(phase['frames'], phase['seconds'])
+    return {'kinds': kinds, 'files': reports}
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2:
+        profile_dir = sys.argv[1]
+    else:
+        # Read params from config.json
+        with open("config.json") as file:
+            config = json.load(file)
+        profiler = from_config(config.get("analysis", {}))
+        if profiler is None:
+            print('Run with python3 profiler.py [profile_dir], or set profile_dir in the analysis config')
+            sys.exit(1)
+        profile_dir = profiler.profile_dir
+
+    summary = summarize(profile_dir)
+    if len(summary['files']) == 0:
+        print(f'No reports found in {profile_dir}')
+        sys.exit(1)
+    summary_filename = os.path.join(profile_dir, SUMMARY_FILENAME)
+    with open(summary_filename, 'w') as summary_file:
+        json.dump(summary, summary_file, indent=4)
+
+    for kind, total in summary['kinds'].items():
+        rss = f'{total["peak_rss_mb"]:.1f} MB' if total['peak_rss_mb'] is not None else 'unknown'
+        print(f'{kind}: {total["files"]} files, {total["seconds"]:.3f} s, {total["frames"]} frames, peak RSS {rss}')
+        for name, phase in sorted(total['phases'].items(), key=lambda item: item[1]['seconds'], reverse=True):
+            print(f'    {name:<12} {phase["seconds"]:12.3f} s {phase["share"] or 0.0:8.1%}')
+    print(f'\nSlowest file: {summary["files"][0]["file"]} ({summary["files"][0]["seconds"]:.3f} s)')
+    print(f'Summary written to {summary_filename}')
+
+    # Every dump merged, the functions where the analysis time goes
+    dumps = sorted(glob.glob(os.path.join(profile_dir, '*' + CPROFILE_EXTENSION)))
+    if len(dumps) > 0:
+        print()
+        pstats.Stats(*dumps).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
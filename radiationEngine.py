@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import statistics as sts
+import numpy as np
+
+import utils
+import lattice as lat
+import objects as obj
+import dynamicLoader as loader
+
+# Same bounds as algos2D.StepAlgorithm: walls at x = 0, N * D and y = 0, (N - 1) * D
+def get_box(N, D):
+    return N * D, (N - 1) * D
+
+def random_r0(count, N, D, rng):
+    # Same range as RadiationInteraction, centered around the lattice middle row
+    range_min = (N - 1) * D / 2 - D
+    range_max = (N - 1) * D / 2 + D
+    return range_min + (range_max - range_min) * rng.random(count)
+
+def get_ending_codes(x, y, N, D, static_lattice):
+    # Same check order as algos2D.StepAlgorithm.hasNext
+    max_x, max_y = get_box(N, D)
+    d_cut = 0.01 * D
+    codes = np.full(len(x), obj.EndingReason.NotEnded.value)
+    codes = np.where(static_lattice.get_min_distance(x, y) < d_cut, obj.EndingReason.Collision.value, codes)
+    codes = np.where(y <= 0.0, obj.EndingReason.BottomWall.value, codes)
+    codes = np.where(y >= max_y, obj.EndingReason.TopWall.value, codes)
+    codes = np.where(x <= 0.0, obj.EndingReason.LeftWall.value, codes)
+    codes = np.where(x >= max_x, obj.EndingReason.RightWall.value, codes)
+    return codes
+
+def _get_acc(pos, inv_mass, k, Q, static_lattice):
+    fx, fy = lat.get_force(pos[:, 0], pos[:, 1], Q, k, static_lattice)
+    return np.column_stack((fx * inv_mass, fy * inv_mass))
+
+def _open_outputs(output_files, mass, k, N, D, Q, v0, r0, delta_t, print_every):
+    outputs = []
+    for i, filename in enumerate(output_files):
+        binary = filename.endswith('.bin')
+        output = open(filename, 'wb' if binary else 'w')
+        if binary:
+            loader.write_binary_header(output, loader.RAD_DTYPE, [mass, k, N, D, Q, v0[i], r0[i], delta_t, delta_t * print_every])
+        outputs.append((output, binary))
+    return outputs
+
+def _write_frames(outputs, indexes, time, pos, vel):
+    frames = np.empty(len(indexes), dtype=loader.RAD_DTYPE)
+    frames['t'] = time
+    frames['x'], frames['y'] = pos[indexes, 0], pos[indexes, 1]
+    frames['vx'], frames['vy'] = vel[indexes, 0], vel[indexes, 1]
+    for frame, i in zip(frames, indexes):
+        output, binary = outputs[i]
+        if binary:
+            loader.write_binary_frames(output, frame.reshape(1))
+        else:
+            loader.write_text_frames(output, frame.reshape(1))
+
+def simulate_rad_batch(r0, v0, delta_t, mass, k, N, D, Q, print_every=1, output_files=None, max_steps=None):
+    """Integrates independent incident particles with Beeman at once, as algos2D.Beeman does for one
+
+    Every particle starts at (0, r0) with velocity (v0, 0), bootstraps with an
+    Euler preceding step and freezes once it crosses a wall or gets closer than
+    dCut = 0.01 * D to a static particle.
+
+    Parameters
+    ----------
+    r0 : np.ndarray
+        Initial vertical position per particle
+    v0 : np.ndarray
+        Initial horizontal speed per particle
+    print_every : int
+        Steps between frames written to output_files
+    output_files : list
+        Optional dynamic file per particle, binary if it ends with .bin
+    max_steps : int
+        Optional step limit, particles still running end as NotEnded
+    """
+
+    r0 = np.asarray(r0, dtype=np.float64)
+    v0 = np.broadcast_to(np.asarray(v0, dtype=np.float64), r0.shape)
+    count = len(r0)
+    static_lattice = lat.Lattice(N, D, Q)
+    inv_mass = 1 / mass
+    delta_t_sq = delta_t * delta_t
+
+    pos = np.column_stack((np.zeros(count), r0))
+    vel = np.column_stack((v0, np.zeros(count)))
+    acc = _get_acc(pos, inv_mass, k, Q, static_lattice)
+
+    # Euler preceding step
+    prev_vel = vel - acc * delta_t
+    prev_pos = (pos - prev_vel * delta_t) + acc * (delta_t_sq / 2.0)
+    prev_acc = _get_acc(prev_pos, inv_mass, k, Q, static_lattice)
+
+    ending_codes = np.zeros(count, dtype=int)
+    step_count = np.zeros(count, dtype=int)
+    final_time = np.zeros(count)
+    trajectory_total = np.zeros(count)
+
+    outputs = None
+    if output_files is not None:
+        outputs = _open_outputs(output_files, mass, k, N, D, Q, v0, r0, delta_t, print_every)
+        _write_frames(outputs, np.arange(count), 0.0, pos, vel)
+
+    last_time = 0.0
+    steps = 0
+    active = np.arange(count)
+    while len(active) > 0 and (max_steps is None or steps < max_steps):
+        cur_pos, cur_vel, cur_acc, cur_prev_acc = pos[active], vel[active], acc[active], prev_acc[active]
+
+        # Calculate x(t+dt)
+        next_pos = ((cur_pos + cur_vel * delta_t) + cur_acc * (2.0 / 3.0 * delta_t_sq)) - cur_prev_acc * (1.0 / 6.0 * delta_t_sq)
+        # Calculate a(t+dt) using x(t+dt)
+        next_acc = _get_acc(next_pos, inv_mass, k, Q, static_lattice)
+        # Calculate v(t+dt)
+        next_vel = ((cur_vel + next_acc * (1.0 / 3.0 * delta_t)) + cur_acc * (5.0 / 6.0 * delta_t)) - cur_prev_acc * (1.0 / 6.0 * delta_t)
+
+        trajectory_total[active] += np.hypot(next_pos[:, 0] - cur_pos[:, 0], next_pos[:, 1] - cur_pos[:, 1])
+        prev_acc[active] = cur_acc
+        pos[active], vel[active], acc[active] = next_pos, next_vel, next_acc
+        last_time += delta_t
+        steps += 1
+        step_count[active] = steps
+        final_time[active] = last_time
+
+        codes = get_ending_codes(next_pos[:, 0], next_pos[:, 1], N, D, static_lattice)
+        ended = codes != obj.EndingReason.NotEnded.value
+        ending_codes[active[ended]] = codes[ended]
+
+        if outputs is not None:
+            # Always keep the last frame so analysis sees the ending position
+            written = active if steps % print_every == 0 else active[ended]
+            _write_frames(outputs, written, last_time, pos, vel)
+        active = active[~ended]
+
+    if outputs is not None:
+        for output, _binary in outputs:
+            output.close()
+
+    ending_motives = [obj.EndingReason(code) for code in ending_codes]
+    return obj.RadBatchResult(r0, np.array(v0), ending_motives, step_count, final_time, trajectory_total, pos, vel)
+
+######################################################################################
+
+def run_v0_sweep(v0_list, rep, delta_t, mass, k, N, D, Q, seed=None, output_dir=None, algo='BEEMAN'):
+    """Runs rep particles per v0 in a single batch, returns {v0: RadBatchResult}"""
+
+    rng = np.random.default_rng(seed)
+    v0 = np.repeat(np.asarray(v0_list, dtype=np.float64), rep)
+    r0 = random_r0(len(v0), N, D, rng)
+
+    output_files = None
+    if output_dir is not None:
+        # Same naming as radiation-interaction with -Ddt, -Dv0 and -DdynamicSuf=_i
+        output_files = [os.path.join(output_dir, f'{algo}_{delta_t:.5E}_{int(v)}_{i % rep + 1}.bin') for i, v in enumerate(v0)]
+
+    result = simulate_rad_batch(r0, v0, delta_t, mass, k, N, D, Q, output_files=output_files)
+    return {v: result.subset(v0 == v) for v in v0_list}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print('Run with python3 radiationEngine.py v0_step rep [output_dir]')
+        sys.exit(1)
+    v0_step = float(sys.argv[1])
+    rep = int(sys.argv[2])
+    output_dir = sys.argv[3] if len(sys.argv) >= 4 else None
+
+    # Read params from config.json
+    with open("config.json") as file:
+        config = json.load(file)
+
+    if "rad" not in config:
+        utils.invalid_param("rad")
+
+    delta_t = utils.read_config_param(
+        config, "delta_t_sim", lambda el : float(el), lambda el : el > 0)
+    mass = utils.read_config_param(
+        config["rad"], "mass", lambda el : float(el), lambda el : el > 0)
+    k = utils.read_config_param(
+        config["rad"], "k", lambda el : float(el), lambda el : el > 0)
+    N = utils.read_config_param(
+        config["rad"], "N", lambda el : int(el), lambda el : el > 0)
+    D = utils.read_config_param(
+        config["rad"], "D", lambda el : float(el), lambda el : el > 0)
+    Q = utils.read_config_param(
+        config["rad"], "Q", lambda el : float(el), lambda el : el > 0)
+    use_seed = utils.read_config_param(
+        config["rad"], "use_seed", lambda el : bool(el), lambda el : True)
+    seed = utils.read_config_param(
+        config["rad"], "seed", lambda el : int(el), lambda el : el > 0) if use_seed else None
+
+    # Same v0 range as multipleV0.sh
+    v0_list = list(np.arange(10e3, 100e3 + v0_step / 2, v0_step))
+    results = run_v0_sweep(v0_list, rep, delta_t, mass, k, N, D, Q, seed, output_dir)
+
+    for v0, result in results.items():
+        ending_dict = {reason: 0 for reason in obj.EndingReason if reason != obj.EndingReason.NotEnded}
+        for ending_motive in result.ending_motives:
+            if ending_motive in ending_dict:
+                ending_dict[ending_motive] += 1
+        l_tot_list = result.trajectory_total.tolist()
+        step_list = result.step_count.tolist()
+        l_tot = obj.FullValue(sts.mean(l_tot_list), sts.stdev(l_tot_list)) if rep > 1 else l_tot_list[0]
+        steps = obj.FullValue(sts.mean(step_list), sts.stdev(step_list)) if rep > 1 else step_list[0]
+        print(f'V0 = {v0} ; dt = {delta_t}\n'
+              f'L total = {l_tot}\n'
+              f'Steps = {steps}\n'
+              f'Ending dictionary: {ending_dict}\n')
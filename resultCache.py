@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+import utils
+import objects as obj
+
+# Bump when analysis results change, so old entries are never read
+CACHE_VERSION = 3
+CACHE_EXTENSION = '.npz'
+DEFAULT_MAX_MB = 1024
+# Bytes read at once when hashing file contents
+HASH_CHUNK_BYTES = 1 << 20
+
+RAD_SERIES = ['time_vec', 'energy_diff_vec', 'trajectory_sum_interdist', 'pos_x_list', 'pos_y_list']
+OSC_SERIES = ['time_vec', 'exact_sol', 'algo_sol']
+
+def _hash_content(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _rad_to_arrays(metric):
+    arrays = {name: np.asarray(getattr(metric, name), dtype=np.float64) for name in RAD_SERIES}
+    arrays['algo'] = np.array(metric.algo)
+    arrays['scalars'] = np.array([metric.dt, metric.v0, metric.init_energy, metric.trajectory_total, metric.energy_diff_sum, metric.final_time], dtype=np.float64)
+    arrays['counts'] = np.array([metric.ending_motive.value, metric.step_count], dtype=np.int64)
+    return arrays
+
+def _rad_from_arrays(arrays):
+    dt, v0, init_energy, trajectory_total, energy_diff_sum, final_time = arrays['scalars'].tolist()
+    ending_value, step_count = arrays['counts'].tolist()
+    return obj.AnalysisRad(
+        str(arrays['algo']), dt, v0, init_energy, trajectory_total, energy_diff_sum, obj.EndingReason(ending_value),
+        *[arrays[name] for name in RAD_SERIES], step_count, final_time)
+
+def _osc_to_arrays(metric):
+    arrays = {name: np.asarray(getattr(metric, name), dtype=np.float64) for name in OSC_SERIES}
+    arrays['algo'] = np.array(metric.algo)
+    arrays['scalars'] = np.array([metric.dt, metric.ecm], dtype=np.float64)
+    return arrays
+
+def _osc_from_arrays(arrays):
+    dt, ecm = arrays['scalars'].tolist()
+    return obj.AnalysisOsc(str(arrays['algo']), dt, *[arrays[name] for name in OSC_SERIES], ecm)
+
+CONVERTERS = {
+    'rad': (_rad_to_arrays, _rad_from_arrays),
+    'osc': (_osc_to_arrays, _osc_from_arrays)
+}
+
+class ResultCache(object):
+    def __init__(self, cache_dir, max_mb=DEFAULT_MAX_MB, hash_content=False):
+        """On disk cache of AnalysisRad and AnalysisOsc results, one .npz file per analyzed file and params
+
+        Entries are keyed on the dynamic file identity and the analysis params, so
+        a rewritten file or different params never hit an old entry. Reading an
+        entry marks it as recently used, and the least recently used entries are
+        deleted once the cache is over max_mb. Safe to share between processes.
+
+        Parameters
+        ----------
+        cache_dir : str
+            Directory holding the entries, created if missing
+        max_mb : float
+            Max total size of the entries in MB
+        hash_content : bool
+            If true, files are identified by a hash of their content instead of
+            their path, size and modification time. Slower, but survives copies
+        """
+
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1e6)
+        self.hash_content = hash_content
+        os.makedirs(cache_dir, exist_ok=True)
+        # max_mb may be lower than the last time this cache was used
+        self.evict()
+
+    def get_key(self, kind, dynamic_filename, params):
+        if self.hash_content:
+            identity = {'content': _hash_content(dynamic_filename)}
+        else:
+            stat = os.stat(dynamic_filename)
+            identity = {'path': os.path.abspath(dynamic_filename), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        key_data = json.dumps({'version': CACHE_VERSION, 'kind': kind, 'file': identity, 'params': params}, sort_keys=True)
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def get_filename(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_EXTENSION)
+
+    def load(self, kind, key):
+        """Returns the cached result, None if there is no entry"""
+
+        filename = self.get_filename(key)
+        try:
+            with np.load(filename, allow_pickle=False) as entry:
+                result = CONVERTERS[kind][1](entry)
+            # Modification time tracks last use
+            os.utime(filename)
+        except (OSError, ValueError, KeyError):
+            # Missing, evicted by another process or torn
+            return None
+        return result
+
+    def store(self, kind, key, result):
+        filename = self.get_filename(key)
+        # Written under a temporary name, so readers never see a partial entry
+        partial_filename = f'{filename}.{os.getpid()}.partial'
+        with open(partial_filename, 'wb') as entry_file:
+            np.savez(entry_file, **CONVERTERS[kind][0](result))
+        os.replace(partial_filename, filename)
+        self.evict()
+
+    def get_or_compute(self, kind, dynamic_filename, params, compute_fun):
+        """Returns the cached result for dynamic_filename and params, computing and storing it on a miss
+
+        Parameters
+        ----------
+        kind : str
+            'rad' or 'osc'
+        params : dict
+            Every param the result depends on, JSON serializable
+        compute_fun : function
+            Called with no arguments on a miss, returns AnalysisRad or AnalysisOsc
+        """
+
+        key = self.get_key(kind, dynamic_filename, params)
+        result = self.load(kind, key)
+        if result is None:
+            result = compute_fun()
+            self.store(kind, key, result)
+        return result
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(CACHE_EXTENSION):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for _mtime, size, _path in entries)
+        # Least recently used first
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_EXTENSION):
+                os.remove(entry.path)
+
+def from_config(analysis_config):
+    """Returns the ResultCache set in the analysis config, None if cache_dir is not set"""
+
+    cache_dir = utils.read_optional_config_param(
+        analysis_config, "cache_dir", lambda el : el, lambda el : len(el) > 0, None)
+    if cache_dir is None:
+        return None
+    max_mb = utils.read_optional_config_param(
+        analysis_config, "cache_max_mb", lambda el : float(el), lambda el : el > 0, DEFAULT_MAX_MB)
+    hash_content = utils.read_optional_config_param(
+        analysis_config, "cache_hash_content", lambda el : bool(el), lambda el : True, False)
+    return ResultCache(cache_dir, max_mb, hash_content)
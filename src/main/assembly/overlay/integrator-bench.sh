@@ -0,0 +1,3 @@
+#!/bin/bash
+
+java "$@" -cp 'target/tp4-simu-1.0/lib/jars/*:lib/jars/*' "ar.edu.itba.sds.bench.IntegratorBenchmark"
@@ -3,6 +3,10 @@ package ar.edu.itba.sds;
 import ar.edu.itba.sds.algos.StepAlgorithm;
 import ar.edu.itba.sds.objects.AlgorithmType;
 import ar.edu.itba.sds.objects.Step;
+import ar.edu.itba.sds.output.BinaryStepWriter;
+import ar.edu.itba.sds.output.StatsReporter;
+import ar.edu.itba.sds.output.StepSink;
+import ar.edu.itba.sds.output.TextStepWriter;
 import org.json.JSONException;
 import org.json.JSONObject;
 
@@ -25,6 +29,10 @@ public class DampedOscillation {
 
     private static final String DELTA_T_SIM_CONFIG_KEY = "delta_t_sim";
     private static final String DELTA_T_PRINT_CONFIG_KEY = "delta_t_print";
+    private static final String PRINT_PRECISION_CONFIG_KEY = "print_precision";
+    private static final String PRINT_FLUSH_EVERY_CONFIG_KEY = "print_flush_every";
+    private static final String STATS_FILE_CONFIG_KEY = "stats_file";
+    private static final String STATS_EVERY_MS_CONFIG_KEY = "stats_every_ms";
 
     private static final String OSC_OBJECT_CONFIG_KEY = "osc";
     private static final String OSC_ALGO_CONFIG_KEY = "algo";
@@ -35,11 +43,20 @@ public class DampedOscillation {
     private static final String OSC_R0_CONFIG_KEY = "r0";
     private static final String OSC_A_CONFIG_KEY = "A";
 
+    private static final String TEXT_EXTENSION = ".txt";
+    private static final int STEP_COLUMNS = 3; // t x vx
+
     private static final double FLOAT_EPS = 1e-6;
 
     private static final int ERROR_STATUS = 1;
 
     private static String dynamicFilename;
+    private static boolean binaryOutput;
+    private static StepSink sink;
+    private static int printPrecision, printFlushEvery;
+    private static String statsFilename;
+    private static long statsEveryMillis;
+    private static StatsReporter stats;
     private static AlgorithmType algorithmType;
     private static double mass, k, gamma, amp;
     private static double r0, v0;
@@ -71,6 +88,24 @@ public class DampedOscillation {
         System.err.printf("%s", dynamicFilename);
         System.out.print("\n\n");
 
+        // One stream stays open for the whole run, binary if dynamic file ends with .bin
+        try {
+            sink = StepSink.open(dynamicFilename, STEP_COLUMNS, printPrecision, printFlushEvery, mass, k, gamma, timeFinal, r0, amp, deltaTimeSim, deltaTimePrint);
+        } catch (IOException e) {
+            System.err.println("Error writing dynamic file");
+            System.exit(ERROR_STATUS);
+            return;
+        }
+
+        // Optional telemetry, a failure here only disables it
+        if (statsFilename != null) {
+            try {
+                stats = new StatsReporter(statsFilename, dynamicFilename, statsEveryMillis);
+            } catch (IOException e) {
+                System.out.printf("Could not open %s, no stats will be reported\n", statsFilename);
+            }
+        }
+
         // Measure simulation time
         long startTime = System.currentTimeMillis();
 
@@ -78,11 +113,21 @@ public class DampedOscillation {
         final StepAlgorithm algorithm = StepAlgorithm.algorithmBuilder(algorithmType, f, deltaTimeSim, timeFinal, r0, v0, mass);
         Step<Double> curStep = algorithm.getLastStep();
         printStep(curStep);
+        long iterations = 0;
         while (algorithm.hasNext()) {
             curStep = algorithm.next();
             if (doubleMultiple(curStep.getTime(), deltaTimePrint)) {
                 printStep(curStep);
             }
+            // Clock is only read every CHECK_MASK + 1 steps
+            if (stats != null && (++iterations & StatsReporter.CHECK_MASK) == 0 && stats.isDue()) {
+                reportStats(algorithm, curStep, false);
+            }
+        }
+        closeSink();
+        if (stats != null) {
+            reportStats(algorithm, curStep, true);
+            closeStats();
         }
 
         // Print simulation time
@@ -92,16 +137,38 @@ public class DampedOscillation {
 
     private static void printStep(Step<Double> step) {
         try {
-            appendToFile(dynamicFilename, String.format("%.30E\n%.30E %.30E\n*\n", step.getTime(), step.getPos(), step.getVel()));
+            sink.write(step.getTime(), step.getPos(), step.getVel());
         } catch (IOException e) {
             System.err.println("Error writing dynamic file");
             System.exit(ERROR_STATUS);
         }
     }
 
-    private static void appendToFile(String filename, String s) throws IOException {
-        try(BufferedWriter writer = new BufferedWriter(new FileWriter(filename, true))) {
-            writer.write(s);
+    private static void reportStats(StepAlgorithm algorithm, Step<Double> step, boolean done) {
+        try {
+            stats.report(done, algorithm.getStepCount(), algorithm.getForceEvaluations(), sink.getBytesWritten(),
+                    step.getTime(), timeFinal, done ? 1.0 : step.getTime() / timeFinal, null);
+        } catch (IOException e) {
+            System.out.printf("Error writing %s, no more stats will be reported\n", statsFilename);
+            closeStats();
+        }
+    }
+
+    private static void closeStats() {
+        try {
+            stats.close();
+        } catch (IOException e) {
+            System.out.printf("Error writing %s\n", statsFilename);
+        }
+        stats = null;
+    }
+
+    private static void closeSink() {
+        try {
+            sink.close();
+        } catch (IOException e) {
+            System.err.println("Error writing dynamic file");
+            System.exit(ERROR_STATUS);
         }
     }
 
@@ -112,9 +179,17 @@ public class DampedOscillation {
         try(BufferedReader reader = new BufferedReader(new FileReader(configFilename))) {
             JSONObject config = new JSONObject(reader.lines().collect(Collectors.joining()));
             dynamicFilename = config.getString(DYNAMIC_CONFIG_KEY);
+            binaryOutput = dynamicFilename.endsWith(BinaryStepWriter.EXTENSION);
             deltaTimeSim = getConfigDouble(config, DELTA_T_SIM_CONFIG_KEY, v -> v > 0);
             deltaTimePrint = getConfigDouble(config, DELTA_T_PRINT_CONFIG_KEY, v -> v > 0 && doubleMultiple(v, deltaTimeSim));
 
+            // optional output params
+            printPrecision = config.has(PRINT_PRECISION_CONFIG_KEY) ? getConfigInt(config, PRINT_PRECISION_CONFIG_KEY, v -> v >= 0) : TextStepWriter.DEFAULT_PRECISION;
+            printFlushEvery = config.has(PRINT_FLUSH_EVERY_CONFIG_KEY) ? getConfigInt(config, PRINT_FLUSH_EVERY_CONFIG_KEY, v -> v >= 0) : 0;
+            // optional telemetry params, no stats by default
+            statsFilename = config.has(STATS_FILE_CONFIG_KEY) ? config.getString(STATS_FILE_CONFIG_KEY) : null;
+            statsEveryMillis = config.has(STATS_EVERY_MS_CONFIG_KEY) ? getConfigInt(config, STATS_EVERY_MS_CONFIG_KEY, v -> v > 0) : StatsReporter.DEFAULT_REPORT_MILLIS;
+
             final JSONObject oscObject = config.getJSONObject(OSC_OBJECT_CONFIG_KEY);
             algorithmType = AlgorithmType.of(oscObject.getString(OSC_ALGO_CONFIG_KEY));
             if (algorithmType == null) throw new ArgumentException("Invalid algorithm name");
@@ -139,6 +214,8 @@ public class DampedOscillation {
             algorithmType = AlgorithmType.of(algorithmName);
             if (algorithmType == null) throw new ArgumentException("Invalid algorithm name");
         }
+        if (algorithmType == AlgorithmType.DOPRI5)
+            throw new ArgumentException("Dopri5 algorithm is only available for radiation interaction");
         String deltaTimeProp = properties.getProperty(DELTA_T_PARAM);
         if (deltaTimeProp != null) {
             double value;
@@ -152,7 +229,8 @@ public class DampedOscillation {
         }
         // If dt or algo were set by param, rename dynamic file with algorithm and dt
         if (algorithmName != null || deltaTimeProp != null) {
-            dynamicFilename = String.format("%s-%.10E.txt", algorithmType.name(), deltaTimeSim);
+            dynamicFilename = String.format("%s-%.10E%s", algorithmType.name(), deltaTimeSim,
+                    binaryOutput ? BinaryStepWriter.EXTENSION : TEXT_EXTENSION);
         }
     }
 
@@ -177,4 +255,15 @@ public class DampedOscillation {
         }
         return value;
     }
+
+    private static int getConfigInt(JSONObject config, String key, Predicate<Integer> validator) throws ArgumentException {
+        int value;
+        try {
+            value = config.getInt(key);
+            if (!validator.test(value)) throw new NumberFormatException();
+        } catch (NumberFormatException e) {
+            throw new ArgumentException(String.format("Invalid %s number", key));
+        }
+        return value;
+    }
 }
@@ -2,18 +2,21 @@ package ar.edu.itba.sds;
 
 import ar.edu.itba.sds.algos2D.StepAlgorithm;
 import ar.edu.itba.sds.objects.AlgorithmType;
+import ar.edu.itba.sds.objects.ChargeLattice;
 import ar.edu.itba.sds.objects.Step;
 import ar.edu.itba.sds.objects.Vector2D;
+import ar.edu.itba.sds.output.BinaryStepWriter;
+import ar.edu.itba.sds.output.StatsReporter;
+import ar.edu.itba.sds.output.StepSink;
+import ar.edu.itba.sds.output.TextStepWriter;
 import org.json.JSONException;
 import org.json.JSONObject;
 
 import java.io.*;
 import java.nio.file.Files;
 import java.nio.file.Paths;
-import java.util.Map;
 import java.util.Properties;
 import java.util.Random;
-import java.util.function.BiFunction;
 import java.util.function.Predicate;
 import java.util.stream.Collectors;
 
@@ -30,6 +33,10 @@ public class RadiationInteraction {
 
     private static final String DELTA_T_SIM_CONFIG_KEY = "delta_t_sim";
     private static final String DELTA_T_PRINT_CONFIG_KEY = "delta_t_print";
+    private static final String PRINT_PRECISION_CONFIG_KEY = "print_precision";
+    private static final String PRINT_FLUSH_EVERY_CONFIG_KEY = "print_flush_every";
+    private static final String STATS_FILE_CONFIG_KEY = "stats_file";
+    private static final String STATS_EVERY_MS_CONFIG_KEY = "stats_every_ms";
 
     private static final String RAD_OBJECT_CONFIG_KEY = "rad";
     private static final String RAD_ALGO_CONFIG_KEY = "algo";
@@ -41,18 +48,36 @@ public class RadiationInteraction {
     private static final String RAD_V0_CONFIG_KEY = "v0";
     private static final String RAD_USE_SEED_CONFIG_KEY = "use_seed";
     private static final String RAD_SEED_CONFIG_KEY = "seed";
+    private static final String RAD_NEAR_CELLS_CONFIG_KEY = "near_cells";
+    private static final String RAD_FAR_TOLERANCE_CONFIG_KEY = "far_tolerance";
+    private static final String RAD_TOLERANCE_CONFIG_KEY = "tolerance";
 
+    private static final double DEFAULT_FAR_TOLERANCE = 1e-4;
+    private static final double DEFAULT_TOLERANCE = 1e-10;
+
+
+    private static final String TEXT_EXTENSION = ".txt";
+    private static final int STEP_COLUMNS = 5; // t x y vx vy
 
     private static final double FLOAT_EPS = 1e-6;
 
     private static final int ERROR_STATUS = 1;
 
     private static String dynamicFilename;
+    private static boolean binaryOutput;
+    private static StepSink sink;
+    private static int printPrecision, printFlushEvery;
+    private static String statsFilename;
+    private static long statsEveryMillis;
+    private static StatsReporter stats;
     private static AlgorithmType algorithmType;
     private static double mass, k, d, q;
     private static double r0;
     private static double deltaTimeSim, deltaTimePrint;
     private static int n, v0;
+    private static int nearCells;
+    private static double farTolerance;
+    private static double tolerance;
     private static long seed;
 
     public static void main(String[] args) {
@@ -65,12 +90,8 @@ public class RadiationInteraction {
             return;
         }
 
-        // force function
-        final BiFunction<Vector2D, Map<Vector2D, Boolean>, Vector2D> f = (pi, map) ->
-                map.entrySet()
-                .stream()
-                .map(e -> Vector2D.force(pi, e.getKey(), k, q, e.getValue()))
-                .reduce(new Vector2D(), Vector2D::sum);
+        // force field, exact or near/far split with an interpolated far field table
+        final ChargeLattice lattice = new ChargeLattice(n, d, k, q, nearCells, farTolerance);
         final Random r = new Random(seed);
         final double rangeMin = (n - 1) * d / 2 - d;
         final double rangeMax = (n - 1) * d / 2 + d;
@@ -89,20 +110,52 @@ public class RadiationInteraction {
         System.err.printf("%s", dynamicFilename);
         System.out.print("\n\n");
 
+        // One stream stays open for the whole run, binary if dynamic file ends with .bin
+        try {
+            sink = StepSink.open(dynamicFilename, STEP_COLUMNS, printPrecision, printFlushEvery, mass, k, n, d, q, v0, r0, deltaTimeSim, deltaTimePrint);
+        } catch (IOException e) {
+            System.err.println("Error writing dynamic file");
+            System.exit(ERROR_STATUS);
+            return;
+        }
+
+        // Optional telemetry, a failure here only disables it
+        if (statsFilename != null) {
+            try {
+                stats = new StatsReporter(statsFilename, dynamicFilename, statsEveryMillis);
+            } catch (IOException e) {
+                System.out.printf("Could not open %s, no stats will be reported\n", statsFilename);
+            }
+        }
+
         // Measure simulation time
         long startTime = System.currentTimeMillis();
 
         // Simulation
-        final StepAlgorithm algorithm = StepAlgorithm.algorithmBuilder(algorithmType, f, deltaTimeSim, r0, v0, mass, d, n);
+        final StepAlgorithm algorithm = StepAlgorithm.algorithmBuilder(algorithmType, lattice, deltaTimeSim, deltaTimePrint, tolerance, r0, v0, mass);
+        // Adaptive algorithms already return steps on the print grid, plus the ending step
+        final boolean adaptive = algorithmType == AlgorithmType.DOPRI5;
         Step<Vector2D> curStep = algorithm.getLastStep();
         printStep(curStep);
+        long iterations = 0;
         while (algorithm.hasNext()) {
             curStep = algorithm.next();
-            if (doubleMultiple(curStep.getTime(), deltaTimePrint)) {
+            if (adaptive || doubleMultiple(curStep.getTime(), deltaTimePrint)) {
                 printStep(curStep);
             }
+            // Clock is only read every CHECK_MASK + 1 steps
+            if (stats != null && (++iterations & StatsReporter.CHECK_MASK) == 0 && stats.isDue()) {
+                reportStats(algorithm, curStep, false);
+            }
+        }
+        closeSink();
+        if (stats != null) {
+            reportStats(algorithm, curStep, true);
+            closeStats();
         }
         System.out.println("Done");
+        System.out.printf("Steps %d, rejected steps %d, force evaluations %d\n",
+                algorithm.getStepCount(), algorithm.getRejectedSteps(), algorithm.getForceEvaluations());
 
         // Print simulation time
         long endTime = System.currentTimeMillis();
@@ -111,17 +164,49 @@ public class RadiationInteraction {
 
     private static void printStep(Step<Vector2D> step) {
         try {
-            appendToFile(dynamicFilename, String.format("%.30E\n%.30E %.30E %.30E %.30E\n*\n",
-                    step.getTime(), step.getPos().getX(), step.getPos().getY(), step.getVel().getX(), step.getVel().getY()));
+            sink.write(step.getTime(), step.getPos().getX(), step.getPos().getY(), step.getVel().getX(), step.getVel().getY());
         } catch (IOException e) {
             System.err.println("Error writing dynamic file");
             System.exit(ERROR_STATUS);
         }
     }
 
-    private static void appendToFile(String filename, String s) throws IOException {
-        try(BufferedWriter writer = new BufferedWriter(new FileWriter(filename, true))) {
-            writer.write(s);
+    /**
+     * The end time is not known in advance, progress is how far the particle went towards the right wall
+     */
+    private static void reportStats(StepAlgorithm algorithm, Step<Vector2D> step, boolean done) {
+        final double maxX = n * d, maxY = (n - 1) * d;
+        final double x = step.getPos().getX(), y = step.getPos().getY();
+        final JSONObject extra = new JSONObject();
+        extra.put("x", x);
+        extra.put("y", y);
+        extra.put("wall_distance", Math.max(0.0, Math.min(Math.min(x, maxX - x), Math.min(y, maxY - y))));
+        extra.put("rejected_steps", algorithm.getRejectedSteps());
+        final double progress = done ? 1.0 : Math.min(1.0, Math.max(0.0, x / maxX));
+        try {
+            stats.report(done, algorithm.getStepCount(), algorithm.getForceEvaluations(), sink.getBytesWritten(),
+                    step.getTime(), Double.NaN, progress, extra);
+        } catch (IOException e) {
+            System.out.printf("Error writing %s, no more stats will be reported\n", statsFilename);
+            closeStats();
+        }
+    }
+
+    private static void closeStats() {
+        try {
+            stats.close();
+        } catch (IOException e) {
+            System.out.printf("Error writing %s\n", statsFilename);
+        }
+        stats = null;
+    }
+
+    private static void closeSink() {
+        try {
+            sink.close();
+        } catch (IOException e) {
+            System.err.println("Error writing dynamic file");
+            System.exit(ERROR_STATUS);
         }
     }
 
@@ -132,9 +217,17 @@ public class RadiationInteraction {
         try(BufferedReader reader = new BufferedReader(new FileReader(configFilename))) {
             JSONObject config = new JSONObject(reader.lines().collect(Collectors.joining()));
             dynamicFilename = config.getString(DYNAMIC_CONFIG_KEY);
+            binaryOutput = dynamicFilename.endsWith(BinaryStepWriter.EXTENSION);
             deltaTimeSim = getConfigDouble(config, DELTA_T_SIM_CONFIG_KEY, v -> v > 0);
             deltaTimePrint = getConfigDouble(config, DELTA_T_PRINT_CONFIG_KEY, v -> v > 0 && doubleMultiple(v, deltaTimeSim));
 
+            // optional output params
+            printPrecision = config.has(PRINT_PRECISION_CONFIG_KEY) ? getConfigInt(config, PRINT_PRECISION_CONFIG_KEY, v -> v >= 0) : TextStepWriter.DEFAULT_PRECISION;
+            printFlushEvery = config.has(PRINT_FLUSH_EVERY_CONFIG_KEY) ? getConfigInt(config, PRINT_FLUSH_EVERY_CONFIG_KEY, v -> v >= 0) : 0;
+            // optional telemetry params, no stats by default
+            statsFilename = config.has(STATS_FILE_CONFIG_KEY) ? config.getString(STATS_FILE_CONFIG_KEY) : null;
+            statsEveryMillis = config.has(STATS_EVERY_MS_CONFIG_KEY) ? getConfigInt(config, STATS_EVERY_MS_CONFIG_KEY, v -> v > 0) : StatsReporter.DEFAULT_REPORT_MILLIS;
+
             final JSONObject radObject = config.getJSONObject(RAD_OBJECT_CONFIG_KEY);
             algorithmType = AlgorithmType.of(radObject.getString(RAD_ALGO_CONFIG_KEY));
             if (algorithmType == null) throw new ArgumentException("Invalid algorithm name");
@@ -151,6 +244,12 @@ public class RadiationInteraction {
             final boolean useSeed = radObject.getBoolean(RAD_USE_SEED_CONFIG_KEY);
             seed = (useSeed)? getConfigInt(radObject, RAD_SEED_CONFIG_KEY, v -> v > 0) : System.nanoTime();
 
+            // optional force field params, exact sum over every charge by default
+            nearCells = radObject.has(RAD_NEAR_CELLS_CONFIG_KEY) ? getConfigInt(radObject, RAD_NEAR_CELLS_CONFIG_KEY, v -> v >= 0) : 0;
+            farTolerance = radObject.has(RAD_FAR_TOLERANCE_CONFIG_KEY) ? getConfigDouble(radObject, RAD_FAR_TOLERANCE_CONFIG_KEY, v -> v > 0) : DEFAULT_FAR_TOLERANCE;
+            // optional adaptive algorithm error tolerance
+            tolerance = radObject.has(RAD_TOLERANCE_CONFIG_KEY) ? getConfigDouble(radObject, RAD_TOLERANCE_CONFIG_KEY, v -> v > 0) : DEFAULT_TOLERANCE;
+
         } catch (FileNotFoundException e) {
             throw new ArgumentException(String.format("Config file %s not found", configFilename));
         } catch (IOException e) {
@@ -194,7 +293,8 @@ public class RadiationInteraction {
 
         // If dt, algo or dt were set by param and dynamic name wasn't, rename dynamic file with algorithm and dt
         if (algorithmName != null || deltaTimeProp != null || voProp != null) {
-            dynamicFilename = String.format("%s_%.5E_%d%s.txt", algorithmType.name(), deltaTimeSim, v0, dynamicSuffix);
+            dynamicFilename = String.format("%s_%.5E_%d%s%s", algorithmType.name(), deltaTimeSim, v0, dynamicSuffix,
+                    binaryOutput ? BinaryStepWriter.EXTENSION : TEXT_EXTENSION);
         }
     }
 
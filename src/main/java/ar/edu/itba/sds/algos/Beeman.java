@@ -15,28 +15,27 @@ public class Beeman extends StepAlgorithm {
         if (!hasNext()) throw new IndexOutOfBoundsException("No more timesteps!");
 
         // Calculate x(t+dt)
-        pos[lastIndex + 1] = pos[lastIndex] + vel[lastIndex] * deltaT
-                        + 2.0 / 3.0 * acc[lastIndex] * deltaTSq
-                        - 1.0 / 6.0 * acc[lastIndex - 1] * deltaTSq;
+        pos[next] = pos[cur] + vel[cur] * deltaT
+                        + 2.0 / 3.0 * acc[cur] * deltaTSq
+                        - 1.0 / 6.0 * acc[prev] * deltaTSq;
 
         // Predict v(t+dt)
-        vel[lastIndex + 1] = vel[lastIndex]
-                + 3.0 / 2.0 * acc[lastIndex] * deltaT
-                - 1.0 / 2.0 * acc[lastIndex - 1] * deltaT;
+        vel[next] = vel[cur]
+                + 3.0 / 2.0 * acc[cur] * deltaT
+                - 1.0 / 2.0 * acc[prev] * deltaT;
 
         // Estimate a(t+dt) using x(t+dt) and predicted v(t+dt)
-        acc[lastIndex + 1] = f.apply(pos[lastIndex + 1], vel[lastIndex + 1]) / mass;
+        acc[next] = force(pos[next], vel[next]) / mass;
 
         // Correct v(t+dt)
-        vel[lastIndex + 1] = vel[lastIndex]
-                + 1.0 / 3.0 * acc[lastIndex + 1] * deltaT
-                + 5.0 / 6.0 * acc[lastIndex] * deltaT
-                - 1.0 / 6.0 * acc[lastIndex - 1] * deltaT;
+        vel[next] = vel[cur]
+                + 1.0 / 3.0 * acc[next] * deltaT
+                + 5.0 / 6.0 * acc[cur] * deltaT
+                - 1.0 / 6.0 * acc[prev] * deltaT;
 
-        // Update lastTime and lastIndex
-        lastTime += deltaT;
-        lastIndex++;
+        // Update lastTime and window
+        advance();
 
-        return new Step<>(lastTime, pos[lastIndex], vel[lastIndex], acc[lastIndex]);
+        return new Step<>(lastTime, pos[cur], vel[cur], acc[cur]);
     }
 }
@@ -7,6 +7,9 @@ import java.util.Iterator;
 import java.util.function.BiFunction;
 
 public abstract class StepAlgorithm implements Iterator<Step<Double>> {
+    // Rolling window with the previous, current and next step, so memory does not grow with tf / dt
+    protected static final int WINDOW = 3;
+
     protected final double[] pos;
     protected final double[] vel;
     protected final double[] acc;
@@ -14,7 +17,10 @@ public abstract class StepAlgorithm implements Iterator<Step<Double>> {
     protected final double mass;
     protected final double deltaT, deltaTSq;
     protected double lastTime;
-    protected int lastIndex;
+    protected final long totalSteps;
+    protected long stepCount, forceEvaluations;
+    // Window slots of the previous, current and next step
+    protected int prev, cur, next;
 
     public static StepAlgorithm algorithmBuilder(AlgorithmType type, BiFunction<Double, Double, Double> f, double deltaT, double tf, double r0, double v0, double mass) {
         switch (type) {
@@ -30,43 +36,72 @@ public abstract class StepAlgorithm implements Iterator<Step<Double>> {
     }
 
     protected StepAlgorithm(BiFunction<Double, Double, Double> f, double deltaT, double tf, double r0, double v0, double mass) {
-        int size = (int) Math.round(tf / deltaT) + 2; // [-dt; tf] including both ends
-
         this.f = f;
         this.mass = mass;
         this.deltaT = deltaT;
         this.deltaTSq = deltaT * deltaT;
         this.lastTime = 0.0;
+        this.totalSteps = Math.round(tf / deltaT); // (0; tf]
+        this.stepCount = 0;
+        this.forceEvaluations = 0;
+        this.prev = 0;
+        this.cur = 1;
+        this.next = 2;
 
-        this.pos = new double[size];
-        this.pos[1] = r0;
-        this.vel = new double[size];
-        this.vel[1] = v0;
-        this.acc = new double[size];
-        this.acc[1] = f.apply(r0, v0) / this.mass;
-
-        final Step<Double> prevStep = eulerPrecedingStep(this.lastTime, this.pos[1], this.vel[1], this.acc[1]);
-        this.pos[0] = prevStep.getPos();
-        this.vel[0] = prevStep.getVel();
-        this.acc[0] = prevStep.getAcc();
+        this.pos = new double[WINDOW];
+        this.pos[cur] = r0;
+        this.vel = new double[WINDOW];
+        this.vel[cur] = v0;
+        this.acc = new double[WINDOW];
+        this.acc[cur] = force(r0, v0) / this.mass;
 
-        this.lastIndex = 1;
+        final Step<Double> prevStep = eulerPrecedingStep(this.lastTime, this.pos[cur], this.vel[cur], this.acc[cur]);
+        this.pos[prev] = prevStep.getPos();
+        this.vel[prev] = prevStep.getVel();
+        this.acc[prev] = prevStep.getAcc();
     }
 
     private Step<Double> eulerPrecedingStep(double t, double r, double v, double a) {
         double vPrev = v - deltaT * a;
         double rPrev = r - deltaT * vPrev + deltaTSq * a / 2.0;
-        double aPrev = f.apply(rPrev, vPrev) / mass;
+        double aPrev = force(rPrev, vPrev) / mass;
 
         return new Step<>(t - deltaT, rPrev, vPrev, aPrev);
     }
 
     public Step<Double> getLastStep() {
-        return new Step<>(lastTime, pos[lastIndex], vel[lastIndex], acc[lastIndex]);
+        return new Step<>(lastTime, pos[cur], vel[cur], acc[cur]);
     }
 
     @Override
     public boolean hasNext() {
-        return lastIndex + 1 < pos.length;
+        return stepCount < totalSteps;
+    }
+
+    public long getStepCount() {
+        return stepCount;
+    }
+
+    public long getForceEvaluations() {
+        return forceEvaluations;
+    }
+
+    /**
+     * Counted evaluation of f
+     */
+    protected double force(double r, double v) {
+        forceEvaluations++;
+        return f.apply(r, v);
+    }
+
+    /**
+     * Moves the window one step forward, the next step becomes the current one
+     */
+    protected void advance() {
+        lastTime += deltaT;
+        stepCount++;
+        prev = cur;
+        cur = next;
+        next = (next + 1) % WINDOW;
     }
 }
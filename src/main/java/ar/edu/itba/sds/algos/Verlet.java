@@ -15,18 +15,17 @@ public class Verlet extends StepAlgorithm {
         if (!hasNext()) throw new IndexOutOfBoundsException("No more timesteps!");
 
         // Calculate x(t+dt)
-        pos[lastIndex + 1] = 2 * pos[lastIndex] - pos[lastIndex - 1] + deltaTSq * acc[lastIndex];
+        pos[next] = 2 * pos[cur] - pos[prev] + deltaTSq * acc[cur];
 
         // Calculate v(t+dt)
-        vel[lastIndex + 1] = (pos[lastIndex + 1] - pos[lastIndex - 1]) / (2 * deltaT);
+        vel[next] = (pos[next] - pos[prev]) / (2 * deltaT);
 
         // Estimate a(t+dt) using x(t+dt) and predicted v(t+dt)
-        acc[lastIndex + 1] = f.apply(pos[lastIndex + 1], vel[lastIndex + 1]) / mass;
+        acc[next] = force(pos[next], vel[next]) / mass;
 
-        // Update lastTime and lastIndex
-        lastTime += deltaT;
-        lastIndex++;
+        // Update lastTime and window
+        advance();
 
-        return new Step<>(lastTime, pos[lastIndex], vel[lastIndex], acc[lastIndex]);
+        return new Step<>(lastTime, pos[cur], vel[cur], acc[cur]);
     }
 }
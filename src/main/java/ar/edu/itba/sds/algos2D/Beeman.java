@@ -1,17 +1,14 @@
 package ar.edu.itba.sds.algos2D;
 
+import ar.edu.itba.sds.objects.ChargeLattice;
 import ar.edu.itba.sds.objects.Step;
 import ar.edu.itba.sds.objects.Vector2D;
 
-import java.util.Map;
-import java.util.function.BiFunction;
-
-import static ar.edu.itba.sds.objects.Vector2D.*;
-
 public class Beeman extends StepAlgorithm {
 
-    public Beeman(BiFunction<Vector2D, Map<Vector2D, Boolean>, Vector2D> f, double deltaT, double r0, double v0, double mass, double d, int n) {
-        super(f, deltaT, r0, v0, mass, d, n);
+    public Beeman(ChargeLattice lattice, double deltaT, double r0, double v0, double mass) {
+        // Reads x(t), v(t), a(t) and a(t-dt)
+        super(lattice, deltaT, r0, v0, mass, 1, 1, 2);
     }
 
     @Override
@@ -19,20 +16,24 @@ public class Beeman extends StepAlgorithm {
         if (!hasNext()) throw new IndexOutOfBoundsException("No more time steps!");
 
         // Calculate x(t+dt)
-        final Vector2D nextPos = sub(sum(sum(pos.peek(), scalar(vel.peek(), deltaT)), scalar(acc.peek(),2.0 / 3.0 * deltaTSq)), scalar(acc.peekPeek(), 1.0 / 6.0 * deltaTSq));
+        final double nextPosX = ((pos.getX(0) + vel.getX(0) * deltaT) + acc.getX(0) * (2.0 / 3.0 * deltaTSq)) - acc.getX(1) * (1.0 / 6.0 * deltaTSq);
+        final double nextPosY = ((pos.getY(0) + vel.getY(0) * deltaT) + acc.getY(0) * (2.0 / 3.0 * deltaTSq)) - acc.getY(1) * (1.0 / 6.0 * deltaTSq);
 
         // Calculate a(t+dt) using x(t+dt)
-        final Vector2D nextAcc = scalar(f.apply(nextPos, staticParticles), 1 / mass);
+        acceleration(nextPosX, nextPosY);
+        final double nextAccX = forceBuffer[0], nextAccY = forceBuffer[1];
 
         // Calculate v(t+dt)
-        final Vector2D nextVel = sub(sum(sum(vel.peek(), scalar(nextAcc, 1.0 / 3.0 * deltaT)), scalar(acc.peek(), 5.0 / 6.0 * deltaT)), scalar(acc.peekPeek(), 1.0 / 6.0 * deltaT));
+        final double nextVelX = ((vel.getX(0) + nextAccX * (1.0 / 3.0 * deltaT)) + acc.getX(0) * (5.0 / 6.0 * deltaT)) - acc.getX(1) * (1.0 / 6.0 * deltaT);
+        final double nextVelY = ((vel.getY(0) + nextAccY * (1.0 / 3.0 * deltaT)) + acc.getY(0) * (5.0 / 6.0 * deltaT)) - acc.getY(1) * (1.0 / 6.0 * deltaT);
 
-        // Update lastTime and lastIndex
+        // Update lastTime and history
         lastTime += deltaT;
-        pos.push(nextPos);
-        vel.push(nextVel);
-        acc.push(nextAcc);
+        stepCount++;
+        pos.push(nextPosX, nextPosY);
+        vel.push(nextVelX, nextVelY);
+        acc.push(nextAccX, nextAccY);
 
-        return new Step<>(lastTime, nextPos, nextVel, nextAcc);
+        return new Step<>(lastTime, new Vector2D(nextPosX, nextPosY), new Vector2D(nextVelX, nextVelY), new Vector2D(nextAccX, nextAccY));
     }
 }
@@ -0,0 +1,181 @@
+package ar.edu.itba.sds.algos2D;
+
+import ar.edu.itba.sds.objects.ChargeLattice;
+import ar.edu.itba.sds.objects.Step;
+import ar.edu.itba.sds.objects.Vector2D;
+
+/**
+ * Adaptive Dormand-Prince 5(4) embedded Runge-Kutta pair over the state (x, y, vx, vy).
+ * Internal steps grow where the force is smooth and shrink near charges to keep the local error under tolerance.
+ * Steps are returned on the deltaT print grid, Hermite interpolated inside the internal step that contains them.
+ * The internal step that ends the run is returned as is, so the last step shows the ending position.
+ */
+public class DormandPrince extends StepAlgorithm {
+    private static final double[][] A = {
+            {},
+            {1.0 / 5.0},
+            {3.0 / 40.0, 9.0 / 40.0},
+            {44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0},
+            {19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0},
+            {9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0},
+            {35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0}
+    };
+    // 5th order minus embedded 4th order weights
+    private static final double[] E = {71.0 / 57600.0, 0.0, -71.0 / 16695.0, 71.0 / 1920.0, -17253.0 / 339200.0, 22.0 / 525.0, -1.0 / 40.0};
+    private static final int STAGES = 7;
+    private static final int DIM = 4;
+
+    private static final double SAFETY = 0.9;
+    private static final double MIN_SCALE = 0.2;
+    private static final double MAX_SCALE = 5.0;
+    // Max distance moved in one internal step at its starting speed, as a fraction of the gap between the particle and
+    // the dCut circle of the nearest charge, and never less than that fraction of dCut. Away from charges the tolerance
+    // sets the step. Near one, a step can only graze the circle between checks, about 3% of dCut deep at most
+    private static final double MAX_STEP_GAP = 0.5;
+
+    private final double tolerance;
+    private final double[] errorScale;
+
+    // k[i] is the derivative (vx, vy, ax, ay) at stage i, k[STAGES - 1] of an accepted step is k[0] of the next
+    private final double[][] k;
+    private final double[] stage;
+    // Internal step [t0, t1] with states and derivatives at both ends
+    private final double[] y0, f0, y1, f1;
+    private double t0, t1;
+    private double h;
+    private long printedSteps;
+    private long rejectedSteps;
+
+    /**
+     * @param deltaT print grid interval
+     * @param initialStep first internal step, grown or shrunk to meet tolerance
+     * @param tolerance max local error, relative to each value plus d for positions and v0 for velocities
+     */
+    public DormandPrince(ChargeLattice lattice, double deltaT, double initialStep, double tolerance, double r0, double v0, double mass) {
+        // Only the last returned step is read
+        super(lattice, deltaT, r0, v0, mass, 1, 1, 1);
+        this.tolerance = tolerance;
+        this.errorScale = new double[]{lattice.getD(), lattice.getD(), Math.abs(v0), Math.abs(v0)};
+
+        this.k = new double[STAGES][DIM];
+        this.stage = new double[DIM];
+        this.y0 = new double[DIM];
+        this.f0 = new double[DIM];
+        this.y1 = new double[]{pos.getX(0), pos.getY(0), vel.getX(0), vel.getY(0)};
+        this.f1 = new double[]{vel.getX(0), vel.getY(0), acc.getX(0), acc.getY(0)};
+        System.arraycopy(f1, 0, k[0], 0, DIM);
+        this.t0 = this.t1 = 0.0;
+        this.h = initialStep;
+        this.printedSteps = 0;
+        this.rejectedSteps = 0;
+    }
+
+    @Override
+    public Step<Vector2D> next() {
+        if (!hasNext()) throw new IndexOutOfBoundsException("No more time steps!");
+
+        // Compute the print time from its index so it does not drift
+        final double target = (printedSteps + 1) * deltaT;
+        while (t1 < target) {
+            // The initial state sits on x = 0, so the checks start after the first internal step, as in hasNext
+            if (stepCount > 0 && isEnded(y1[0], y1[1])) {
+                // Return the internal step that ended the run, it may come before the first print time
+                lastTime = t1;
+                done = true;
+                return pushStep(y1, f1[2], f1[3]);
+            }
+            integrate();
+        }
+
+        // Cubic Hermite interpolation inside [t0, t1]
+        final double span = t1 - t0;
+        final double theta = (target - t0) / span;
+        final double theta2 = theta * theta, theta3 = theta2 * theta;
+        final double h00 = 2 * theta3 - 3 * theta2 + 1, h10 = theta3 - 2 * theta2 + theta;
+        final double h01 = -2 * theta3 + 3 * theta2, h11 = theta3 - theta2;
+        for (int i = 0; i < DIM; i++)
+            stage[i] = h00 * y0[i] + h10 * span * f0[i] + h01 * y1[i] + h11 * span * f1[i];
+
+        printedSteps++;
+        lastTime = target;
+        // Acceleration is only reported, linear interpolation is enough
+        return pushStep(stage, f0[2] + theta * (f1[2] - f0[2]), f0[3] + theta * (f1[3] - f0[3]));
+    }
+
+    @Override
+    public long getRejectedSteps() {
+        return rejectedSteps;
+    }
+
+    // private auxiliary functions
+
+    /**
+     * Takes one accepted internal step from t1, retrying with smaller steps while the error is over tolerance
+     */
+    private void integrate() {
+        System.arraycopy(y1, 0, y0, 0, DIM);
+        System.arraycopy(f1, 0, f0, 0, DIM);
+        t0 = t1;
+
+        // Limit how far the particle moves in one step, so it cannot go through the dCut circle of a charge
+        final double speed = Math.hypot(y0[2], y0[3]);
+        if (speed > 0) {
+            final double gap = Math.max(lattice.minDistance(y0[0], y0[1]) - dCut, dCut);
+            h = Math.min(h, MAX_STEP_GAP * gap / speed);
+        }
+
+        while (true) {
+            if (t0 + h == t0) throw new IllegalStateException("Step size underflow");
+
+            for (int s = 1; s < STAGES; s++) {
+                for (int i = 0; i < DIM; i++) {
+                    double sum = 0.0;
+                    for (int j = 0; j < s; j++)
+                        sum += A[s][j] * k[j][i];
+                    stage[i] = y0[i] + h * sum;
+                }
+                derivative(stage, k[s]);
+            }
+            // Last stage is evaluated at the 5th order solution
+            System.arraycopy(stage, 0, y1, 0, DIM);
+
+            double errorSum = 0.0;
+            for (int i = 0; i < DIM; i++) {
+                double error = 0.0;
+                for (int s = 0; s < STAGES; s++)
+                    error += E[s] * k[s][i];
+                final double scale = tolerance * (errorScale[i] + Math.max(Math.abs(y0[i]), Math.abs(y1[i])));
+                final double ratio = h * error / scale;
+                errorSum += ratio * ratio;
+            }
+            final double error = Math.sqrt(errorSum / DIM);
+            final double factor = (error > 0) ? SAFETY * Math.pow(error, -0.2) : MAX_SCALE;
+
+            if (error <= 1.0) {
+                t1 = t0 + h;
+                System.arraycopy(k[STAGES - 1], 0, f1, 0, DIM);
+                System.arraycopy(f1, 0, k[0], 0, DIM);
+                stepCount++;
+                h *= Math.min(MAX_SCALE, Math.max(MIN_SCALE, factor));
+                return;
+            }
+            rejectedSteps++;
+            h *= Math.max(MIN_SCALE, factor);
+        }
+    }
+
+    private void derivative(double[] y, double[] out) {
+        acceleration(y[0], y[1]);
+        out[0] = y[2];
+        out[1] = y[3];
+        out[2] = forceBuffer[0];
+        out[3] = forceBuffer[1];
+    }
+
+    private Step<Vector2D> pushStep(double[] y, double ax, double ay) {
+        pos.push(y[0], y[1]);
+        vel.push(y[2], y[3]);
+        acc.push(ax, ay);
+        return new Step<>(lastTime, pos.get(0), vel.get(0), acc.get(0));
+    }
+}
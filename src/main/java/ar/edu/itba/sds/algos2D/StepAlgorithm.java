@@ -1,115 +1,168 @@
 package ar.edu.itba.sds.algos2D;
 
 import ar.edu.itba.sds.objects.AlgorithmType;
-import ar.edu.itba.sds.objects.CustomStack;
+import ar.edu.itba.sds.objects.ChargeLattice;
 import ar.edu.itba.sds.objects.Step;
 import ar.edu.itba.sds.objects.Vector2D;
+import ar.edu.itba.sds.objects.VectorHistory;
 
-import java.util.HashMap;
 import java.util.Iterator;
-import java.util.Map;
-import java.util.function.BiFunction;
 
 import static ar.edu.itba.sds.objects.Vector2D.*;
 
 public abstract class StepAlgorithm implements Iterator<Step<Vector2D>> {
 
-    protected final CustomStack<Vector2D> pos;
-    protected final CustomStack<Vector2D> vel;
-    protected final CustomStack<Vector2D> acc;
-    protected final BiFunction<Vector2D, Map<Vector2D, Boolean>, Vector2D> f;
-    protected final Map<Vector2D, Boolean> staticParticles;
-    protected final double mass;
+    // Only the last steps each algorithm reads are kept, so memory stays constant
+    protected final VectorHistory pos;
+    protected final VectorHistory vel;
+    protected final VectorHistory acc;
+    protected final ChargeLattice lattice;
+    protected final double[] forceBuffer;
+    protected final double mass, invMass;
     protected final double deltaT, deltaTSq;
     protected double lastTime;
+    protected long stepCount, forceEvaluations;
+    // Set by algorithms that return their ending step themselves
     protected boolean done;
     protected final double maxX, maxY;
     protected final double dCut;
 
-    public static StepAlgorithm algorithmBuilder(AlgorithmType type, BiFunction<Vector2D, Map<Vector2D, Boolean>, Vector2D> f, double deltaT, double r0, double v0, double mass, double d, int n) {
+    /**
+     * @param deltaTSim fixed step, or first internal step for adaptive algorithms
+     * @param deltaTPrint print grid of adaptive algorithms, fixed step ones return every step
+     * @param tolerance max local error of adaptive algorithms
+     */
+    public static StepAlgorithm algorithmBuilder(AlgorithmType type, ChargeLattice lattice, double deltaTSim, double deltaTPrint,
+                                                 double tolerance, double r0, double v0, double mass) {
         switch (type) {
             case BEEMAN:
-                return new ar.edu.itba.sds.algos2D.Beeman(f, deltaT, r0, v0, mass, d, n);
+                return new ar.edu.itba.sds.algos2D.Beeman(lattice, deltaTSim, r0, v0, mass);
+            case DOPRI5:
+                return new DormandPrince(lattice, deltaTPrint, deltaTSim, tolerance, r0, v0, mass);
             default:
                 throw new IllegalArgumentException("Invalid algorithm type");
         }
     }
 
-    protected StepAlgorithm(BiFunction<Vector2D, Map<Vector2D, Boolean>, Vector2D> f, double deltaT, double r0, double v0, double mass, double d, int n) {
-
-        this.f = f;
+    /**
+     * @param posHistory positions the algorithm reads, including the current one
+     * @param velHistory velocities the algorithm reads, including the current one
+     * @param accHistory accelerations the algorithm reads, including the current one
+     */
+    protected StepAlgorithm(ChargeLattice lattice, double deltaT, double r0, double v0, double mass,
+                            int posHistory, int velHistory, int accHistory) {
+        final double d = lattice.getD();
+        final int n = lattice.getN();
+
+        this.lattice = lattice;
+        this.forceBuffer = new double[2];
         this.mass = mass;
+        this.invMass = 1 / mass;
         this.deltaT = deltaT;
         this.deltaTSq = deltaT * deltaT;
         this.lastTime = 0.0;
+        this.stepCount = 0;
+        this.forceEvaluations = 0;
         this.done = false;
         this.maxX = d * n;
         this.maxY = d * (n - 1);
         this.dCut = 0.01 * d;
 
-        this.staticParticles = initStaticParticles(d, n);
         final Vector2D pos0 = new Vector2D(0.0, r0);
         final Vector2D vel0 = new Vector2D(v0, 0.0);
-        final Vector2D acc0 = scalar(f.apply(pos0, this.staticParticles), 1 / this.mass);
+        final Vector2D acc0 = acceleration(pos0);
 
         final Step<Vector2D> prevStep = eulerPrecedingStep(this.lastTime, pos0, vel0, acc0);
 
-        this.pos = new CustomStack<>();
+        this.pos = new VectorHistory(posHistory);
         pos.push(prevStep.getPos());
         pos.push(pos0);
-        this.vel = new CustomStack<>();
+        this.vel = new VectorHistory(velHistory);
         vel.push(prevStep.getVel());
         vel.push(vel0);
-        this.acc = new CustomStack<>();
+        this.acc = new VectorHistory(accHistory);
         acc.push(prevStep.getAcc());
         acc.push(acc0);
     }
 
     public Step<Vector2D> getLastStep() {
-        return new Step<>(lastTime, pos.peek(), vel.peek(), acc.peek());
+        return new Step<>(lastTime, pos.get(0), vel.get(0), acc.get(0));
     }
 
     @Override
     public boolean hasNext() {
-        if (lastTime < deltaT) return true;
-        if (pos.peek().getX() >= maxX) {
+        // The initial state sits on x = 0, checks start with the first step unless it already ended the run
+        if (lastTime < deltaT && !done) return true;
+        final double x = pos.getX(0), y = pos.getY(0);
+        if (x >= maxX) {
             System.out.println("Algorithm finished. Crossed max X (n * d) position");
             return false;
         }
-        if (pos.peek().getX() <= 0.0) {
+        if (x <= 0.0) {
             System.out.println("Algorithm finished. Crossed min X (0.0) position");
             return false;
         }
-        if (pos.peek().getY() >= maxY) {
+        if (y >= maxY) {
             System.out.println("Algorithm finished. Crossed max Y ((n - 1) * d) position");
             return false;
         }
-        if (pos.peek().getY() <= 0.0) {
+        if (y <= 0.0) {
             System.out.println("Algorithm finished. Crossed min Y (0.0) position");
             return false;
         }
-        if (staticParticles.keySet().stream().anyMatch(v -> mod(pos.peek(), v) < dCut)) {
+        if (lattice.minDistance(x, y) < dCut) {
             System.out.println("Algorithm finished. Close particles");
             return false;
         }
         return true;
     }
 
+    /**
+     * @return integration steps taken, not counting rejected ones
+     */
+    public long getStepCount() {
+        return stepCount;
+    }
+
+    /**
+     * @return steps retried with a smaller step by adaptive algorithms
+     */
+    public long getRejectedSteps() {
+        return 0;
+    }
+
+    public long getForceEvaluations() {
+        return forceEvaluations;
+    }
+
+    /**
+     * Same conditions as hasNext, without logging
+     */
+    protected boolean isEnded(double x, double y) {
+        return x >= maxX || x <= 0.0 || y >= maxY || y <= 0.0 || lattice.minDistance(x, y) < dCut;
+    }
+
+    protected Vector2D acceleration(Vector2D r) {
+        acceleration(r.getX(), r.getY());
+        return new Vector2D(forceBuffer[0], forceBuffer[1]);
+    }
+
+    /**
+     * Leaves the acceleration at (x, y) in forceBuffer, without allocating
+     */
+    protected void acceleration(double x, double y) {
+        forceEvaluations++;
+        lattice.force(x, y, forceBuffer);
+        forceBuffer[0] *= invMass;
+        forceBuffer[1] *= invMass;
+    }
+
     // private auxiliary functions
 
     private Step<Vector2D> eulerPrecedingStep(double t, Vector2D r, Vector2D v, Vector2D a) {
         final Vector2D prevVel = sub(v, scalar(a, deltaT));
         final Vector2D prevPos = sum(sub(r, scalar(prevVel, deltaT)), scalar(a, deltaTSq / 2.0));
-        final Vector2D prevAcc = scalar(f.apply(prevPos, staticParticles), 1.0 / mass);
+        final Vector2D prevAcc = acceleration(prevPos);
         return new Step<>(t - deltaT, prevPos, prevVel, prevAcc);
     }
-
-    private Map<Vector2D, Boolean> initStaticParticles(double d, int n) {
-        final Map<Vector2D, Boolean> map = new HashMap<>(n * n);
-        for (int i = 0; i < n; i++)
-            for (int j = 0; j < n; j++)
-                map.put(new Vector2D((i + 1) * d, j * d), (i + j) % 2 == 0);
-
-        return map;
-    }
 }
\ No newline at end of file
@@ -0,0 +1,232 @@
+package ar.edu.itba.sds.bench;
+
+import ar.edu.itba.sds.algos2D.StepAlgorithm;
+import ar.edu.itba.sds.objects.AlgorithmType;
+import ar.edu.itba.sds.objects.ChargeLattice;
+import ar.edu.itba.sds.objects.Step;
+import ar.edu.itba.sds.objects.Vector2D;
+import ar.edu.itba.sds.output.BinaryStepWriter;
+import ar.edu.itba.sds.output.StepSink;
+import ar.edu.itba.sds.output.TextStepWriter;
+
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+import java.util.Properties;
+import java.util.Random;
+import java.util.function.BiFunction;
+import java.util.stream.Collectors;
+import java.util.stream.Stream;
+
+/**
+ * Measures steps per second and bytes allocated per step of the integrators, force kernels and output modes.
+ * Radiation cases run for each lattice size N, particles that end are restarted from the same initial state.
+ * One operation is one step, one force evaluation or one hasNext call.
+ */
+public class IntegratorBenchmark {
+    private static final String WARMUP_PARAM = "warmup";
+    private static final String ITERATIONS_PARAM = "iterations";
+    private static final String TIME_PARAM = "time";
+    private static final String N_PARAM = "n";
+    private static final String FILTER_PARAM = "filter";
+
+    private static final int DEFAULT_WARMUP = 5;
+    private static final int DEFAULT_ITERATIONS = 5;
+    private static final int DEFAULT_TIME_MILLIS = 1000;
+    private static final String DEFAULT_N = "4,8,16,32,64,128";
+
+    // Same values as config.json
+    private static final double RAD_MASS = 1e-27;
+    private static final double RAD_K = 1e10;
+    private static final double RAD_D = 1e-8;
+    private static final double RAD_Q = 1e-19;
+    private static final double RAD_V0 = 1e4;
+    private static final double RAD_DT = 1e-15;
+    private static final double RAD_DT_PRINT = 1e-15;
+    private static final double RAD_TOLERANCE = 1e-10;
+    private static final double OSC_MASS = 70;
+    private static final double OSC_K = 1e4;
+    private static final double OSC_GAMMA = 100;
+    private static final double OSC_R0 = 1;
+    private static final double OSC_A = 1;
+    private static final double OSC_DT = 1e-5;
+
+    private static final int NEAR_CELLS = 2;
+    private static final double FAR_TOLERANCE = 1e-4;
+    private static final int FORCE_POINTS = 1 << 12;
+    private static final int RAD_COLUMNS = 5;
+    // Output files are rewritten after this many steps, so they do not fill the disk
+    private static final int MAX_SINK_STEPS = 1 << 20;
+    private static final int OUTPUT_N = 16;
+
+    /**
+     * Radiation run that restarts from its initial state once the particle ends
+     */
+    private static final class RadRun {
+        private final AlgorithmType type;
+        private final ChargeLattice lattice;
+        private final double r0;
+        private StepAlgorithm algorithm;
+
+        private RadRun(AlgorithmType type, ChargeLattice lattice) {
+            this.type = type;
+            this.lattice = lattice;
+            // Between the two middle rows, as RadiationInteraction draws r0
+            this.r0 = (lattice.getN() - 1) * RAD_D / 2 + RAD_D / 3;
+            restart();
+        }
+
+        private Step<Vector2D> next() {
+            if (!algorithm.hasNext()) restart();
+            return algorithm.next();
+        }
+
+        private void restart() {
+            algorithm = StepAlgorithm.algorithmBuilder(type, lattice, RAD_DT, RAD_DT_PRINT, RAD_TOLERANCE, r0, RAD_V0, RAD_MASS);
+        }
+    }
+
+    /**
+     * Damped oscillator run that restarts once it reaches tf
+     */
+    private static final class OscRun {
+        private final AlgorithmType type;
+        private final BiFunction<Double, Double, Double> f;
+        private ar.edu.itba.sds.algos.StepAlgorithm algorithm;
+
+        private OscRun(AlgorithmType type) {
+            this.type = type;
+            this.f = (r, v) -> -OSC_K * r - OSC_GAMMA * v;
+            restart();
+        }
+
+        private Step<Double> next() {
+            if (!algorithm.hasNext()) restart();
+            return algorithm.next();
+        }
+
+        private void restart() {
+            final double v0 = -OSC_A * OSC_GAMMA / (2.0 * OSC_MASS);
+            algorithm = ar.edu.itba.sds.algos.StepAlgorithm.algorithmBuilder(type, f, OSC_DT, 5.0, OSC_R0, v0, OSC_MASS);
+        }
+    }
+
+    public static void main(String[] args) throws IOException {
+        final Properties properties = System.getProperties();
+        final int warmup = Integer.parseInt(properties.getProperty(WARMUP_PARAM, String.valueOf(DEFAULT_WARMUP)));
+        final int iterations = Integer.parseInt(properties.getProperty(ITERATIONS_PARAM, String.valueOf(DEFAULT_ITERATIONS)));
+        final int timeMillis = Integer.parseInt(properties.getProperty(TIME_PARAM, String.valueOf(DEFAULT_TIME_MILLIS)));
+        final List<Integer> nValues = Arrays.stream(properties.getProperty(N_PARAM, DEFAULT_N).split(","))
+                .map(String::trim).map(Integer::parseInt).collect(Collectors.toList());
+        final String filter = properties.getProperty(FILTER_PARAM, "");
+
+        final MicroBenchmark harness = new MicroBenchmark(warmup, iterations, timeMillis);
+        final Path dir = Files.createTempDirectory("integrator-bench");
+        final List<String> names = new ArrayList<>();
+        final List<MicroBenchmark.Operation> operations = new ArrayList<>();
+        final List<String> buildMillis = new ArrayList<>();
+
+        // Damped oscillator integrators
+        for (AlgorithmType type : new AlgorithmType[]{AlgorithmType.VERLET, AlgorithmType.BEEMAN, AlgorithmType.GEAR}) {
+            final OscRun run = new OscRun(type);
+            names.add("osc/" + type.name() + "/next");
+            operations.add(ops -> {
+                double sum = 0.0;
+                for (int i = 0; i < ops; i++) sum += run.next().getPos();
+                return sum;
+            });
+        }
+
+        // Radiation kernels and integrators for each lattice size
+        for (int n : nValues) {
+            final ChargeLattice exact = new ChargeLattice(n, RAD_D, RAD_K, RAD_Q);
+            names.add("rad/force/exact/N=" + n);
+            operations.add(forceOperation(exact, n));
+            final long buildStart = System.nanoTime();
+            final ChargeLattice near = new ChargeLattice(n, RAD_D, RAD_K, RAD_Q, NEAR_CELLS, FAR_TOLERANCE);
+            buildMillis.add(String.format("N=%d %.1f ms", n, (System.nanoTime() - buildStart) / 1e6));
+            names.add("rad/force/near" + NEAR_CELLS + "/N=" + n);
+            operations.add(forceOperation(near, n));
+
+            final StepAlgorithm running = StepAlgorithm.algorithmBuilder(AlgorithmType.BEEMAN, exact, RAD_DT, RAD_DT_PRINT, RAD_TOLERANCE,
+                    (n - 1) * RAD_D / 2 + RAD_D / 3, RAD_V0, RAD_MASS);
+            // The first step skips the checks
+            running.next();
+            names.add("rad/hasNext/N=" + n);
+            operations.add(ops -> {
+                double count = 0.0;
+                for (int i = 0; i < ops; i++) if (running.hasNext()) count++;
+                return count;
+            });
+
+            for (AlgorithmType type : new AlgorithmType[]{AlgorithmType.BEEMAN, AlgorithmType.DOPRI5}) {
+                final RadRun run = new RadRun(type, exact);
+                names.add("rad/" + type.name() + "/next/N=" + n);
+                operations.add(ops -> {
+                    double sum = 0.0;
+                    for (int i = 0; i < ops; i++) sum += run.next().getPos().getX();
+                    return sum;
+                });
+            }
+        }
+
+        // Beeman steps written through each output mode
+        final ChargeLattice outputLattice = new ChargeLattice(OUTPUT_N, RAD_D, RAD_K, RAD_Q);
+        for (String extension : new String[]{".txt", BinaryStepWriter.EXTENSION}) {
+            final String filename = dir.resolve("steps" + extension).toString();
+            final RadRun run = new RadRun(AlgorithmType.BEEMAN, outputLattice);
+            final StepSink[] sink = {null};
+            final int[] written = {MAX_SINK_STEPS};
+            names.add("rad/BEEMAN/write" + extension + "/N=" + OUTPUT_N);
+            operations.add(ops -> {
+                for (int i = 0; i < ops; i++) {
+                    if (written[0] == MAX_SINK_STEPS) {
+                        if (sink[0] != null) sink[0].close();
+                        sink[0] = StepSink.open(filename, RAD_COLUMNS, TextStepWriter.DEFAULT_PRECISION, 0);
+                        written[0] = 0;
+                    }
+                    final Step<Vector2D> step = run.next();
+                    sink[0].write(step.getTime(), step.getPos().getX(), step.getPos().getY(), step.getVel().getX(), step.getVel().getY());
+                    written[0]++;
+                }
+                return written[0];
+            });
+        }
+
+        System.out.printf("Near%d far field tables built in: %s\n", NEAR_CELLS, String.join(", ", buildMillis));
+        System.out.printf("Warm-up %d x %d ms, measure %d x %d ms\n\n", warmup, timeMillis, iterations, timeMillis);
+        MicroBenchmark.printHeader(System.out);
+        for (int i = 0; i < names.size(); i++) {
+            if (!names.get(i).contains(filter)) continue;
+            MicroBenchmark.print(System.out, harness.measure(names.get(i), operations.get(i)));
+        }
+
+        try (Stream<Path> files = Files.list(dir)) {
+            for (Path file : files.collect(Collectors.toList())) Files.deleteIfExists(file);
+        }
+        Files.deleteIfExists(dir);
+    }
+
+    private static MicroBenchmark.Operation forceOperation(ChargeLattice lattice, int n) {
+        // Fixed random points inside the box, so every N is measured on the same kind of positions
+        final Random random = new Random(n);
+        final double[] xs = new double[FORCE_POINTS], ys = new double[FORCE_POINTS];
+        for (int i = 0; i < FORCE_POINTS; i++) {
+            xs[i] = random.nextDouble() * n * RAD_D;
+            ys[i] = random.nextDouble() * (n - 1) * RAD_D;
+        }
+        final double[] out = new double[2];
+        return ops -> {
+            double sum = 0.0;
+            for (int i = 0; i < ops; i++) {
+                final int index = i & (FORCE_POINTS - 1);
+                lattice.force(xs[index], ys[index], out);
+                sum += out[0];
+            }
+            return sum;
+        };
+    }
+}
@@ -0,0 +1,159 @@
+package ar.edu.itba.sds.bench;
+
+import java.io.IOException;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.management.ManagementFactory;
+import java.lang.management.ThreadMXBean;
+
+/**
+ * Minimal JMH style harness: each benchmark runs timed warm-up iterations, so the JIT compiles the hot path,
+ * then timed measurement iterations. Every iteration calls the operation in growing batches until it lasts
+ * iterationMillis. Reports mean operations per second with its standard deviation and bytes allocated per
+ * operation by the measuring thread, when the JVM supports it. Results are consumed so no work is eliminated.
+ */
+public class MicroBenchmark {
+    public interface Operation {
+        /**
+         * Runs ops operations, returns a value depending on their results
+         */
+        double run(int ops) throws IOException;
+    }
+
+    public static class Result {
+        private final String name;
+        private final double opsPerSecond;
+        private final double opsPerSecondDev;
+        private final double bytesPerOp;
+
+        private Result(String name, double opsPerSecond, double opsPerSecondDev, double bytesPerOp) {
+            this.name = name;
+            this.opsPerSecond = opsPerSecond;
+            this.opsPerSecondDev = opsPerSecondDev;
+            this.bytesPerOp = bytesPerOp;
+        }
+
+        public String getName() {
+            return name;
+        }
+
+        public double getOpsPerSecond() {
+            return opsPerSecond;
+        }
+
+        public double getOpsPerSecondDev() {
+            return opsPerSecondDev;
+        }
+
+        /**
+         * @return bytes allocated per operation, NaN if the JVM does not track thread allocations
+         */
+        public double getBytesPerOp() {
+            return bytesPerOp;
+        }
+    }
+
+    private static final long MIN_BATCH_NANOS = 1_000_000L;
+    private static final int MAX_BATCH = 1 << 24;
+
+    // Keeps results alive, so the JIT can not drop the measured work
+    private static volatile double sink;
+
+    private final int warmupIterations;
+    private final int measureIterations;
+    private final long iterationNanos;
+    private final com.sun.management.ThreadMXBean allocationBean;
+    private final PrintStream out;
+
+    public MicroBenchmark(int warmupIterations, int measureIterations, long iterationMillis) {
+        this.warmupIterations = warmupIterations;
+        this.measureIterations = measureIterations;
+        this.iterationNanos = iterationMillis * 1_000_000L;
+        this.out = System.out;
+
+        final ThreadMXBean bean = ManagementFactory.getThreadMXBean();
+        com.sun.management.ThreadMXBean allocationBean = null;
+        if (bean instanceof com.sun.management.ThreadMXBean && ((com.sun.management.ThreadMXBean) bean).isThreadAllocatedMemorySupported()) {
+            allocationBean = (com.sun.management.ThreadMXBean) bean;
+            allocationBean.setThreadAllocatedMemoryEnabled(true);
+        }
+        this.allocationBean = allocationBean;
+    }
+
+    public Result measure(String name, Operation operation) throws IOException {
+        // Simulations log when a run ends, which would flood the results
+        System.setOut(new PrintStream(new OutputStream() {
+            @Override
+            public void write(int b) {
+            }
+
+            @Override
+            public void write(byte[] b, int off, int len) {
+            }
+        }));
+        try {
+            for (int i = 0; i < warmupIterations; i++)
+                runIteration(operation);
+
+            final double[] rates = new double[measureIterations];
+            long totalOps = 0;
+            long totalBytes = 0;
+            for (int i = 0; i < measureIterations; i++) {
+                final long bytesBefore = allocatedBytes();
+                final long start = System.nanoTime();
+                final long ops = runIteration(operation);
+                final long elapsed = System.nanoTime() - start;
+                totalBytes += allocatedBytes() - bytesBefore;
+                totalOps += ops;
+                rates[i] = ops / (elapsed / 1e9);
+            }
+
+            double mean = 0.0;
+            for (double rate : rates) mean += rate;
+            mean /= rates.length;
+            double dev = 0.0;
+            for (double rate : rates) dev += (rate - mean) * (rate - mean);
+            dev = (rates.length > 1) ? Math.sqrt(dev / (rates.length - 1)) : 0.0;
+
+            final double bytesPerOp = (allocationBean != null) ? (double) totalBytes / totalOps : Double.NaN;
+            return new Result(name, mean, dev, bytesPerOp);
+        } finally {
+            System.setOut(out);
+        }
+    }
+
+    public static void printHeader(PrintStream out) {
+        out.printf("%-36s %16s %14s %14s\n", "benchmark", "ops/s", "± ops/s", "B/op");
+    }
+
+    public static void print(PrintStream out, Result result) {
+        out.printf("%-36s %16.0f %14.0f %14.1f\n", result.getName(), result.getOpsPerSecond(), result.getOpsPerSecondDev(), result.getBytesPerOp());
+    }
+
+    // private auxiliary functions
+
+    /**
+     * Runs batches until the iteration lasts iterationNanos, returns operations run
+     */
+    private long runIteration(Operation operation) throws IOException {
+        long ops = 0;
+        int batch = 1;
+        final long start = System.nanoTime();
+        long elapsed = 0;
+        while (elapsed < iterationNanos) {
+            final long batchStart = System.nanoTime();
+            sink += operation.run(batch);
+            final long batchElapsed = System.nanoTime() - batchStart;
+            ops += batch;
+            // Grow short batches, so timer calls do not weigh in the measurement
+            if (batchElapsed < MIN_BATCH_NANOS && batch < MAX_BATCH) batch *= 2;
+            elapsed = System.nanoTime() - start;
+        }
+        return ops;
+    }
+
+    private long allocatedBytes() {
+        if (allocationBean == null) return 0;
+        return allocationBean.getThreadAllocatedBytes(Thread.currentThread().getId());
+    }
+}
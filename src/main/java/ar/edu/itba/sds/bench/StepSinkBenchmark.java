@@ -0,0 +1,79 @@
+package ar.edu.itba.sds.bench;
+
+import ar.edu.itba.sds.output.BinaryStepWriter;
+import ar.edu.itba.sds.output.StepSink;
+import ar.edu.itba.sds.output.TextStepWriter;
+
+import java.io.BufferedWriter;
+import java.io.FileWriter;
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.util.Properties;
+
+/**
+ * Compares step output throughput with dt_print = dt_sim, so every simulated step is written:
+ * the former open, format with %.30E and close per step path against the buffered text and binary sinks.
+ * Records are radiation steps (t x y vx vy) along a synthetic trajectory.
+ */
+public class StepSinkBenchmark {
+    private static final String STEPS_PARAM = "steps";
+    private static final String DIR_PARAM = "dir";
+    private static final String PRECISION_PARAM = "precision";
+
+    private static final int DEFAULT_STEPS = 200000;
+    private static final int COLUMNS = 5;
+    private static final double DELTA_T = 1e-16;
+
+    private interface Writer {
+        void write(double... values) throws IOException;
+    }
+
+    public static void main(String[] args) throws IOException {
+        final Properties properties = System.getProperties();
+        final int steps = Integer.parseInt(properties.getProperty(STEPS_PARAM, String.valueOf(DEFAULT_STEPS)));
+        final int precision = Integer.parseInt(properties.getProperty(PRECISION_PARAM, String.valueOf(TextStepWriter.DEFAULT_PRECISION)));
+        final Path dir = properties.getProperty(DIR_PARAM) != null
+                ? Paths.get(properties.getProperty(DIR_PARAM)) : Files.createTempDirectory("step-sink-bench");
+
+        System.out.printf("Writing %d steps to %s\n\n", steps, dir);
+        System.out.printf("%-24s %14s %12s %12s\n", "sink", "steps/s", "MB/s", "size (MB)");
+
+        // Former path, a new FileWriter per step
+        final Path legacyFile = dir.resolve("legacy.txt");
+        Files.deleteIfExists(legacyFile);
+        run("append per step %.30E", legacyFile, steps, values -> {
+            try (BufferedWriter writer = new BufferedWriter(new FileWriter(legacyFile.toString(), true))) {
+                writer.write(String.format("%.30E\n%.30E %.30E %.30E %.30E\n*\n", values[0], values[1], values[2], values[3], values[4]));
+            }
+        }, null);
+
+        final Path textFile = dir.resolve("sink.txt");
+        final StepSink textSink = new TextStepWriter(textFile.toString(), COLUMNS, precision, 0);
+        run(precision < TextStepWriter.DEFAULT_PRECISION ? "text sink %." + precision + "E" : "text sink shortest", textFile, steps, textSink::write, textSink);
+
+        final Path binaryFile = dir.resolve("sink" + BinaryStepWriter.EXTENSION);
+        final StepSink binarySink = new BinaryStepWriter(binaryFile.toString(), COLUMNS, 0);
+        run("binary sink", binaryFile, steps, binarySink::write, binarySink);
+    }
+
+    private static void run(String name, Path file, int steps, Writer writer, StepSink sink) throws IOException {
+        final double[] values = new double[COLUMNS];
+        final long start = System.nanoTime();
+        for (int i = 0; i < steps; i++) {
+            final double t = i * DELTA_T;
+            values[0] = t;
+            values[1] = 1e-8 + 1e4 * t;
+            values[2] = 7.5e-8 + 1e-9 * Math.sin(i * 1e-3);
+            values[3] = 1e4;
+            values[4] = 1e-1 * Math.cos(i * 1e-3);
+            writer.write(values);
+        }
+        if (sink != null) sink.close();
+        final double seconds = (System.nanoTime() - start) / 1e9;
+
+        final double megabytes = Files.size(file) / 1e6;
+        System.out.printf("%-24s %14.0f %12.2f %12.2f\n", name, steps / seconds, megabytes / seconds, megabytes);
+    }
+}
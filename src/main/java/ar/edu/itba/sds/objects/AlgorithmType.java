@@ -3,7 +3,8 @@ package ar.edu.itba.sds.objects;
 public enum AlgorithmType {
     BEEMAN("Beeman"),
     VERLET("Verlet"),
-    GEAR("Gear");
+    GEAR("Gear"),
+    DOPRI5("Dopri5");
 
     private final String key;
 
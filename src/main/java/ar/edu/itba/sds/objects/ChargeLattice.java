@@ -0,0 +1,287 @@
+package ar.edu.itba.sds.objects;
+
+import java.util.stream.IntStream;
+
+/**
+ * N x N static charges stored as flat primitive arrays. Charge at column i, row j sits at ((i + 1) * d, j * d)
+ * and is positive when (i + j) is even. Index in the arrays is i * n + j.
+ * <p>
+ * Force evaluation is either an exact sum over every charge, or a near/far split: exact sum over the charges
+ * within nearCells of the current cell plus a far field correction, bilinearly interpolated from a table
+ * precomputed for every cell.
+ */
+public class ChargeLattice {
+    private static final int MIN_SAMPLES = 2;
+    private static final int MAX_SAMPLES = 32;
+    private static final int MAX_CHECKED_CELLS = 64;
+
+    private final int n;
+    private final double d;
+    private final double kqq;
+    private final double[] xs;
+    private final double[] ys;
+    private final double[] signs;
+
+    // Near/far split, nearCells == 0 means exact sum
+    private final int nearCells;
+    private int samples;
+    private double[] farTable;
+
+    public ChargeLattice(int n, double d, double k, double q) {
+        this(n, d, k, q, 0, 0.0);
+    }
+
+    /**
+     * @param nearCells charges within this many cells of the current one are summed exactly, 0 sums every charge
+     * @param tolerance max far field interpolation error, relative to the total force, checked on cell sub-midpoints
+     */
+    public ChargeLattice(int n, double d, double k, double q, int nearCells, double tolerance) {
+        this.n = n;
+        this.d = d;
+        this.kqq = k * q * q;
+        this.xs = new double[n * n];
+        this.ys = new double[n * n];
+        this.signs = new double[n * n];
+        for (int i = 0; i < n; i++) {
+            for (int j = 0; j < n; j++) {
+                xs[i * n + j] = (i + 1) * d;
+                ys[i * n + j] = j * d;
+                signs[i * n + j] = ((i + j) % 2 == 0) ? 1.0 : -1.0;
+            }
+        }
+
+        this.nearCells = nearCells;
+        if (nearCells > 0 && n > 1) buildFarTable(tolerance);
+    }
+
+    public int getN() {
+        return n;
+    }
+
+    public double getD() {
+        return d;
+    }
+
+    public int size() {
+        return xs.length;
+    }
+
+    public double getX(int index) {
+        return xs[index];
+    }
+
+    public double getY(int index) {
+        return ys[index];
+    }
+
+    public boolean isPositive(int index) {
+        return signs[index] > 0;
+    }
+
+    /**
+     * Writes into out the force over a charge q at (px, py), without allocating.
+     */
+    public void force(double px, double py, double[] out) {
+        if (farTable == null) {
+            exactForce(px, py, 0, n, 0, n, out);
+            out[0] *= kqq;
+            out[1] *= kqq;
+            return;
+        }
+
+        final int cx = cellX(px), cy = cellY(py);
+        nearForce(cx, cy, px, py, out);
+
+        // Bilinear interpolation of the far field inside the cell
+        final double u = clamp((px / d - cx) * samples, 0, samples);
+        final double v = clamp((py / d - cy) * samples, 0, samples);
+        final int su = Math.min((int) u, samples - 1), sv = Math.min((int) v, samples - 1);
+        final double fu = u - su, fv = v - sv;
+        final int base = tableIndex(cx, cy, su, sv);
+        final int right = base + 2, up = base + 2 * (samples + 1), upRight = up + 2;
+        for (int c = 0; c < 2; c++) {
+            out[c] += (1 - fu) * (1 - fv) * farTable[base + c] + fu * (1 - fv) * farTable[right + c]
+                    + (1 - fu) * fv * farTable[up + c] + fu * fv * farTable[upRight + c];
+            out[c] *= kqq;
+        }
+    }
+
+    /**
+     * @return distance from (px, py) to the closest charge, found by rounding on the regular grid
+     */
+    public double minDistance(double px, double py) {
+        final double i = clamp(Math.rint(px / d), 1, n);
+        final double j = clamp(Math.rint(py / d), 0, n - 1);
+        final double dx = px - i * d, dy = py - j * d;
+        return Math.sqrt(dx * dx + dy * dy);
+    }
+
+    // private auxiliary functions
+
+    // Unscaled force (without k * q * q) from charges with column in [iFrom, iTo) and row in [jFrom, jTo)
+    private void exactForce(double px, double py, int iFrom, int iTo, int jFrom, int jTo, double[] out) {
+        double fx = 0.0, fy = 0.0;
+        for (int i = iFrom; i < iTo; i++) {
+            for (int index = i * n + jFrom, end = i * n + jTo; index < end; index++) {
+                final double dx = px - xs[index];
+                final double dy = py - ys[index];
+                final double r2 = dx * dx + dy * dy;
+                final double f = signs[index] / (r2 * Math.sqrt(r2));
+                fx += f * dx;
+                fy += f * dy;
+            }
+        }
+        out[0] = fx;
+        out[1] = fy;
+    }
+
+    private void nearForce(int cx, int cy, double px, double py, double[] out) {
+        // Cell cx spans charge columns i + 1 in {cx, cx + 1}, cell cy spans rows {cy, cy + 1}
+        exactForce(px, py, nearFromX(cx), nearToX(cx), nearFromY(cy), nearToY(cy), out);
+    }
+
+    private int nearFromX(int cx) {
+        return Math.max(0, cx - nearCells);
+    }
+
+    private int nearToX(int cx) {
+        return Math.min(n, cx + nearCells);
+    }
+
+    private int nearFromY(int cy) {
+        return Math.max(0, cy - nearCells + 1);
+    }
+
+    private int nearToY(int cy) {
+        return Math.min(n, cy + nearCells + 1);
+    }
+
+    /**
+     * Doubles the samples per cell side until the interpolation error is under tolerance. Samples of the previous
+     * table are every other sample of the next one, so they are copied instead of summed again.
+     */
+    private void buildFarTable(double tolerance) {
+        double[] previous = null;
+        for (samples = MIN_SAMPLES; ; samples *= 2) {
+            final int side = samples + 1;
+            final double[] table = new double[cellsX() * cellsY() * side * side * 2];
+            final double[] coarse = previous;
+            IntStream.range(0, side * side).parallel().forEach(sample -> {
+                final int su = sample % side, sv = sample / side;
+                if (coarse != null && su % 2 == 0 && sv % 2 == 0) copyFarSamples(coarse, su / 2, sv / 2, table, su, sv);
+                else sumFarSamples(su, sv, table);
+            });
+            farTable = table;
+            if (samples >= MAX_SAMPLES || maxRelativeError() <= tolerance) return;
+            previous = table;
+        }
+    }
+
+    /**
+     * Writes the far field at sample (su, sv) of every cell into table.
+     * <p>
+     * Seen from sample (su, sv) of cell (cx, cy), the charge at column i, row j is at cell offset
+     * (a, b) = (cx - 1 - i, cy - j), with sign (-1)^(cx + cy + 1) * (-1)^(a + b). The near window of every cell is
+     * the same box of offsets, a and b in [-nearCells, nearCells), clipped to the lattice. So the far field of a cell
+     * is the sum of one kernel, zero inside that box, over the offsets of its charges, a rectangle read from the
+     * summed area table of the kernel. This takes O(n^2) per sample instead of O(n^2) per cell and sample.
+     */
+    private void sumFarSamples(int su, int sv, double[] table) {
+        final double alpha = (double) su / samples, beta = (double) sv / samples;
+        // a in [-n, n - 2] and b in [1 - n, n - 2] over every cell, stored shifted to start at 0
+        final int width = 2 * n - 1, height = 2 * n - 2, stride = height + 1;
+        // sums[(A * stride + B) * 2 + c] is the kernel summed over shifted offsets below A and B
+        final double[] sums = new double[(width + 1) * stride * 2];
+        for (int sa = 0; sa < width; sa++) {
+            final int a = sa - n;
+            final boolean nearA = a >= -nearCells && a < nearCells;
+            for (int sb = 0; sb < height; sb++) {
+                final int b = sb - n + 1;
+                double gx = 0.0, gy = 0.0;
+                if (!nearA || b < -nearCells || b >= nearCells) {
+                    final double dx = (a + alpha) * d, dy = (b + beta) * d;
+                    final double r2 = dx * dx + dy * dy;
+                    final double f = (((a + b) & 1) == 0 ? 1.0 : -1.0) / (r2 * Math.sqrt(r2));
+                    gx = f * dx;
+                    gy = f * dy;
+                }
+                final int index = ((sa + 1) * stride + sb + 1) * 2, left = index - stride * 2;
+                sums[index] = gx + sums[left] + sums[index - 2] - sums[left - 2];
+                sums[index + 1] = gy + sums[left + 1] + sums[index - 1] - sums[left - 1];
+            }
+        }
+
+        for (int cx = 0; cx < cellsX(); cx++) {
+            for (int cy = 0; cy < cellsY(); cy++) {
+                // Charges of cell (cx, cy) have shifted offsets A in [cx, cx + n) and B in [cy, cy + n)
+                final int low = (cx * stride + cy) * 2, high = ((cx + n) * stride + cy) * 2, rows = n * 2;
+                final double sign = ((cx + cy) % 2 == 0) ? -1.0 : 1.0;
+                final int index = tableIndex(cx, cy, su, sv);
+                for (int c = 0; c < 2; c++)
+                    table[index + c] = sign * (sums[high + rows + c] - sums[low + rows + c] - sums[high + c] + sums[low + c]);
+            }
+        }
+    }
+
+    private void copyFarSamples(double[] coarse, int coarseU, int coarseV, double[] table, int su, int sv) {
+        for (int cx = 0; cx < cellsX(); cx++) {
+            for (int cy = 0; cy < cellsY(); cy++) {
+                final int from = tableIndex(cx, cy, coarseU, coarseV, samples / 2), to = tableIndex(cx, cy, su, sv);
+                table[to] = coarse[from];
+                table[to + 1] = coarse[from + 1];
+            }
+        }
+    }
+
+    // Compares interpolated and exact force at sub cell midpoints, over a spread of cells
+    private double maxRelativeError() {
+        final int cells = cellsX() * cellsY();
+        final int step = Math.max(1, cells / MAX_CHECKED_CELLS);
+        return IntStream.range(0, (cells + step - 1) / step).parallel().mapToDouble(c -> {
+            final int cell = c * step;
+            final int cx = cell / cellsY(), cy = cell % cellsY();
+            final double[] exact = new double[2], approx = new double[2];
+            double maxError = 0.0;
+            for (int sv = 0; sv < samples; sv++) {
+                for (int su = 0; su < samples; su++) {
+                    final double px = (cx + (su + 0.5) / samples) * d, py = (cy + (sv + 0.5) / samples) * d;
+                    if (minDistance(px, py) < 1e-3 * d) continue;
+                    exactForce(px, py, 0, n, 0, n, exact);
+                    force(px, py, approx);
+                    final double errX = approx[0] / kqq - exact[0], errY = approx[1] / kqq - exact[1];
+                    final double norm = Math.sqrt(exact[0] * exact[0] + exact[1] * exact[1]);
+                    if (norm > 0) maxError = Math.max(maxError, Math.sqrt(errX * errX + errY * errY) / norm);
+                }
+            }
+            return maxError;
+        }).max().orElse(0.0);
+    }
+
+    private int cellsX() {
+        return n;
+    }
+
+    private int cellsY() {
+        return n - 1;
+    }
+
+    private int cellX(double px) {
+        return (int) clamp(Math.floor(px / d), 0, cellsX() - 1);
+    }
+
+    private int cellY(double py) {
+        return (int) clamp(Math.floor(py / d), 0, cellsY() - 1);
+    }
+
+    private int tableIndex(int cx, int cy, int su, int sv) {
+        return tableIndex(cx, cy, su, sv, samples);
+    }
+
+    private int tableIndex(int cx, int cy, int su, int sv, int tableSamples) {
+        return (((cx * cellsY() + cy) * (tableSamples + 1) + sv) * (tableSamples + 1) + su) * 2;
+    }
+
+    private static double clamp(double value, double min, double max) {
+        return Math.max(min, Math.min(max, value));
+    }
+}
@@ -0,0 +1,56 @@
+package ar.edu.itba.sds.objects;
+
+/**
+ * Fixed capacity history of the last 2D vectors, stored in primitive arrays.
+ * Pushing over a full history overwrites the oldest vector. Not thread safe.
+ */
+public class VectorHistory {
+    private final double[] xs;
+    private final double[] ys;
+    private int head;
+
+    public VectorHistory(int capacity) {
+        if (capacity <= 0) throw new IllegalArgumentException("History capacity must be positive");
+        this.xs = new double[capacity];
+        this.ys = new double[capacity];
+        this.head = capacity - 1;
+    }
+
+    public void push(double x, double y) {
+        head = (head + 1 == xs.length) ? 0 : head + 1;
+        xs[head] = x;
+        ys[head] = y;
+    }
+
+    public void push(Vector2D v) {
+        push(v.getX(), v.getY());
+    }
+
+    /**
+     * @param back 0 for the last pushed vector, 1 for the one before it and so on
+     */
+    public double getX(int back) {
+        return xs[index(back)];
+    }
+
+    public double getY(int back) {
+        return ys[index(back)];
+    }
+
+    public Vector2D get(int back) {
+        final int index = index(back);
+        return new Vector2D(xs[index], ys[index]);
+    }
+
+    public int capacity() {
+        return xs.length;
+    }
+
+    // private auxiliary functions
+
+    private int index(int back) {
+        if (back < 0 || back >= xs.length) throw new IndexOutOfBoundsException("History only keeps " + xs.length + " vectors");
+        final int index = head - back;
+        return (index < 0) ? index + xs.length : index;
+    }
+}
@@ -0,0 +1,87 @@
+package ar.edu.itba.sds.output;
+
+import java.io.IOException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.channels.FileChannel;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Paths;
+import java.nio.file.StandardOpenOption;
+
+/**
+ * Writes a columnar binary trajectory, all values little endian.
+ * Header: 8 byte magic, int32 version, int32 columns per record, int32 param count, int32 reserved,
+ * followed by param count float64 run parameters. Then one record of columns float64 per step.
+ */
+public class BinaryStepWriter implements StepSink {
+    public static final String EXTENSION = ".bin";
+    public static final byte[] MAGIC = "SDSTRAJ\0".getBytes(StandardCharsets.US_ASCII);
+    public static final int VERSION = 1;
+
+    private static final int BUFFER_SIZE = 1 << 16;
+
+    private final FileChannel channel;
+    private final ByteBuffer buffer;
+    private final int columns;
+    private final int flushEvery;
+    private long records;
+    private long bytesWritten;
+
+    /**
+     * @param flushEvery records between writes to disk, 0 only writes when the buffer is full
+     */
+    public BinaryStepWriter(String filename, int columns, int flushEvery, double... params) throws IOException {
+        this.channel = FileChannel.open(Paths.get(filename),
+                StandardOpenOption.CREATE, StandardOpenOption.WRITE, StandardOpenOption.TRUNCATE_EXISTING);
+        this.buffer = ByteBuffer.allocateDirect(BUFFER_SIZE).order(ByteOrder.LITTLE_ENDIAN);
+        this.columns = columns;
+        this.flushEvery = flushEvery;
+        this.records = 0;
+        this.bytesWritten = 0;
+
+        buffer.put(MAGIC);
+        buffer.putInt(VERSION);
+        buffer.putInt(columns);
+        buffer.putInt(params.length);
+        buffer.putInt(0);
+        for (double param : params) {
+            if (buffer.remaining() < Double.BYTES) drain();
+            buffer.putDouble(param);
+        }
+    }
+
+    @Override
+    public void write(double... values) throws IOException {
+        if (values.length != columns) throw new IllegalArgumentException("Invalid record width");
+        if (buffer.remaining() < columns * Double.BYTES) drain();
+        for (double value : values)
+            buffer.putDouble(value);
+        if (flushEvery > 0 && ++records % flushEvery == 0) drain();
+    }
+
+    @Override
+    public void flush() throws IOException {
+        drain();
+    }
+
+    @Override
+    public long getBytesWritten() {
+        return bytesWritten;
+    }
+
+    private void drain() throws IOException {
+        buffer.flip();
+        while (buffer.hasRemaining())
+            bytesWritten += channel.write(buffer);
+        buffer.clear();
+    }
+
+    @Override
+    public void close() throws IOException {
+        try {
+            drain();
+        } finally {
+            channel.close();
+        }
+    }
+}
@@ -0,0 +1,107 @@
+package ar.edu.itba.sds.output;
+
+import org.json.JSONObject;
+
+import java.io.BufferedWriter;
+import java.io.Closeable;
+import java.io.IOException;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Paths;
+
+/**
+ * Writes run telemetry to a side file as JSON lines: one object every reportMillis while running, and one when
+ * the run ends. Each line is flushed, so other processes can follow the file while the run goes on.
+ * Simulations only call {@link #isDue()} every {@link #CHECK_MASK} + 1 steps, so the step loop does not read the clock.
+ */
+public class StatsReporter implements Closeable {
+    public static final long DEFAULT_REPORT_MILLIS = 10000;
+    // Steps between clock reads minus one, a power of two minus one so checking is a mask
+    public static final long CHECK_MASK = (1 << 12) - 1;
+
+    private static final double MB = 1 << 20;
+
+    private final BufferedWriter writer;
+    private final String dynamicFilename;
+    private final long reportMillis;
+    private final long startNanos;
+    private long nextReportNanos;
+    private long lastNanos, lastSteps, lastForceEvaluations;
+
+    public StatsReporter(String filename, String dynamicFilename, long reportMillis) throws IOException {
+        this.writer = Files.newBufferedWriter(Paths.get(filename), StandardCharsets.UTF_8);
+        this.dynamicFilename = dynamicFilename;
+        this.reportMillis = reportMillis;
+        this.startNanos = System.nanoTime();
+        this.nextReportNanos = startNanos + reportMillis * 1_000_000L;
+        this.lastNanos = startNanos;
+        this.lastSteps = 0;
+        this.lastForceEvaluations = 0;
+    }
+
+    /**
+     * @return true if reportMillis went by since the last report
+     */
+    public boolean isDue() {
+        return System.nanoTime() >= nextReportNanos;
+    }
+
+    /**
+     * Writes one line, rates are measured since the previous one
+     *
+     * @param done true for the last line of the run
+     * @param time simulated time of the current step
+     * @param endTime simulated time the run ends at, NaN if it is not known in advance
+     * @param progress estimated fraction of the run done, in [0; 1]
+     * @param extra simulation specific fields added to the line, may be null
+     */
+    public void report(boolean done, long steps, long forceEvaluations, long bytesWritten, double time, double endTime,
+                       double progress, JSONObject extra) throws IOException {
+        final long now = System.nanoTime();
+        final double elapsed = (now - startNanos) / 1e9;
+        final double interval = (now - lastNanos) / 1e9;
+        final Runtime runtime = Runtime.getRuntime();
+
+        final JSONObject line = (extra != null) ? extra : new JSONObject();
+        line.put("file", dynamicFilename);
+        line.put("done", done);
+        line.put("report_ms", reportMillis);
+        putNumber(line, "elapsed_s", elapsed);
+        line.put("steps", steps);
+        putNumber(line, "steps_per_s", (steps - lastSteps) / interval);
+        line.put("force_evaluations", forceEvaluations);
+        putNumber(line, "force_evaluations_per_s", (forceEvaluations - lastForceEvaluations) / interval);
+        line.put("bytes_written", bytesWritten);
+        putNumber(line, "time", time);
+        putNumber(line, "end_time", endTime);
+        putNumber(line, "progress", progress);
+        // Remaining time at the mean speed so far
+        putNumber(line, "eta_s", done ? 0.0 : elapsed * (1 - progress) / progress);
+        putNumber(line, "heap_used_mb", (runtime.totalMemory() - runtime.freeMemory()) / MB);
+        putNumber(line, "heap_max_mb", runtime.maxMemory() / MB);
+
+        writer.write(line.toString());
+        writer.newLine();
+        writer.flush();
+
+        lastNanos = now;
+        lastSteps = steps;
+        lastForceEvaluations = forceEvaluations;
+        nextReportNanos = now + reportMillis * 1_000_000L;
+    }
+
+    @Override
+    public void close() throws IOException {
+        writer.close();
+    }
+
+    // private auxiliary functions
+
+    /**
+     * JSON has no NaN nor infinity, those values are written as null
+     */
+    private static void putNumber(JSONObject line, String key, double value) {
+        if (Double.isFinite(value)) line.put(key, value);
+        else line.put(key, JSONObject.NULL);
+    }
+}
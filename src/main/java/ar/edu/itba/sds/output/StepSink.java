@@ -0,0 +1,32 @@
+package ar.edu.itba.sds.output;
+
+import java.io.Closeable;
+import java.io.IOException;
+
+/**
+ * Destination of printed simulation steps, kept open for the whole run.
+ * Each record is one step: time followed by the particle columns.
+ */
+public interface StepSink extends Closeable {
+    void write(double... values) throws IOException;
+
+    void flush() throws IOException;
+
+    /**
+     * @return bytes handed to the file so far, records still buffered are not counted
+     */
+    long getBytesWritten();
+
+    /**
+     * Opens a binary sink if filename ends with {@link BinaryStepWriter#EXTENSION}, a text sink otherwise
+     *
+     * @param precision digits after the decimal point of text values, ignored for binary
+     * @param flushEvery records between flushes to disk, 0 only flushes when the buffer is full
+     * @param params run parameters saved in the binary header, ignored for text
+     */
+    static StepSink open(String filename, int columns, int precision, int flushEvery, double... params) throws IOException {
+        if (filename.endsWith(BinaryStepWriter.EXTENSION))
+            return new BinaryStepWriter(filename, columns, flushEvery, params);
+        return new TextStepWriter(filename, columns, precision, flushEvery);
+    }
+}
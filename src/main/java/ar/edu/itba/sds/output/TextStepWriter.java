@@ -0,0 +1,119 @@
+package ar.edu.itba.sds.output;
+
+import java.io.BufferedWriter;
+import java.io.FilterOutputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.io.OutputStreamWriter;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Paths;
+import java.util.Formatter;
+import java.util.Locale;
+
+/**
+ * Writes the text dynamic layout through one buffered stream:
+ * <pre>
+ * time
+ * x [y] vx [vy]
+ * *
+ * </pre>
+ * From {@link #DEFAULT_PRECISION} on, values are the shortest digits that read back as the same double, as
+ * Double.toString writes them, appended straight to a reused buffer so writing a record does not box values.
+ * Lower precisions round values with %.{precision}E.
+ */
+public class TextStepWriter implements StepSink {
+    // %.16E gives 17 significant digits, enough for any double, so from here on the shortest exact digits are written
+    public static final int DEFAULT_PRECISION = 16;
+
+    private static final int BUFFER_SIZE = 1 << 16;
+
+    private final BufferedWriter writer;
+    private final CountingOutputStream output;
+    private final int columns;
+    private final int flushEvery;
+    private final StringBuilder record;
+    // Only set below DEFAULT_PRECISION
+    private final Formatter formatter;
+    private final String valueFormat;
+    private long records;
+
+    public TextStepWriter(String filename, int columns, int precision, int flushEvery) throws IOException {
+        this.output = new CountingOutputStream(Files.newOutputStream(Paths.get(filename)));
+        this.writer = new BufferedWriter(new OutputStreamWriter(output, StandardCharsets.US_ASCII), BUFFER_SIZE);
+        this.columns = columns;
+        this.flushEvery = flushEvery;
+        this.record = new StringBuilder();
+        this.records = 0;
+        if (precision < DEFAULT_PRECISION) {
+            // Root locale so decimal separator is always a dot
+            this.formatter = new Formatter(record, Locale.ROOT);
+            this.valueFormat = "%." + precision + "E";
+        } else {
+            this.formatter = null;
+            this.valueFormat = null;
+        }
+    }
+
+    @Override
+    public void write(double... values) throws IOException {
+        if (values.length != columns) throw new IllegalArgumentException("Invalid record width");
+        record.setLength(0);
+        appendValue(values[0]);
+        record.append('\n');
+        for (int i = 1; i < columns; i++) {
+            appendValue(values[i]);
+            record.append(i + 1 < columns ? ' ' : '\n');
+        }
+        record.append("*\n");
+        writer.append(record);
+        if (flushEvery > 0 && ++records % flushEvery == 0) flush();
+    }
+
+    @Override
+    public void flush() throws IOException {
+        writer.flush();
+    }
+
+    @Override
+    public long getBytesWritten() {
+        return output.count;
+    }
+
+    @Override
+    public void close() throws IOException {
+        writer.close();
+    }
+
+    // private auxiliary functions
+
+    private void appendValue(double value) {
+        if (formatter == null) record.append(value);
+        else formatter.format(valueFormat, value);
+    }
+
+    /**
+     * Counts the bytes that reach the file stream
+     */
+    private static class CountingOutputStream extends FilterOutputStream {
+        private long count;
+
+        private CountingOutputStream(OutputStream out) {
+            super(out);
+            this.count = 0;
+        }
+
+        @Override
+        public void write(int b) throws IOException {
+            out.write(b);
+            count++;
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) throws IOException {
+            // FilterOutputStream would write byte by byte
+            out.write(b, off, len);
+            count += len;
+        }
+    }
+}
@@ -0,0 +1,96 @@
+package ar.edu.itba.sds.algos2D;
+
+import ar.edu.itba.sds.objects.AlgorithmType;
+import ar.edu.itba.sds.objects.ChargeLattice;
+import ar.edu.itba.sds.objects.Step;
+import ar.edu.itba.sds.objects.Vector2D;
+import org.junit.Test;
+
+import static org.junit.Assert.*;
+
+public class DormandPrinceTest {
+    // Same values as config.json
+    private static final int N = 16;
+    private static final double D = 1e-8;
+    private static final double K = 1e10;
+    private static final double Q = 1e-19;
+    private static final double MASS = 1e-27;
+    private static final double V0 = 1e4;
+    private static final double DT = 1e-15;
+    private static final double TOLERANCE = 1e-10;
+    // Between the two middle rows, as RadiationInteraction draws r0. The run ends after about 4400 printed steps
+    private static final double R0 = (N - 1) * D / 2 + D / 3;
+    private static final int MAX_PRINTED_STEPS = 1_000_000;
+    // Printed steps compared with Beeman, before the run ends
+    private static final int COMPARED_STEPS = 4000;
+    private static final double REFERENCE_TOLERANCE = 1e-14;
+
+    @Test
+    public void firstStepLeavesStartingWall() {
+        final StepAlgorithm algorithm = algorithm(DT);
+        final Step<Vector2D> step = algorithm.next();
+        assertEquals(DT, step.getTime(), 0.0);
+        assertTrue(step.getPos().getX() > 0.0);
+        assertTrue(algorithm.getStepCount() > 0);
+    }
+
+    @Test
+    public void runAdvancesUntilItEnds() {
+        final StepAlgorithm algorithm = algorithm(DT);
+        Step<Vector2D> step = null;
+        double lastTime = 0.0;
+        int printed = 0;
+        while (algorithm.hasNext()) {
+            assertTrue("Run did not end", ++printed <= MAX_PRINTED_STEPS);
+            step = algorithm.next();
+            assertTrue(step.getTime() > lastTime);
+            lastTime = step.getTime();
+        }
+        assertNotNull(step);
+        assertTrue(step.getPos().getX() > 0.0);
+    }
+
+    @Test
+    public void runEndingBeforeFirstPrintTimeStops() {
+        // Print interval longer than the whole run, only the ending step is returned
+        final double deltaTPrint = 1e-9;
+        final StepAlgorithm algorithm = algorithm(deltaTPrint);
+        final Step<Vector2D> step = algorithm.next();
+        assertTrue(step.getTime() > 0.0 && step.getTime() < deltaTPrint);
+        assertFalse(algorithm.hasNext());
+    }
+
+    @Test
+    public void fewerForceEvaluationsThanBeemanAtSameAccuracy() {
+        final Vector2D reference = run(algorithm(DT, REFERENCE_TOLERANCE), COMPARED_STEPS).getPos();
+        final StepAlgorithm dopri5 = algorithm(DT);
+        final StepAlgorithm beeman = StepAlgorithm.algorithmBuilder(AlgorithmType.BEEMAN, new ChargeLattice(N, D, K, Q), DT, DT, TOLERANCE, R0, V0, MASS);
+        final Step<Vector2D> dopri5Step = run(dopri5, COMPARED_STEPS);
+        final Step<Vector2D> beemanStep = run(beeman, COMPARED_STEPS);
+
+        assertEquals(beemanStep.getTime(), dopri5Step.getTime(), DT * 1e-6);
+        assertTrue(distance(dopri5Step.getPos(), reference) <= distance(beemanStep.getPos(), reference));
+        assertTrue(dopri5.getForceEvaluations() < beeman.getForceEvaluations());
+    }
+
+    private static StepAlgorithm algorithm(double deltaTPrint) {
+        return algorithm(deltaTPrint, TOLERANCE);
+    }
+
+    private static StepAlgorithm algorithm(double deltaTPrint, double tolerance) {
+        return StepAlgorithm.algorithmBuilder(AlgorithmType.DOPRI5, new ChargeLattice(N, D, K, Q), DT, deltaTPrint, tolerance, R0, V0, MASS);
+    }
+
+    private static Step<Vector2D> run(StepAlgorithm algorithm, int steps) {
+        Step<Vector2D> step = null;
+        for (int i = 0; i < steps; i++) {
+            assertTrue("Run ended early", algorithm.hasNext());
+            step = algorithm.next();
+        }
+        return step;
+    }
+
+    private static double distance(Vector2D a, Vector2D b) {
+        return Math.hypot(a.getX() - b.getX(), a.getY() - b.getY());
+    }
+}
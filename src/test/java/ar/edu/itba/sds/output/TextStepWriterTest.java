@@ -0,0 +1,67 @@
+package ar.edu.itba.sds.output;
+
+import org.junit.Rule;
+import org.junit.Test;
+import org.junit.rules.TemporaryFolder;
+
+import java.io.File;
+import java.io.IOException;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.util.List;
+import java.util.Locale;
+
+import static org.junit.Assert.*;
+
+public class TextStepWriterTest {
+    private static final double[] VALUES = {
+            0.0, -0.0, Double.MIN_VALUE, -Double.MIN_NORMAL / 3, Double.MIN_NORMAL, Double.MAX_VALUE,
+            1.0, 10.0, 1e-15, 1e22, 1e23, 1e100, 1e-100, 1e-300, 0.1, 1.0 / 3, 2.0 / 3, 9.9999999999999995e-8,
+            9.999999999999999e22, 123456789.12345678, -7.5e-8, Math.PI * 1e-19, Double.POSITIVE_INFINITY, Double.NaN
+    };
+
+    @Rule
+    public final TemporaryFolder folder = new TemporaryFolder();
+
+    @Test
+    public void defaultPrecisionReadsBackExactly() throws IOException {
+        final List<String> lines = write(TextStepWriter.DEFAULT_PRECISION);
+        for (int i = 0; i < VALUES.length; i++)
+            assertEquals(Double.doubleToLongBits(VALUES[i]), Double.doubleToLongBits(Double.parseDouble(value(lines, i))));
+    }
+
+    @Test
+    public void lowerPrecisionMatchesFormat() throws IOException {
+        final List<String> lines = write(4);
+        for (int i = 0; i < VALUES.length; i++)
+            assertEquals(String.format(Locale.ROOT, "%.4E", VALUES[i]), value(lines, i));
+    }
+
+    @Test
+    public void recordsFollowTheDynamicLayout() throws IOException {
+        final File file = folder.newFile();
+        try (StepSink sink = new TextStepWriter(file.getPath(), 3, TextStepWriter.DEFAULT_PRECISION, 0)) {
+            sink.write(0.5, 1.0, -2.0);
+            sink.write(1.5, 3.0, 4.0);
+            sink.flush();
+            assertEquals(Files.size(file.toPath()), sink.getBytesWritten());
+        }
+        assertEquals("0.5\n1.0 -2.0\n*\n1.5\n3.0 4.0\n*\n", new String(Files.readAllBytes(file.toPath()), StandardCharsets.US_ASCII));
+    }
+
+    /**
+     * Writes every value as the time of one 1 column record, returns the lines of the file
+     */
+    private List<String> write(int precision) throws IOException {
+        final File file = folder.newFile();
+        try (StepSink sink = new TextStepWriter(file.getPath(), 1, precision, 0)) {
+            for (double value : VALUES) sink.write(value);
+        }
+        return Files.readAllLines(file.toPath(), StandardCharsets.US_ASCII);
+    }
+
+    private static String value(List<String> lines, int record) {
+        // A 1 column record is the value and the frame end
+        return lines.get(2 * record);
+    }
+}
@@ -0,0 +1,320 @@
+import os
+import sys
+import csv
+import json
+import copy
+import time
+import subprocess
+import concurrent.futures as futures
+
+import utils
+import analyzerFun as anl
+import profiler as prof
+
+RAD_LAUNCHER = './target/tp4-simu-1.0/radiation-interaction.sh'
+OSC_LAUNCHER = './target/tp4-simu-1.0/damped-osc.sh'
+
+PARTIAL_SUFFIX = '.partial'
+STATS_SUFFIX = '.stats.jsonl'
+# A run is stalled once its stats file goes this many report intervals without a new line
+STALL_FACTOR = 3
+
+RAD_FIELDS = ['name', 'algo', 'dt', 'v0', 'rep', 'seed', 'steps', 'final_time', 'ending_motive',
+              'init_energy', 'trajectory_total', 'energy_diff_sum', 'energy_diff_avg', 'sim_seconds', 'analysis_seconds']
+OSC_FIELDS = ['name', 'algo', 'dt', 'ecm', 'sim_seconds', 'analysis_seconds']
+
+class SweepRun(object):
+    def __init__(self, name, algo, dt, v0=None, rep=None, seed=None):
+        """One simulation of the sweep grid
+
+        Parameters
+        ----------
+        name : str
+            Dynamic filename without extension, same as the simulator names it when run with -D params
+        algo : str
+            Algorithm name as used in config.json
+        dt : float
+            Simulation and print timestep
+        v0 : int
+            Incident particle speed, rad only
+        rep : int
+            Repetition index starting at 1, rad only
+        seed : int
+            Fixed seed for the initial position, rad only
+        """
+
+        self.name = name
+        self.algo = algo
+        self.dt = dt
+        self.v0 = v0
+        self.rep = rep
+        self.seed = seed
+
+def build_grid(system, algos, dt_list, v0_list=None, rep=1, base_seed=1):
+    # Repetition i uses the same seed for every algo, dt and v0, so runs compare on the same r0
+    runs = []
+    for algo in algos:
+        for dt in dt_list:
+            if system == 'osc':
+                runs.append(SweepRun(f'{algo.upper()}-{dt:.10E}', algo, dt))
+                continue
+            for v0 in v0_list:
+                for i in range(1, rep + 1):
+                    runs.append(SweepRun(f'{algo.upper()}_{dt:.5E}_{int(v0)}_{i}', algo, dt, int(v0), i, base_seed + i - 1))
+    return runs
+
+def write_run_config(config, system, run, config_filename, dynamic_filename, stats_filename=None, stats_every_ms=None):
+    # Every run gets its own config, the shared one is never modified
+    run_config = copy.deepcopy(config)
+    run_config['dynamic_file'] = dynamic_filename
+    run_config.pop('stats_file', None)
+    if stats_filename is not None:
+        run_config['stats_file'] = stats_filename
+        run_config['stats_every_ms'] = stats_every_ms
+    run_config['delta_t_sim'] = run.dt
+    run_config['delta_t_print'] = run.dt
+    run_config['plot'] = False
+    run_config[system]['algo'] = run.algo
+    if system == 'rad':
+        run_config['rad']['v0'] = run.v0
+        run_config['rad']['use_seed'] = True
+        run_config['rad']['seed'] = run.seed
+    with open(config_filename, 'w') as config_file:
+        json.dump(run_config, config_file, indent=4)
+
+def run_simulation(launcher, config_filename, partial_filename, dynamic_filename):
+    """Runs the simulator on its own config and renames the output once complete, returns elapsed seconds"""
+
+    start = time.perf_counter()
+    process = subprocess.run([launcher, f'-Dconfig={config_filename}'], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0 or not os.path.exists(partial_filename):
+        raise RuntimeError(f'Simulation for {dynamic_filename} failed: {process.stderr.strip()}')
+    # Rename is atomic, an existing dynamic file is always complete
+    os.replace(partial_filename, dynamic_filename)
+    return time.perf_counter() - start
+
+def analyze_rad_run(dynamic_filename, mass, k, N, D, Q, profiler=None):
+    algo, delta_t, v0 = anl.parse_rad_filename(dynamic_filename)
+    # Only summary values are needed, keep plot series small
+    metric = anl.analyze_rad(dynamic_filename, algo, mass, k, N, D, Q, v0, False, delta_t, max_plot_points=2, profiler=profiler)
+    return {
+        'steps': metric.step_count,
+        'final_time': metric.final_time,
+        'ending_motive': metric.ending_motive.name,
+        'init_energy': metric.init_energy,
+        'trajectory_total': metric.trajectory_total,
+        'energy_diff_sum': metric.energy_diff_sum,
+        'energy_diff_avg': metric.energy_diff_sum / (metric.step_count + 1)
+    }
+
+def analyze_osc_run(dynamic_filename, algo, delta_t, mass, k, gamma, amp, profiler=None):
+    metric = anl.analyze_osc(dynamic_filename, algo, mass, k, gamma, amp, False, delta_t, profiler)
+    return {'ecm': metric.ecm}
+
+def analyze_run(system, dynamic_filename, run, params, profiler=None):
+    # Runs on analysis worker processes, so it only takes picklable arguments
+    if system == 'rad':
+        return analyze_rad_run(dynamic_filename, float(params['mass']), float(params['k']), int(params['N']), float(params['D']), float(params['Q']), profiler)
+    return analyze_osc_run(dynamic_filename, run.algo, run.dt, float(params['mass']), float(params['k']), float(params['gamma']), float(params['A']), profiler)
+
+def read_results(results_filename, fields):
+    """Returns {name: row} for every complete row, and rewrites the file without a torn last line"""
+
+    if not os.path.exists(results_filename):
+        return {}
+    with open(results_filename, newline='') as results_file:
+        rows = [row for row in csv.DictReader(results_file) if all(row.get(field) not in (None, '') for field in fields)]
+    with open(results_filename + PARTIAL_SUFFIX, 'w', newline='') as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(results_filename + PARTIAL_SUFFIX, results_filename)
+    return {row['name']: row for row in rows}
+
+def sweep(config, system, runs, output_dir, results_filename, jobs=0, launcher=None, profiler=None, stats_every_ms=None):
+    """Runs every simulation in runs on a bounded pool and analyzes each one as soon as it ends
+
+    Runs already in results_filename are skipped, and runs whose dynamic file
+    already exists are only analyzed, so an interrupted sweep can be resumed.
+    Each finished run is appended to results_filename as a CSV row.
+
+    Parameters
+    ----------
+    config : dict
+        Base config, copied for every run
+    system : str
+        'rad' or 'osc'
+    runs : list
+        SweepRun list, as returned by build_grid
+    output_dir : str
+        Directory for dynamic files and run configs
+    results_filename : str
+        CSV results table
+    jobs : int
+        Runs in progress at once, simulating or analyzing. 0 uses every core
+    launcher : str
+        Simulator launch script, the one built by prepare.sh if None
+    profiler : Profiler
+        Optional profiler, writes a phase report for every analyzed run
+    stats_every_ms : int
+        If set, each simulation reports its progress to output_dir/name.stats.jsonl this often
+    """
+
+    fields = RAD_FIELDS if system == 'rad' else OSC_FIELDS
+    if launcher is None:
+        launcher = RAD_LAUNCHER if system == 'rad' else OSC_LAUNCHER
+    if jobs == 0:
+        jobs = os.cpu_count()
+    extension = os.path.splitext(config['dynamic_file'])[1] or '.txt'
+    config_dir = os.path.join(output_dir, 'configs')
+    os.makedirs(config_dir, exist_ok=True)
+
+    done = read_results(results_filename, fields)
+    pending = [run for run in runs if run.name not in done]
+    print(f'{len(runs) - len(pending)} runs already done, {len(pending)} pending')
+    if len(pending) == 0:
+        return
+
+    params = config[system]
+
+    def process_run(run, analysis_executor):
+        dynamic_filename = os.path.join(output_dir, run.name + extension)
+        sim_seconds = 0.0
+        if not os.path.exists(dynamic_filename):
+            config_filename = os.path.join(config_dir, run.name + '.json')
+            partial_filename = os.path.join(output_dir, run.name + PARTIAL_SUFFIX + extension)
+            stats_filename = os.path.join(output_dir, run.name + STATS_SUFFIX) if stats_every_ms is not None else None
+            write_run_config(config, system, run, config_filename, partial_filename, stats_filename, stats_every_ms)
+            sim_seconds = run_simulation(launcher, config_filename, partial_filename, dynamic_filename)
+
+        # Waiting here keeps at most jobs simulations and analyses alive at once
+        start = time.perf_counter()
+        row = analysis_executor.submit(analyze_run, system, dynamic_filename, run, params, profiler).result()
+        row.update({'name': run.name, 'algo': run.algo, 'dt': run.dt, 'sim_seconds': sim_seconds,
+                    'analysis_seconds': time.perf_counter() - start})
+        if system == 'rad':
+            row.update({'v0': run.v0, 'rep': run.rep, 'seed': run.seed})
+        return row
+
+    new_file = not os.path.exists(results_filename)
+    failed = 0
+    with open(results_filename, 'a', newline='') as results_file, \
+            futures.ProcessPoolExecutor(max_workers=jobs) as analysis_executor, \
+            futures.ThreadPoolExecutor(max_workers=jobs) as run_executor:
+        writer = csv.DictWriter(results_file, fieldnames=fields)
+        if new_file:
+            writer.writeheader()
+        run_futures = {run_executor.submit(process_run, run, analysis_executor): run for run in pending}
+        for count, future in enumerate(futures.as_completed(run_futures), 1):
+            run = run_futures[future]
+            try:
+                writer.writerow(future.result())
+                results_file.flush()
+                print(f'[{count}/{len(pending)}] {run.name} done')
+            except Exception as e:
+                failed += 1
+                print(f'[{count}/{len(pending)}] {run.name} failed: {e}')
+
+    if failed > 0:
+        print(f'{failed} runs failed, run the sweep again to retry them')
+
+def read_last_stats(stats_filename):
+    """Returns the last complete line of a simulation stats file as a dict, None if it has none"""
+
+    last = None
+    with open(stats_filename) as stats_file:
+        for line in stats_file:
+            # A line being written has no newline yet
+            if line.endswith('\n'):
+                last = line
+    return json.loads(last) if last is not None else None
+
+def get_status(output_dir, now=None):
+    """Returns [(name, last stats, stalled)] for every run in output_dir that reported its progress"""
+
+    now = time.time() if now is None else now
+    status = []
+    for entry in sorted(os.scandir(output_dir), key=lambda entry: entry.name):
+        if not entry.name.endswith(STATS_SUFFIX):
+            continue
+        stats = read_last_stats(entry.path)
+        if stats is None:
+            continue
+        stalled = not stats['done'] and now - entry.stat().st_mtime > STALL_FACTOR * stats['report_ms'] / 1000
+        status.append((entry.name[:-len(STATS_SUFFIX)], stats, stalled))
+    return status
+
+def print_status(output_dir):
+    status = get_status(output_dir)
+    done = sum(1 for _name, stats, _stalled in status if stats['done'])
+    print(f'{done} of {len(status)} reporting runs done')
+    for name, stats, stalled in status:
+        if stats['done']:
+            continue
+        eta = f'{stats["eta_s"]:.0f} s' if stats['eta_s'] is not None else 'unknown'
+        line = (f'{name}: {stats["progress"]:.1%} at t={stats["time"]:.3E}, {stats["steps_per_s"] or 0:.3E} steps/s, '
+                f'ETA {eta}, heap {stats["heap_used_mb"]:.0f} MB')
+        if stalled:
+            utils.print_with_color(line + ' STALLED', '#ff0000')
+        else:
+            print(line)
+
+# Analysis worker processes import this module
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('rad', 'osc', 'status'):
+        print('Run with python3 sweep.py rad|osc [results_file] or python3 sweep.py status')
+        sys.exit(1)
+    system = sys.argv[1]
+
+    # Read params from config.json
+    with open("config.json") as file:
+        config = json.load(file)
+
+    if system == 'status':
+        sweep_config = config.get("sweep", {})
+        output_dir = utils.read_optional_config_param(
+            sweep_config, "output_dir", lambda el : el, lambda el : True, "sweep")
+        print_status(output_dir)
+        sys.exit(0)
+
+    if system not in config:
+        utils.invalid_param(system)
+
+    utils.read_config_param(
+        config, "dynamic_file", lambda el : el, lambda el : True)
+    delta_t = utils.read_config_param(
+        config, "delta_t_sim", lambda el : float(el), lambda el : el > 0)
+    algo = utils.read_config_param(
+        config[system], "algo", lambda el : el, lambda el : True)
+
+    # Read optional sweep params, each defaults to the single value in config
+    sweep_config = config.get("sweep", {})
+    algos = utils.read_optional_config_param(
+        sweep_config, "algos", lambda el : list(el), lambda el : len(el) > 0, [algo])
+    dt_list = utils.read_optional_config_param(
+        sweep_config, "delta_t", lambda el : [float(dt) for dt in el], lambda el : len(el) > 0 and all(dt > 0 for dt in el), [delta_t])
+    jobs = utils.read_optional_config_param(
+        sweep_config, "jobs", lambda el : int(el), lambda el : el >= 0, 0)
+    output_dir = utils.read_optional_config_param(
+        sweep_config, "output_dir", lambda el : el, lambda el : True, "sweep")
+    launcher = utils.read_optional_config_param(
+        sweep_config, "launcher", lambda el : el, lambda el : True, None)
+    stats_every_ms = utils.read_optional_config_param(
+        sweep_config, "stats_every_ms", lambda el : int(el), lambda el : el > 0, None)
+
+    v0_list, rep, base_seed = None, 1, 1
+    if system == 'rad':
+        v0 = utils.read_config_param(
+            config["rad"], "v0", lambda el : int(el), lambda el : el > 0)
+        v0_list = utils.read_optional_config_param(
+            sweep_config, "v0", lambda el : [int(v) for v in el], lambda el : len(el) > 0 and all(v > 0 for v in el), [v0])
+        rep = utils.read_optional_config_param(
+            sweep_config, "rep", lambda el : int(el), lambda el : el > 0, 1)
+        base_seed = utils.read_optional_config_param(
+            config["rad"], "seed", lambda el : int(el), lambda el : el > 0, 1)
+
+    results_filename = sys.argv[2] if len(sys.argv) >= 3 else os.path.join(output_dir, f'results_{system}.csv')
+
+    runs = build_grid(system, algos, dt_list, v0_list, rep, base_seed)
+    profiler = prof.from_config(config.get("analysis", {}))
+    sweep(config, system, runs, output_dir, results_filename, jobs, launcher, profiler, stats_every_ms)
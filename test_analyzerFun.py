@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import analyzerFun as anl
+import dynamicLoader as loader
+
+# Same values as config.json
+MASS, K, N, D, Q, V0, DT = 1e-27, 1e10, 16, 1e-8, 1e-19, 1e4, 1e-15
+
+def _analyze(filename, max_plot_points=None):
+    return anl.analyze_rad(filename, 'beeman', MASS, K, N, D, Q, V0, False, DT, max_plot_points)
+
+def _frames(count):
+    frames = np.zeros(count, dtype=loader.RAD_DTYPE)
+    frames['t'] = np.arange(count) * DT
+    frames['x'] = np.arange(count) * 1e-11 + 1e-12
+    frames['y'] = 7.83e-8 + 1e-10 * np.sin(np.arange(count) * 1e-2)
+    frames['vx'] = V0
+    return frames
+
+def _write_text(path, frames):
+    with open(path, 'w') as text_file:
+        loader.write_text_frames(text_file, frames)
+    return str(path)
+
+def test_empty_file_raises(tmp_path):
+    filename = _write_text(tmp_path / 'empty.txt', _frames(0))
+    with pytest.raises(ValueError, match='has no frames'):
+        _analyze(filename)
+
+def test_header_only_binary_file_raises(tmp_path):
+    filename = str(tmp_path / 'empty.bin')
+    with open(filename, 'wb') as binary_file:
+        loader.write_binary_header(binary_file, loader.RAD_DTYPE, [MASS, K, N, D, Q, V0, 0.0, DT, DT])
+    with pytest.raises(ValueError, match='has no frames'):
+        _analyze(filename)
+
+def test_streaming_matches_whole_file(tmp_path, monkeypatch):
+    frames = _frames(1001)
+    filename = _write_text(tmp_path / 'run.txt', frames)
+    whole = _analyze(filename)
+    read_dynamic = loader.read_dynamic
+    monkeypatch.setattr(loader, 'read_dynamic', lambda filename, dtype: read_dynamic(filename, dtype, 7))
+    chunked = _analyze(filename)
+
+    assert chunked.step_count == whole.step_count == 1000
+    assert chunked.final_time == whole.final_time == frames['t'][-1]
+    assert chunked.trajectory_total == pytest.approx(whole.trajectory_total, rel=1e-12)
+    assert chunked.energy_diff_sum == pytest.approx(whole.energy_diff_sum, rel=1e-12)
+    np.testing.assert_allclose(chunked.trajectory_sum_interdist, whole.trajectory_sum_interdist, rtol=1e-12)
+    np.testing.assert_array_equal(chunked.time_vec, frames['t'])
+
+def test_decimated_series_keep_last_frame(tmp_path):
+    frames = _frames(1001)
+    metric = _analyze(_write_text(tmp_path / 'run.txt', frames), max_plot_points=10)
+
+    assert len(metric.time_vec) <= 11
+    assert metric.time_vec[-1] == frames['t'][-1]
+    assert metric.pos_x_list[-1] == frames['x'][-1]
+    assert len(metric.energy_diff_vec) == len(metric.time_vec) - 1
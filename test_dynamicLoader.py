@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import dynamicLoader as loader
+
+def _random_frames(count, dtype, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = np.empty(count, dtype=dtype)
+    for name in dtype.names:
+        # Spread over many exponents, so every value needs all 17 significant digits
+        frames[name] = rng.standard_normal(count) * 10.0 ** rng.integers(-20, 20, count)
+    return frames
+
+def _write_text(filename, frames, precision=16):
+    with open(filename, 'w') as dynamic_file:
+        loader.write_text_frames(dynamic_file, frames, precision)
+
+def _write_binary(filename, frames, params):
+    with open(filename, 'wb') as dynamic_file:
+        loader.write_binary_header(dynamic_file, frames.dtype, params)
+        loader.write_binary_frames(dynamic_file, frames)
+
+@pytest.mark.parametrize('dtype', [loader.RAD_DTYPE, loader.OSC_DTYPE])
+def test_text_round_trip_is_exact(tmp_path, dtype):
+    frames = _random_frames(1000, dtype)
+    filename = str(tmp_path / 'dynamic.txt')
+    _write_text(filename, frames)
+
+    assert not loader.is_binary(filename)
+    np.testing.assert_array_equal(loader.load_dynamic(filename, dtype), frames)
+
+@pytest.mark.parametrize('dtype', [loader.RAD_DTYPE, loader.OSC_DTYPE])
+def test_binary_round_trip_keeps_frames_and_params(tmp_path, dtype):
+    frames = _random_frames(1000, dtype)
+    params = list(np.arange(len(loader.BINARY_PARAMS[len(dtype.names)]), dtype=np.float64) + 0.5)
+    filename = str(tmp_path / 'dynamic.bin')
+    _write_binary(filename, frames, params)
+
+    assert loader.is_binary(filename)
+    read_params, read_frames = loader.open_binary(filename, dtype)
+    np.testing.assert_array_equal(read_frames, frames)
+    assert list(read_params.values()) == params
+    np.testing.assert_array_equal(loader.load_dynamic(filename, dtype), frames)
+
+def test_binary_drops_trailing_partial_record(tmp_path):
+    frames = _random_frames(10, loader.RAD_DTYPE)
+    filename = str(tmp_path / 'dynamic.bin')
+    _write_binary(filename, frames, [])
+    with open(filename, 'ab') as dynamic_file:
+        dynamic_file.write(b'\0' * (loader.RAD_DTYPE.itemsize - 1))
+
+    np.testing.assert_array_equal(loader.load_dynamic(filename, loader.RAD_DTYPE), frames)
+
+@pytest.mark.parametrize('extension', ['.txt', '.bin'])
+def test_chunks_cover_every_frame_in_order(tmp_path, extension):
+    frames = _random_frames(1001, loader.RAD_DTYPE)
+    filename = str(tmp_path / f'dynamic{extension}')
+    if extension == '.bin':
+        _write_binary(filename, frames, [0.0] * len(loader.BINARY_PARAMS[len(frames.dtype.names)]))
+    else:
+        _write_text(filename, frames)
+
+    chunks = list(loader.read_dynamic(filename, loader.RAD_DTYPE, chunk_frames=100))
+    assert [len(chunk) for chunk in chunks] == [100] * 10 + [1]
+    np.testing.assert_array_equal(np.concatenate(chunks), frames)
+
+def test_text_drops_trailing_partial_frame(tmp_path):
+    frames = _random_frames(10, loader.OSC_DTYPE)
+    filename = str(tmp_path / 'dynamic.txt')
+    _write_text(filename, frames)
+    # A simulation still writing has only printed the time of the next frame
+    with open(filename, 'a') as dynamic_file:
+        dynamic_file.write('1.0E+00\n')
+
+    np.testing.assert_array_equal(loader.load_dynamic(filename, loader.OSC_DTYPE), frames)
+
+def test_text_with_wrong_width_is_rejected(tmp_path):
+    filename = str(tmp_path / 'dynamic.txt')
+    with open(filename, 'w') as dynamic_file:
+        dynamic_file.write('0.0\n1.0 2.0 3.0\n*\n')
+
+    with pytest.raises(ValueError):
+        loader.load_dynamic(filename, loader.RAD_DTYPE)
+
+def test_time_slice_is_inclusive():
+    frames = np.zeros(10, dtype=loader.OSC_DTYPE)
+    frames['t'] = np.arange(10) * 0.5
+
+    np.testing.assert_array_equal(loader.time_slice(frames, 1.0, 2.0)['t'], [1.0, 1.5, 2.0])
+    assert len(loader.time_slice(frames, t_start=4.5)) == 1
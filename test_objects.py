@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+import objects as obj
+
+def _decimate(values, max_points, chunk_size):
+    series = obj.SeriesDecimator(['v'], max_points)
+    for start in range(0, len(values), chunk_size):
+        series.append(v=values[start:start + chunk_size])
+    return series
+
+@pytest.mark.parametrize('count', [1, 2, 99, 100, 101, 1000, 3202, 4097])
+def test_decimator_keeps_first_and_last_sample(count):
+    values = np.arange(count, dtype=np.float64)
+    series = _decimate(values, 100, 333)
+    kept = series['v']
+
+    assert kept[0] == 0.0
+    assert kept[-1] == count - 1
+    assert len(kept) <= 100 + 1
+    # Every sample but the last is on the stride
+    np.testing.assert_array_equal(kept[:-1] % series.stride, 0.0)
+    assert np.all(np.diff(kept) > 0)
+
+def test_decimator_does_not_depend_on_chunking():
+    values = np.random.default_rng(0).random(5000)
+    expected = _decimate(values, 64, len(values))['v']
+
+    for chunk_size in (1, 7, 64, 1000):
+        np.testing.assert_array_equal(_decimate(values, 64, chunk_size)['v'], expected)
+
+def test_decimator_without_limit_keeps_everything():
+    values = np.arange(1000, dtype=np.float64)
+    np.testing.assert_array_equal(_decimate(values, None, 97)['v'], values)
+
+def test_decimator_last_sample_does_not_shift_later_appends():
+    series = obj.SeriesDecimator(['v'], 4)
+    series.append(v=np.arange(10.0))
+    assert series['v'][-1] == 9.0
+    series.append(v=np.arange(10.0, 20.0))
+
+    kept = series['v']
+    assert kept[-1] == 19.0
+    np.testing.assert_array_equal(kept[:-1] % series.stride, 0.0)
+
+def test_aligned_series_stay_aligned():
+    series = obj.SeriesDecimator(['t', 'x'], 10)
+    t = np.arange(777, dtype=np.float64)
+    for start in range(0, len(t), 50):
+        series.append(t=t[start:start + 50], x=2 * t[start:start + 50])
+
+    np.testing.assert_array_equal(series['x'], 2 * series['t'])
+
+def test_ensemble_by_index_matches_numpy():
+    runs = [np.arange(5.0), np.arange(5.0) * 2, np.arange(3.0) * 3]
+
+    truncated = obj.EnsembleStats(runs, truncate=True)
+    np.testing.assert_allclose(truncated.mean, np.mean([run[:3] for run in runs], axis=0))
+    np.testing.assert_allclose(truncated.std, np.std([run[:3] for run in runs], axis=0, ddof=1))
+    np.testing.assert_allclose(truncated.msd, np.mean([run[:3] ** 2 for run in runs], axis=0))
+
+    survivors = obj.EnsembleStats(runs, truncate=False)
+    np.testing.assert_array_equal(survivors.count, [3, 3, 3, 2, 2])
+    np.testing.assert_allclose(survivors.mean[3:], [4.5, 6.0])
+    np.testing.assert_allclose(survivors.std[3:], np.std([[3.0, 4.0], [6.0, 8.0]], axis=0, ddof=1))
+
+def test_ensemble_single_run_has_no_deviation():
+    stats = obj.EnsembleStats([np.arange(4.0)])
+    np.testing.assert_array_equal(stats.mean, np.arange(4.0))
+    assert np.all(np.isnan(stats.std))
+
+@pytest.mark.parametrize('truncate', [True, False])
+def test_ensemble_by_time_matches_undecimated_runs(truncate):
+    # Same dt, different lengths, so each run is decimated with its own stride
+    dt = 1e-15
+    lengths = [3202, 1500, 800]
+    rng = np.random.default_rng(1)
+    full_runs = [rng.random(length) for length in lengths]
+    times, values = [], []
+    for run in full_runs:
+        series = obj.SeriesDecimator(['t', 'v'], 100)
+        series.append(t=np.arange(len(run)) * dt, v=run)
+        times.append(series['t'])
+        values.append(series['v'])
+    assert len({len(t) for t in times}) > 1
+
+    stats = obj.EnsembleStats(values, truncate, times)
+    full = obj.EnsembleStats(full_runs, truncate)
+    indexes = np.rint(stats.time / dt).astype(np.int64)
+
+    assert stats.time[0] == 0.0
+    if truncate:
+        # Clipped to the shortest run, on the grid of the longest one
+        assert stats.time[-1] <= (min(lengths) - 1) * dt
+    else:
+        assert stats.time[-1] == (max(lengths) - 1) * dt
+    # Grid times are samples of every run, so no interpolation error is added
+    np.testing.assert_allclose(stats.mean, full.mean[indexes], rtol=1e-12)
+    np.testing.assert_array_equal(stats.count, full.count[indexes])
+    np.testing.assert_allclose(stats.std, full.std[indexes], rtol=1e-12)
+
+def test_ensemble_by_time_interpolates_offset_samples():
+    # The longest run sets the grid, the coarser one is interpolated onto it
+    times = [np.array([0.0, 1.0, 2.0]), np.array([0.0, 0.5, 1.0, 1.5, 2.0, 2.5])]
+    values = [np.array([0.0, 2.0, 4.0]), np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0])]
+
+    stats = obj.EnsembleStats(values, True, times)
+    np.testing.assert_array_equal(stats.time, [0.0, 0.5, 1.0, 1.5, 2.0])
+    np.testing.assert_allclose(stats.mean, [0.0, 1.0, 2.0, 3.0, 4.0])
+
+    survivors = obj.EnsembleStats(values, False, times)
+    np.testing.assert_array_equal(survivors.time, times[1])
+    np.testing.assert_array_equal(survivors.count, [2, 2, 2, 2, 2, 1])
+    assert survivors.mean[-1] == 5.0
+
+def test_ensemble_by_time_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        obj.EnsembleStats([np.arange(3.0)], True, [np.arange(4.0)])
+
+def test_plot_indexes_keep_first_and_last():
+    assert obj.get_plot_indexes(10, 20) is None
+    indexes = obj.get_plot_indexes(1001, 10)
+    assert indexes[0] == 0 and indexes[-1] == 1000 and len(indexes) <= 10
+
+def test_compact_keeps_energy_diff_aligned_with_time():
+    time_vec = np.arange(101, dtype=np.float64)
+    metric = obj.AnalysisRad('beeman', 1.0, 1.0, 0.0, 10.0, 5.0, obj.EndingReason.RightWall,
+                             time_vec, time_vec[1:] * 3, time_vec, time_vec, time_vec)
+    compact = metric.compact(10, np.float32)
+
+    np.testing.assert_array_equal(compact.energy_diff_vec, compact.time_vec[1:] * 3)
+    assert compact.step_count == 100
+    assert compact.final_time == 100.0
+    assert compact.time_vec.dtype == np.float32
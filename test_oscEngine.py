@@ -0,0 +1,92 @@
+import math
+import numpy as np
+import pytest
+
+import oscEngine
+import dynamicLoader as loader
+
+MASS, K, GAMMA, AMP, R0 = 70.0, 1e4, 100.0, 1.0, 1.0
+
+def _java_run(algo, dt, tf):
+    """Line by line transcription of algos.StepAlgorithm and its subclasses, returns every step as (t, x, v)"""
+
+    f = lambda r, v: -K * r - GAMMA * v
+    dt_sq = dt * dt
+    total_steps = math.floor(tf / dt + 0.5)
+    t = 0.0
+    pos, vel = R0, -AMP * GAMMA / (2.0 * MASS)
+    acc = f(pos, vel) / MASS
+    # eulerPrecedingStep
+    prev_vel = vel - dt * acc
+    prev_pos = pos - dt * prev_vel + dt_sq * acc / 2.0
+    prev_acc = f(prev_pos, prev_vel) / MASS
+    if algo == 'Gear':
+        alpha = [(3.0 / 16.0), (251.0 / 360), 1.0, (11.0 / 18.0), (1.0 / 6.0), (1.0 / 60.0)]
+        factors = [1.0] + [math.pow(dt, k) / math.factorial(k) for k in range(1, 6)]
+        r3 = f(vel, acc) / MASS
+        r4 = f(acc, r3) / MASS
+        r5 = f(r3, r4) / MASS
+        r = [pos, vel, acc, r3, r4, r5]
+
+    steps = [(t, pos, vel)]
+    for _ in range(total_steps):
+        if algo == 'Verlet':
+            next_pos = 2 * pos - prev_pos + dt_sq * acc
+            next_vel = (next_pos - prev_pos) / (2 * dt)
+            next_acc = f(next_pos, next_vel) / MASS
+        elif algo == 'Beeman':
+            next_pos = pos + vel * dt + 2.0 / 3.0 * acc * dt_sq - 1.0 / 6.0 * prev_acc * dt_sq
+            next_vel = vel + 3.0 / 2.0 * acc * dt - 1.0 / 2.0 * prev_acc * dt
+            next_acc = f(next_pos, next_vel) / MASS
+            next_vel = vel + 1.0 / 3.0 * next_acc * dt + 5.0 / 6.0 * acc * dt - 1.0 / 6.0 * prev_acc * dt
+        else:
+            predicted = []
+            for j in range(6):
+                value = 0.0
+                for i in range(j, 6):
+                    value += r[i] * factors[i - j]
+                predicted.append(value)
+            delta_r2 = (f(predicted[0], predicted[1]) / MASS - predicted[2]) * factors[2]
+            r = [predicted[i] + alpha[i] * delta_r2 / factors[i] for i in range(6)]
+            next_pos, next_vel, next_acc = r[0], r[1], r[2]
+        prev_pos, prev_acc = pos, acc
+        pos, vel, acc = next_pos, next_vel, next_acc
+        t += dt
+        steps.append((t, pos, vel))
+    return steps
+
+@pytest.mark.parametrize('algo', oscEngine.ALGOS)
+def test_batch_matches_java_steps(algo, tmp_path):
+    # Different lengths, so oscillators leave the running prefix at different steps
+    delta_ts = [1e-3, 2.5e-3, 1e-2, 3e-3]
+    tf = 0.5
+    output_files = [str(tmp_path / f'{i}.bin') for i in range(len(delta_ts))]
+    result = oscEngine.simulate_osc_batch(algo, delta_ts, tf, MASS, K, GAMMA, AMP, R0, output_files=output_files)
+
+    for i, dt in enumerate(delta_ts):
+        expected = np.array(_java_run(algo, dt, tf))
+        frames = loader.load_dynamic(output_files[i], loader.OSC_DTYPE)
+        # Values must match exactly, not within a tolerance
+        np.testing.assert_array_equal(frames['t'], expected[:, 0])
+        np.testing.assert_array_equal(frames['x'], expected[:, 1])
+        np.testing.assert_array_equal(frames['vx'], expected[:, 2])
+        assert result.step_count[i] == len(expected) - 1
+        assert result.final_time[i] == expected[-1, 0]
+        assert result.final_pos[i] == expected[-1, 1]
+
+@pytest.mark.parametrize('print_every', [1, 3])
+def test_ecm_matches_trajectory(print_every):
+    dt, tf = 1e-3, 0.2
+    result = oscEngine.simulate_osc_batch('Beeman', dt, tf, MASS, K, GAMMA, AMP, R0, print_every=print_every)
+
+    steps = np.array(_java_run('Beeman', dt, tf))[::print_every]
+    t = steps[:, 0]
+    exact = AMP * np.exp(-(GAMMA / (2 * MASS)) * t) * np.cos(np.sqrt(K / MASS - GAMMA * GAMMA / (4 * MASS * MASS)) * t)
+    sq_error = (steps[:, 1] - exact) ** 2
+    assert result.printed_count[0] == len(steps)
+    assert result.ecm[0] == pytest.approx(sq_error.mean(), rel=1e-10)
+    assert result.ecm_dev[0] == pytest.approx(sq_error.std(ddof=1), rel=1e-8)
+
+def test_invalid_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        oscEngine.simulate_osc_batch('Euler', 1e-3, 1.0, MASS, K, GAMMA, AMP, R0)
@@ -0,0 +1,33 @@
+import os
+
+import profiler
+
+def _profile(prof, dynamic_filename, frames):
+    profile = prof.open_file(dynamic_filename, 'rad')
+    with profile.phase('read', frames):
+        profile.count_frames(frames)
+    return profile.stop()
+
+def test_same_file_names_in_different_dirs_keep_their_reports(tmp_path):
+    prof = profiler.Profiler(str(tmp_path / 'profile'))
+    filenames = [str(tmp_path / f'run{i}' / 'BEEMAN-1.0000000000E-15.txt') for i in range(3)]
+    for i, filename in enumerate(filenames):
+        _profile(prof, filename, i + 1)
+
+    summary = profiler.summarize(prof.profile_dir)
+    assert sorted(report['file'] for report in summary['files']) == sorted(filenames)
+    assert summary['kinds']['rad']['files'] == 3
+    assert summary['kinds']['rad']['frames'] == 6
+
+def test_report_name_is_stable_and_keeps_file_name(tmp_path):
+    filename = str(tmp_path / 'BEEMAN.txt')
+    name = profiler.get_report_name(filename)
+
+    assert name.startswith('BEEMAN.txt-')
+    assert name == profiler.get_report_name(os.path.relpath(filename))
+    assert name != profiler.get_report_name(str(tmp_path / 'other' / 'BEEMAN.txt'))
+
+def test_disabled_profile_does_nothing():
+    profile = profiler.open_file(None, 'file.txt', 'rad')
+    assert list(profile.timed_iter('read', [[1, 2]])) == [[1, 2]]
+    assert profile.stop() is None
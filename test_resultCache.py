@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import pytest
+
+import objects as obj
+import resultCache
+
+def _rad_result():
+    time_vec = np.arange(5, dtype=np.float64) * 1e-15
+    return obj.AnalysisRad('beeman', 1e-15, 1e4, 1e-19, 3e-8, 2e-20, obj.EndingReason.Collision,
+                           time_vec, time_vec[1:] * 2, time_vec * 3, time_vec * 4, time_vec * 5, 3202, 3.202e-12)
+
+@pytest.fixture
+def dynamic_file(tmp_path):
+    filename = tmp_path / 'dynamic.txt'
+    filename.write_text('0\n1 2 3 4\n*\n')
+    return str(filename)
+
+@pytest.fixture
+def cache(tmp_path):
+    return resultCache.ResultCache(str(tmp_path / 'cache'))
+
+def _get(cache, dynamic_file, params):
+    computed = []
+    def compute():
+        computed.append(True)
+        return _rad_result()
+    return cache.get_or_compute('rad', dynamic_file, params, compute), len(computed) > 0
+
+def test_hit_does_not_recompute(cache, dynamic_file):
+    first, computed = _get(cache, dynamic_file, {'max_points': 10})
+    assert computed
+    second, computed = _get(cache, dynamic_file, {'max_points': 10})
+    assert not computed
+
+    for name in resultCache.RAD_SERIES:
+        np.testing.assert_array_equal(getattr(second, name), getattr(first, name))
+    assert second.algo == 'beeman'
+    assert second.ending_motive == obj.EndingReason.Collision
+    assert second.step_count == 3202
+    assert second.final_time == 3.202e-12
+
+def test_different_params_miss(cache, dynamic_file):
+    _get(cache, dynamic_file, {'max_points': 10})
+    _result, computed = _get(cache, dynamic_file, {'max_points': 20})
+    assert computed
+
+def test_rewritten_file_misses(cache, dynamic_file):
+    _get(cache, dynamic_file, {})
+    with open(dynamic_file, 'a') as file:
+        file.write('1\n2 3 4 5\n*\n')
+    _result, computed = _get(cache, dynamic_file, {})
+    assert computed
+
+def test_touched_file_misses(cache, dynamic_file):
+    _get(cache, dynamic_file, {})
+    stat = os.stat(dynamic_file)
+    os.utime(dynamic_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    _result, computed = _get(cache, dynamic_file, {})
+    assert computed
+
+def test_content_hash_survives_copies(tmp_path, dynamic_file):
+    cache = resultCache.ResultCache(str(tmp_path / 'cache'), hash_content=True)
+    copy = tmp_path / 'copy.txt'
+    copy.write_bytes(open(dynamic_file, 'rb').read())
+
+    _get(cache, dynamic_file, {})
+    _result, computed = _get(cache, str(copy), {})
+    assert not computed
+    copy.write_text('changed')
+    _result, computed = _get(cache, str(copy), {})
+    assert computed
+
+def test_torn_entry_is_recomputed(cache, dynamic_file):
+    _get(cache, dynamic_file, {})
+    key = cache.get_key('rad', dynamic_file, {})
+    with open(cache.get_filename(key), 'wb') as entry:
+        entry.write(b'not an npz')
+    _result, computed = _get(cache, dynamic_file, {})
+    assert computed
+
+def test_evicts_least_recently_used(tmp_path, dynamic_file):
+    cache = resultCache.ResultCache(str(tmp_path / 'cache'))
+    _get(cache, dynamic_file, {'run': 0})
+    entry_size = os.path.getsize(cache.get_filename(cache.get_key('rad', dynamic_file, {'run': 0})))
+    # Room for two entries
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+
+    _get(cache, dynamic_file, {'run': 1})
+    for run in (0, 1):
+        os.utime(cache.get_filename(cache.get_key('rad', dynamic_file, {'run': run})), ns=(run, run))
+    # Reading run 0 makes run 1 the least recently used
+    _get(cache, dynamic_file, {'run': 0})
+    _get(cache, dynamic_file, {'run': 2})
+
+    assert not _get(cache, dynamic_file, {'run': 0})[1]
+    assert not _get(cache, dynamic_file, {'run': 2})[1]
+    assert _get(cache, dynamic_file, {'run': 1})[1]
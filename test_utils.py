@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import utils
+
+def test_fit_through_origin_finds_exact_slope():
+    x = np.linspace(0.0, 1.0, 50)
+    fit = utils.fit_linear(x, 3.5 * x)
+
+    assert fit.slope == pytest.approx(3.5, rel=1e-14)
+    assert fit.intercept == 0.0
+    assert fit.intercept_err == 0.0
+    assert fit.sse == pytest.approx(0.0, abs=1e-25)
+    assert fit.r2 == pytest.approx(1.0)
+
+def test_fit_with_intercept_matches_polyfit():
+    rng = np.random.default_rng(0)
+    x = np.linspace(1e-12, 5e-12, 200)
+    y = 2e15 * x - 3.0 + rng.normal(0.0, 0.01, len(x))
+    fit = utils.fit_linear(x, y, through_origin=False)
+
+    (slope, intercept), cov = np.polyfit(x, y, 1, cov='unscaled')
+    residuals = y - (slope * x + intercept)
+    sse = residuals @ residuals
+    variance = sse / (len(x) - 2)
+    assert fit.slope == pytest.approx(slope, rel=1e-9)
+    assert fit.intercept == pytest.approx(intercept, rel=1e-9)
+    assert fit.sse == pytest.approx(sse, rel=1e-9)
+    assert fit.slope_err == pytest.approx(np.sqrt(variance * cov[0, 0]), rel=1e-6)
+    assert fit.intercept_err == pytest.approx(np.sqrt(variance * cov[1, 1]), rel=1e-6)
+    assert fit.r2 == pytest.approx(1 - sse / np.sum((y - y.mean()) ** 2), rel=1e-12)
+
+def test_fit_through_origin_matches_lstsq():
+    rng = np.random.default_rng(1)
+    x = rng.random(100)
+    y = -0.7 * x + rng.normal(0.0, 0.05, len(x))
+    fit = utils.fit_linear(x, y)
+
+    slope, sse = np.linalg.lstsq(x[:, None], y, rcond=None)[:2]
+    assert fit.slope == pytest.approx(slope[0], rel=1e-12)
+    assert fit.sse == pytest.approx(sse[0], rel=1e-9)
+    assert fit.slope_err == pytest.approx(np.sqrt(sse[0] / (len(x) - 1) / (x @ x)), rel=1e-9)
+    # Error curve is a parabola with its minimum at the slope
+    assert fit.sxx == pytest.approx(x @ x)
+
+def test_fit_of_two_points_has_no_error_estimate():
+    fit = utils.fit_linear([1.0, 2.0], [2.0, 5.0], through_origin=False)
+
+    assert fit.slope == pytest.approx(3.0)
+    assert fit.intercept == pytest.approx(-1.0)
+    assert np.isnan(fit.slope_err)
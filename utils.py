@@ -1,7 +1,10 @@
+import os
 import sys
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
+from matplotlib.collections import LineCollection
 import numpy as np
+import objects as obj
 
 def invalid_param(param_name):
     print(f'Error in config. Invalid or missing {param_name}!')
@@ -14,6 +17,11 @@ def read_config_param(config, param_name, converter_fun, valid_fun):
             return param
     invalid_param(param_name)
 
+def read_optional_config_param(config, param_name, converter_fun, valid_fun, default):
+    if param_name not in config:
+        return default
+    return read_config_param(config, param_name, converter_fun, valid_fun)
+
 RESET = '\033[0m'
 def get_color_escape(color_hex, background=False):
     rgb = [int(color_hex[i:i+2], 16) for i in range(1, len(color_hex), 2)]
@@ -44,10 +52,46 @@ class MathTextSciFormatter(mticker.Formatter):
             s =  r'%s%s' % (significand, exponent)
         return "${}$".format(s)
 
+# From this many series on, lines are drawn as a single LineCollection
+COLLECTION_MIN_SERIES = 20
+
 def init_plotter():
     plt.rcParams.update({'font.size': 20})
 
-def plot_mult_histogram_density(values_1, values_2, n_bins, x_label, y_label, precision=2, sci_x=False, sci_y=True):
+def use_headless():
+    # Figures can only be saved, no display is needed
+    plt.close('all')
+    plt.switch_backend('Agg')
+
+def plot_lines(ax, x_values_superlist, y_values_superlist, legend_list):
+    """Draws one line per series on ax, returns the color of each one
+
+    From COLLECTION_MIN_SERIES series on, every line is drawn by one artist:
+    series sharing a legend share a color and a single legend entry.
+    """
+
+    if len(x_values_superlist) < COLLECTION_MIN_SERIES:
+        colors = []
+        for i in range(len(x_values_superlist)):
+            p = ax.plot(x_values_superlist[i], y_values_superlist[i], label=legend_list[i])  # Plot some data on the axes
+            colors.append(p[-1].get_color())
+        return colors
+
+    cycle = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    label_colors = {}
+    for label in legend_list:
+        if label not in label_colors:
+            label_colors[label] = cycle[len(label_colors) % len(cycle)]
+    colors = [label_colors[label] for label in legend_list]
+    segments = [np.column_stack((x_values, y_values)) for x_values, y_values in zip(x_values_superlist, y_values_superlist)]
+    ax.add_collection(LineCollection(segments, colors=colors))
+    ax.autoscale_view()
+    # Empty lines only hold the legend entries
+    for label, color in label_colors.items():
+        ax.plot([], [], color=color, label=label)
+    return colors
+
+def plot_mult_histogram_density(values_1, values_2, n_bins, x_label, y_label, precision=2, sci_x=False, sci_y=True, save_name=None):
     fig, ax = plt.subplots(figsize=(12, 10))  # Create a figure containing a single axes.
     weights = np.full(len(values_1), 1.0 / len(values_1))
     ax.hist(values_1, bins=n_bins, alpha=0.7, weights=weights, label='Initial')  # Plot some data on the axes
@@ -67,9 +111,12 @@ def plot_mult_histogram_density(values_1, values_2, n_bins, x_label, y_label, pr
     fig.legend(loc='upper right')
     plt.grid()
     plt.tight_layout()
-    plt.show(block=False)
+    if save_name:
+        plt.savefig(save_name)
+    else:
+        plt.show(block=False)
 
-def plot_histogram_density(values, n_bins, x_label, y_label, precision=2, sci_x=False, sci_y=True, log=False):
+def plot_histogram_density(values, n_bins, x_label, y_label, precision=2, sci_x=False, sci_y=True, log=False, save_name=None):
     fig, ax = plt.subplots(figsize=(12, 10))  # Create a figure containing a single axes.
     weights = np.full(len(values), 1.0 / len(values))
     _n, _bins, _patches = ax.hist(values, bins=n_bins, weights=weights)  # Plot some data on the axes
@@ -85,6 +132,8 @@ def plot_histogram_density(values, n_bins, x_label, y_label, precision=2, sci_x=
 
     plt.grid()
     plt.tight_layout()
+    if save_name:
+        plt.savefig(save_name)
 
     if log:
         step = n_bins[1]
@@ -98,54 +147,93 @@ def plot_histogram_density(values, n_bins, x_label, y_label, precision=2, sci_x=
         ax.xaxis.set_major_formatter(MathTextSciFormatter(f'%1.{precision}e'))
         plt.grid()
         plt.tight_layout()
+        if save_name:
+            # hist.png -> hist_log.png
+            base, ext = os.path.splitext(save_name)
+            plt.savefig(base + '_log' + ext)
 
-    plt.show(block=False)
+    if not save_name:
+        plt.show(block=False)
 
 # Linear regression with b = 0
 def f_adj(x, c):
     return c * x
 
-def calculate_regression(x_values, y_values, plot_error=False):
-    min_error, min_c = float("Inf"), 10
-    error_list = []
-    c_list = []
-
-    for c in np.arange(-2, 2, 0.0001):
-        error_sum = 0
-        for i in range(0, len(x_values)):
-            error_sum += (y_values[i] - f_adj(x_values[i], c)) ** 2
-        
-        error_list.append(error_sum)
-        c_list.append(c)
-
-        if error_sum < min_error:
-            min_error = error_sum
-            min_c = c
-    
-    if plot_error:
-        # Plot Error = f(c)
-        fig, ax = plt.subplots(figsize=(12, 10))  # Create a figure containing a single axes.
-        ax.plot(c_list, error_list)
-        ax.set_xlabel('c')
-        ax.set_ylabel('Error')
+def fit_linear(x_values, y_values, through_origin=True):
+    """Returns the exact least squares LinearFit of y = c * x (+ b if not through_origin)"""
 
-        plt.grid()
-        plt.tight_layout()
+    x = np.asarray(x_values, dtype=np.float64)
+    y = np.asarray(y_values, dtype=np.float64)
+    n = len(x)
+    y_mean = y.mean()
+
+    if through_origin:
+        sxx = x @ x
+        slope = (x @ y) / sxx
+        intercept = 0.0
+        dof = n - 1
+    else:
+        x_mean = x.mean()
+        sxx = (x - x_mean) @ (x - x_mean)
+        slope = ((x - x_mean) @ (y - y_mean)) / sxx
+        intercept = y_mean - slope * x_mean
+        dof = n - 2
+
+    residuals = y - (slope * x + intercept)
+    sse = residuals @ residuals
+    sst = (y - y_mean) @ (y - y_mean)
+    variance = sse / dof if dof > 0 else float("NaN")
+    slope_err = np.sqrt(variance / sxx)
+    intercept_err = 0.0 if through_origin else np.sqrt(variance * (1.0 / n + x_mean * x_mean / sxx))
+    r2 = 1 - sse / sst if sst > 0 else float("NaN")
+
+    return obj.LinearFit(slope, intercept, slope_err, intercept_err, r2, sse, x @ x if through_origin else sxx)
+
+def plot_regression_error(fit, save_name=None):
+    # SSE(c) = SSE(c_min) + Sxx * (c - c_min)^2, evaluated around the optimum
+    half_width = max(5 * fit.slope_err, 1e-3 * abs(fit.slope)) if np.isfinite(fit.slope_err) else 1e-3 * abs(fit.slope)
+    if half_width == 0:
+        half_width = 1e-3
+    c_list = np.linspace(fit.slope - half_width, fit.slope + half_width, 401)
+    error_list = fit.sse + fit.sxx * (c_list - fit.slope) ** 2
+
+    # Plot Error = f(c)
+    fig, ax = plt.subplots(figsize=(12, 10))  # Create a figure containing a single axes.
+    ax.plot(c_list, error_list)
+    ax.set_xlabel('c')
+    ax.set_ylabel('Error')
+
+    plt.grid()
+    plt.tight_layout()
+    if save_name:
+        plt.savefig(save_name)
+    else:
         plt.show(block=False)
 
-    return min_c, min_error
+def calculate_regression(x_values, y_values, plot_error=False):
+    fit = fit_linear(x_values, y_values)
+    if plot_error:
+        plot_regression_error(fit)
+    return fit.slope, fit.sse
 
 def plot_values_with_adjust(x_values, x_label, y_values, y_label, precision=2, sci=True, min_val=None, max_val=None, plot=True, save_name=None):
     # adj_coef = np.polyfit(x_values, y_values, 1)
     # poly1d_fn = np.poly1d(adj_coef)
 
-    c, err = calculate_regression(x_values, y_values, plot)
-    print(c, err)
+    fit = fit_linear(x_values, y_values)
+    c = fit.slope
+    print(fit)
 
     if not plot: return c
+    error_save_name = None
+    if save_name:
+        # adjust.png -> adjust_error.png
+        base, ext = os.path.splitext(save_name)
+        error_save_name = base + '_error' + ext
+    plot_regression_error(fit, error_save_name)
 
     fig, ax = plt.subplots(figsize=(12, 10))  # Create a figure containing a single axes.
-    ax.plot(x_values, y_values, 'yo', x_values, [f_adj(x, c) for x in x_values], '-k')  # Plot some data on the axes
+    ax.plot(x_values, y_values, 'yo', x_values, f_adj(np.asarray(x_values, dtype=np.float64), c), '-k')  # Plot some data on the axes
     ax.set_xlabel(x_label)
     ax.set_ylabel(y_label)
     
@@ -169,11 +257,7 @@ def plot_values_with_adjust(x_values, x_label, y_values, y_label, precision=2, s
 
 def plot_multiple_values(x_values_superlist, x_label, y_values_superlist, y_label, legend_list, precision=2, sci_x=False, sci_y=True, min_val_x=None, max_val_x=None, min_val_y=None, max_val_y=None, log_x=False, log_y=False, legend_loc='upper right', save_name=None):
     fig, ax = plt.subplots(figsize=(12, 10))  # Create a figure containing a single axes.
-
-    colors = []
-    for i in range(len(x_values_superlist)):
-        p = ax.plot(x_values_superlist[i], y_values_superlist[i], label=legend_list[i])  # Plot some data on the axes
-        colors.append(p[-1].get_color())
+    colors = plot_lines(ax, x_values_superlist, y_values_superlist, legend_list)
 
     if log_x:
         ax.set_xscale('log')
@@ -207,14 +291,11 @@ def plot_multiple_values(x_values_superlist, x_label, y_values_superlist, y_labe
 
 def plot_multiple_values_with_scatter(x_values_superlist, x_label, y_values_superlist, y_label, legend_list, precision=2, sci_x=False, sci_y=True, min_val_x=None, max_val_x=None, min_val_y=None, max_val_y=None, log_x=False, log_y=False, legend_loc='upper right', scatter_superlist=None, save_name=None):
     fig, ax = plt.subplots(figsize=(12, 10))  # Create a figure containing a single axes.
+    colors = plot_lines(ax, x_values_superlist, y_values_superlist, legend_list)
 
-    colors = []
-    for i in range(len(x_values_superlist)):
-        p = ax.plot(x_values_superlist[i], y_values_superlist[i], label=legend_list[i])  # Plot some data on the axes
-        colors.append(p[-1].get_color())
-
-        if scatter_superlist is not None:
-            plt.scatter(scatter_superlist[0], scatter_superlist[1], c=scatter_superlist[2], s=8)
+    # Static points are the same for every series, drawn once
+    if scatter_superlist is not None:
+        plt.scatter(scatter_superlist[0], scatter_superlist[1], c=scatter_superlist[2], s=8)
 
     if log_x:
         ax.set_xscale('log')